@@ -5,10 +5,13 @@ from __future__ import annotations
 
 import json
 import os
+import runpy
 import shutil
+import signal
 import subprocess
 import sys
 import tempfile
+import time
 import unittest
 from datetime import datetime
 from pathlib import Path
@@ -152,6 +155,55 @@ class AgLedgerSyncIntegrationTests(unittest.TestCase):
         self.assertIn("punny programming joke", joke_entries[0]["msg"])
         self.assertIn("punny programming joke", joke_entries[1]["msg"])
 
+    def test_sync_with_jobs_matches_serial_sync(self) -> None:
+        self.install_fixture(
+            "hello_world_rollout.jsonl",
+            "2026/01/02/rollout-2026-01-02T10-00-00-sess-hello-world.jsonl",
+        )
+        self.install_fixture(
+            "punny_joke_rollout.jsonl",
+            "2026/01/03/rollout-2026-01-03T11-00-00-sess-punny-joke.jsonl",
+        )
+        broken = self.session_root / "2026/01/03/rollout-2026-01-03T12-00-00-sess-broken.jsonl"
+        broken.write_text("not json\n", encoding="utf-8")
+
+        result = self.run_cli(
+            "sync",
+            "--session-root",
+            str(self.session_root),
+            "--lookback-minutes",
+            "1440",
+            "--jobs",
+            "3",
+        )
+        self.assertEqual(result.returncode, 1)
+        summary = json.loads(result.stdout.strip())
+        self.assertEqual(summary["files_processed"], 2)
+        self.assertEqual(summary["files_failed"], 1)
+        self.assertEqual(summary["entries_appended"], 5)
+        self.assertEqual(summary["failures"][0]["path"], str(broken.resolve()))
+
+        entries = self.read_all_entries()
+        self.assertEqual(
+            [entry["entry_kind"] for entry in entries if entry["session"] == "sess-hello-world"],
+            ["session_start", "notable_change", "session_end"],
+        )
+
+        broken.unlink()
+        rerun = self.run_cli(
+            "sync",
+            "--session-root",
+            str(self.session_root),
+            "--lookback-minutes",
+            "1440",
+            "--jobs",
+            "0",
+        )
+        self.assertEqual(rerun.returncode, 0, msg=rerun.stderr)
+        rerun_summary = json.loads(rerun.stdout.strip())
+        self.assertEqual(rerun_summary["files_skipped_unchanged"], 2)
+        self.assertEqual(rerun_summary["entries_appended"], 0)
+
     def test_sync_emits_structured_invocation_metadata_for_named_skills(self) -> None:
         rollout_path = self.install_fixture(
             "hello_world_rollout.jsonl",
@@ -351,6 +403,263 @@ class AgLedgerSyncIntegrationTests(unittest.TestCase):
         self.assertIn("run directly", hello_entries[-2]["msg"])
         self.assertIn("run directly", hello_entries[-1]["msg"])
 
+    def test_sync_tails_grown_rollout_and_reparses_rewritten_rollout(self) -> None:
+        rollout_path = self.install_fixture(
+            "hello_world_rollout.jsonl",
+            "2026/01/02/rollout-2026-01-02T10-00-00-sess-hello-world.jsonl",
+        )
+        sync_args = (
+            "sync",
+            "--session-root",
+            str(self.session_root),
+            "--lookback-minutes",
+            "1440",
+        )
+        first = self.run_cli(*sync_args)
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+
+        state_path = self.root / "state" / "sync-state.json"
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        cursor = state["files"][str(rollout_path.resolve())]["cursor"]
+        self.assertEqual(cursor["offset"], rollout_path.stat().st_size)
+        self.assertEqual(cursor["session_id"], "sess-hello-world")
+        self.assertIsNotNone(cursor["current_turn"])
+
+        # Damage an already-committed line in place. A resumed sync never
+        # rereads it, while a full reparse would fail on the invalid JSON.
+        content = rollout_path.read_bytes()
+        first_line_end = content.index(b"\n")
+        damaged = b"#" * first_line_end + content[first_line_end:]
+        rollout_path.write_bytes(damaged)
+        self.append_rollout_entries(
+            rollout_path,
+            [
+                self.make_message(
+                    "2026-01-02T10:00:07Z",
+                    role="user",
+                    text="Make the script executable too.",
+                ),
+                self.make_message(
+                    "2026-01-02T10:00:09Z",
+                    role="assistant",
+                    phase="final_answer",
+                    text="Updated hello_world.py so it can be run directly.",
+                ),
+            ],
+        )
+        # A line still being written is not committed or reported as invalid.
+        with rollout_path.open("a", encoding="utf-8") as handle:
+            handle.write('{"timestamp": "2026-01-02T10:00:10Z", "type": "resp')
+
+        tailed = self.run_cli(*sync_args)
+        self.assertEqual(tailed.returncode, 0, msg=tailed.stderr)
+        tailed_summary = json.loads(tailed.stdout.strip())
+        self.assertEqual(tailed_summary["files_failed"], 0)
+        self.assertEqual(tailed_summary["entries_appended"], 2)
+
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        cursor = state["files"][str(rollout_path.resolve())]["cursor"]
+        self.assertLess(cursor["offset"], rollout_path.stat().st_size)
+        self.assertEqual(cursor["current_turn"]["turn_index"], 2)
+
+        rollout_path.write_bytes(damaged[:first_line_end] + b"\n")
+        rewritten = self.run_cli(*sync_args)
+        self.assertEqual(rewritten.returncode, 1)
+        self.assertIn("Invalid JSON", rewritten.stderr)
+
+    def test_sync_dedupes_against_day_key_sidecar_without_per_file_key_lists(self) -> None:
+        rollout_path = self.install_fixture(
+            "hello_world_rollout.jsonl",
+            "2026/01/02/rollout-2026-01-02T10-00-00-sess-hello-world.jsonl",
+        )
+        sync_args = (
+            "sync",
+            "--session-root",
+            str(self.session_root),
+            "--lookback-minutes",
+            "1440",
+        )
+        first = self.run_cli(*sync_args)
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+
+        state_path = self.root / "state" / "sync-state.json"
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        file_state = state["files"][str(rollout_path.resolve())]
+        self.assertNotIn("emitted_source_keys", file_state)
+
+        ledger_path = (
+            self.root / "data" / f"ledger-{self.local_date_str('2026-01-02T10:00:00Z')}.md"
+        )
+        keys_path = ledger_path.with_suffix(".keys")
+        payload = keys_path.read_bytes()
+        self.assertEqual(payload[:8], b"AGLKEYS1")
+        self.assertEqual(int.from_bytes(payload[8:16], "little"), ledger_path.stat().st_size)
+        self.assertEqual((len(payload) - 16) // 8, 3)
+
+        # A missing sidecar and empty state fall back to scanning the day file.
+        keys_path.unlink()
+        state["files"] = {}
+        state_path.write_text(json.dumps(state, ensure_ascii=True), encoding="utf-8")
+        rebuilt = self.run_cli(*sync_args)
+        self.assertEqual(rebuilt.returncode, 0, msg=rebuilt.stderr)
+        rebuilt_summary = json.loads(rebuilt.stdout.strip())
+        self.assertEqual(rebuilt_summary["entries_appended"], 0)
+        self.assertEqual(rebuilt_summary["entries_already_present"], 3)
+        rebuilt_payload = keys_path.read_bytes()
+        self.assertEqual(rebuilt_payload[:16], payload[:16])
+        self.assertEqual(
+            sorted(rebuilt_payload[index : index + 8] for index in range(16, len(rebuilt_payload), 8)),
+            sorted(payload[index : index + 8] for index in range(16, len(payload), 8)),
+        )
+
+    def test_sync_replays_state_journal_left_by_killed_run(self) -> None:
+        rollout_path = self.install_fixture(
+            "hello_world_rollout.jsonl",
+            "2026/01/02/rollout-2026-01-02T10-00-00-sess-hello-world.jsonl",
+        )
+        sync_args = (
+            "sync",
+            "--session-root",
+            str(self.session_root),
+            "--lookback-minutes",
+            "1440",
+        )
+        first = self.run_cli(*sync_args)
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+
+        state_path = self.root / "state" / "sync-state.json"
+        journal_path = self.root / "state" / "sync-state.json.journal"
+        self.assertFalse(journal_path.exists())
+
+        # Rebuild what a run killed after logging the file but before
+        # compaction leaves behind: an older snapshot plus a journal that ends
+        # in a torn line.
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        file_key = str(rollout_path.resolve())
+        entry = state["files"].pop(file_key)
+        state_path.write_text(json.dumps(state, ensure_ascii=True), encoding="utf-8")
+        journal_path.write_text(
+            json.dumps({"file": file_key, "entry": entry}, ensure_ascii=True)
+            + "\n"
+            + '{"file": "/torn',
+            encoding="utf-8",
+        )
+
+        resumed = self.run_cli(*sync_args)
+        self.assertEqual(resumed.returncode, 0, msg=resumed.stderr)
+        summary = json.loads(resumed.stdout.strip())
+        self.assertEqual(summary["files_skipped_unchanged"], 1)
+        self.assertEqual(summary["entries_appended"], 0)
+        self.assertFalse(journal_path.exists())
+        compacted = json.loads(state_path.read_text(encoding="utf-8"))
+        self.assertIn(file_key, compacted["files"])
+
+    def test_state_journal_appends_after_a_torn_tail_stay_replayable(self) -> None:
+        module = runpy.run_path(str(SCRIPT_PATH), run_name="ag_ledger")
+        state_path = self.root / "state" / "sync-state.json"
+        journal_path = module["state_journal_path"](state_path)
+        journal_path.parent.mkdir(parents=True)
+        entry = {"size": 10, "mtime_ns": 1}
+        journal_path.write_text(
+            json.dumps({"file": "/kept", "entry": entry}, ensure_ascii=True)
+            + "\n"
+            + '{"file": "/torn',
+            encoding="utf-8",
+        )
+
+        journal = module["SyncStateJournal"](state_path, {"files": {}})
+        journal.record_file("/after-crash", entry)
+        journal.close()
+
+        files: dict[str, dict[str, object]] = {}
+        module["replay_state_journal"](journal_path, files)
+        self.assertEqual(sorted(files), ["/after-crash", "/kept"])
+        self.assertNotIn("/torn", journal_path.read_text(encoding="utf-8"))
+
+    def wait_for_entry_count(self, count: int, *, timeout: float = 10.0) -> list[dict]:
+        deadline = time.monotonic() + timeout
+        while True:
+            entries = self.read_all_entries() if (self.root / "data").exists() else []
+            if len(entries) >= count or time.monotonic() >= deadline:
+                return entries
+            time.sleep(0.05)
+
+    def test_watch_ingests_appended_lines_and_new_rollout_directories(self) -> None:
+        for backend in ("poll", "auto"):
+            with self.subTest(backend=backend):
+                shutil.rmtree(self.root / "data", ignore_errors=True)
+                shutil.rmtree(self.root / "state", ignore_errors=True)
+                shutil.rmtree(self.session_root / "2026", ignore_errors=True)
+                rollout_path = self.install_fixture(
+                    "hello_world_rollout.jsonl",
+                    "2026/01/02/rollout-2026-01-02T10-00-00-sess-hello-world.jsonl",
+                )
+                process = subprocess.Popen(
+                    [
+                        sys.executable,
+                        str(SCRIPT_PATH),
+                        "--root",
+                        str(self.root),
+                        "watch",
+                        "--backend",
+                        backend,
+                        "--interval",
+                        "0.1",
+                        "--session-root",
+                        str(self.session_root),
+                        "--lookback-minutes",
+                        "1440",
+                    ],
+                    cwd=str(self.workspace),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                )
+                try:
+                    catch_up = json.loads(process.stdout.readline())
+                    self.assertEqual(catch_up["mode"], "watch")
+                    self.assertEqual(catch_up["entries_appended"], 3)
+                    if backend == "auto" and sys.platform.startswith("linux"):
+                        self.assertEqual(catch_up["watch_backend"], "inotify")
+
+                    self.append_rollout_entries(
+                        rollout_path,
+                        [
+                            self.make_message(
+                                "2026-01-02T10:00:07Z",
+                                role="user",
+                                text="Make the script executable too.",
+                            ),
+                            self.make_message(
+                                "2026-01-02T10:00:09Z",
+                                role="assistant",
+                                phase="final_answer",
+                                text="Updated hello_world.py so it can be run directly.",
+                            ),
+                        ],
+                    )
+                    self.assertEqual(len(self.wait_for_entry_count(5)), 5)
+
+                    self.install_fixture(
+                        "punny_joke_rollout.jsonl",
+                        "2026/01/03/rollout-2026-01-03T11-00-00-sess-punny-joke.jsonl",
+                    )
+                    entries = self.wait_for_entry_count(7)
+                    self.assertEqual(
+                        [entry["entry_kind"] for entry in entries if entry["session"] == "sess-punny-joke"],
+                        ["session_start", "session_end"],
+                    )
+                finally:
+                    process.send_signal(signal.SIGTERM)
+                    _, stderr = process.communicate(timeout=10)
+
+                self.assertEqual(process.returncode, 0, msg=stderr)
+                state_path = self.root / "state" / "sync-state.json"
+                self.assertFalse((self.root / "state" / "sync-state.json.journal").exists())
+                state = json.loads(state_path.read_text(encoding="utf-8"))
+                self.assertEqual(state["closeout"]["state"], "live_frontier")
+                self.assertEqual(len(state["files"]), 2)
+
     def test_sync_marks_repeated_identical_failures_as_stable_blocked(self) -> None:
         self.install_fixture(
             "hello_world_rollout.jsonl",
@@ -3,8 +3,11 @@
 
 from __future__ import annotations
 
+import csv
+import io
 import json
 import os
+import struct
 import subprocess
 import sys
 import tempfile
@@ -15,6 +18,46 @@ from pathlib import Path
 SCRIPT_PATH = Path(__file__).resolve().parents[1] / "ag-ledger"
 
 
+def decode_msgpack_stream(payload: bytes) -> list[object]:
+    """Decode the MessagePack subset `filter --format msgpack` emits."""
+    values: list[object] = []
+    offset = 0
+
+    def read(size: int) -> bytes:
+        nonlocal offset
+        chunk = payload[offset : offset + size]
+        offset += size
+        return chunk
+
+    def decode() -> object:
+        marker = read(1)[0]
+        if marker <= 0x7F:
+            return marker
+        if marker >= 0xE0:
+            return marker - 0x100
+        if 0xA0 <= marker <= 0xBF:
+            return read(marker & 0x1F).decode("utf-8")
+        if 0x90 <= marker <= 0x9F:
+            return [decode() for _ in range(marker & 0x0F)]
+        if 0x80 <= marker <= 0x8F:
+            return {decode(): decode() for _ in range(marker & 0x0F)}
+        if marker in (0xD9, 0xDA, 0xDB):
+            width = {0xD9: ">B", 0xDA: ">H", 0xDB: ">I"}[marker]
+            (size,) = struct.unpack(width, read(struct.calcsize(width)))
+            return read(size).decode("utf-8")
+        if marker == 0xCF:
+            return struct.unpack(">Q", read(8))[0]
+        if marker == 0xC0:
+            return None
+        if marker in (0xC2, 0xC3):
+            return marker == 0xC3
+        raise ValueError(f"unexpected MessagePack marker {marker:#x}")
+
+    while offset < len(payload):
+        values.append(decode())
+    return values
+
+
 class AgLedgerIntegrationTests(unittest.TestCase):
     def setUp(self) -> None:
         self._root_tmp = tempfile.TemporaryDirectory()
@@ -235,6 +278,348 @@ class AgLedgerIntegrationTests(unittest.TestCase):
         self.assertEqual(len(parent_lines), 1)
         self.assertEqual(parent_lines[0]["mode"], "review")
 
+    def test_filter_maintains_day_index_and_tracks_external_appends(self) -> None:
+        data_dir = self.root / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        ledger_path = data_dir / "ledger-2026-01-02.md"
+        ledger_path.write_text(
+            json.dumps(
+                {
+                    "time": "2026-01-02 10:00",
+                    "workspace": str(self.workspace),
+                    "session": "sess-a",
+                    "msg": "first",
+                },
+                ensure_ascii=True,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+
+        first = self.run_cli("filter", "--session", "sess-a")
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+        self.assertEqual(len(first.stdout.splitlines()), 1)
+
+        index_path = data_dir / "ledger-2026-01-02.idx.json"
+        self.assertTrue(index_path.exists())
+        header = json.loads(index_path.read_text(encoding="utf-8").splitlines()[0])
+        self.assertEqual(header["count"], 1)
+        self.assertEqual(header["keys"]["session"], ["sess-a"])
+        self.assertEqual(header["time_min"], "2026-01-02 10:00")
+
+        with ledger_path.open("a", encoding="utf-8") as handle:
+            handle.write(
+                json.dumps(
+                    {
+                        "time": "2026-01-02 11:00",
+                        "workspace": str(self.workspace),
+                        "session": "sess-a",
+                        "msg": "second",
+                    },
+                    ensure_ascii=True,
+                )
+                + "\n"
+            )
+
+        second = self.run_cli("filter", "--session", "sess-a", "--from", "2026-01-02 10:30")
+        self.assertEqual(second.returncode, 0, msg=second.stderr)
+        lines = [json.loads(line) for line in second.stdout.splitlines() if line.strip()]
+        self.assertEqual([line["msg"] for line in lines], ["second"])
+
+        ledger_path.write_text(
+            json.dumps(
+                {
+                    "time": "2026-01-02 12:00",
+                    "workspace": str(self.workspace),
+                    "session": "sess-b",
+                    "msg": "rewritten",
+                },
+                ensure_ascii=True,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        rewritten = self.run_cli("filter", "--session", "sess-b")
+        self.assertEqual(rewritten.returncode, 0, msg=rewritten.stderr)
+        self.assertEqual(json.loads(rewritten.stdout.strip())["msg"], "rewritten")
+        missing = self.run_cli("filter", "--session", "sess-a")
+        self.assertEqual(missing.stdout.strip(), "")
+
+    def test_filter_rescans_when_index_offsets_are_stale(self) -> None:
+        data_dir = self.root / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        ledger_path = data_dir / "ledger-2026-01-02.md"
+        long_line = json.dumps(
+            {"time": "2026-01-02 10:00", "session": "sess-a", "msg": "long " * 20},
+            ensure_ascii=True,
+        ) + "\n"
+        short_line = json.dumps(
+            {"time": "2026-01-02 11:00", "session": "sess-b", "msg": "short"},
+            ensure_ascii=True,
+        ) + "\n"
+        ledger_path.write_text(long_line + short_line, encoding="utf-8")
+        indexed = self.run_cli("filter", "--session", "sess-b")
+        self.assertEqual(indexed.returncode, 0, msg=indexed.stderr)
+        self.assertEqual(json.loads(indexed.stdout)["msg"], "short")
+
+        # Same size and mtime, so the index still looks current, but the indexed
+        # offset of the sess-b entry now points into the middle of a line.
+        ledger_stat = ledger_path.stat()
+        ledger_path.write_text(short_line + long_line, encoding="utf-8")
+        os.utime(ledger_path, ns=(ledger_stat.st_atime_ns, ledger_stat.st_mtime_ns))
+
+        stale = self.run_cli("filter", "--session", "sess-b")
+        self.assertEqual(stale.returncode, 0, msg=stale.stderr)
+        self.assertEqual([json.loads(line)["msg"] for line in stale.stdout.splitlines()], ["short"])
+
+    def test_append_refreshes_day_index(self) -> None:
+        result = self.run_cli("append", "sess-indexed", "--mode", "code", "indexed", "entry")
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+        index_files = list((self.root / "data").glob("ledger-*.idx.json"))
+        self.assertEqual(len(index_files), 1)
+        header = json.loads(index_files[0].read_text(encoding="utf-8").splitlines()[0])
+        self.assertEqual(header["keys"]["session"], ["sess-indexed"])
+        self.assertEqual(header["keys"]["mode"], ["code"])
+
+        ledger_files = list((self.root / "data").glob("ledger-*.md"))
+        self.assertEqual(header["size"], ledger_files[0].stat().st_size)
+
+    def test_migrate_imports_day_files_and_sqlite_filter_matches_jsonl(self) -> None:
+        data_dir = self.root / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        entries = [
+            {
+                "time": "2026-01-02 10:00",
+                "workspace": str(self.workspace),
+                "session": "sess-review",
+                "msg": "session start: review flaky sessions",
+                "invoked_skill": "ag-learn",
+                "invoked_skills": ["ag-learn", "specy"],
+                "mode": "review",
+                "parent_session_id": "sess-root",
+            },
+            {
+                "time": "2026-01-03 09:00",
+                "workspace": "/tmp/other-workspace",
+                "session": "sess-code",
+                "msg": "session start: implement telemetry",
+                "mode": "code",
+            },
+        ]
+        (data_dir / "ledger-2026-01-02.md").write_text(
+            json.dumps(entries[0], ensure_ascii=True) + "\n",
+            encoding="utf-8",
+        )
+        (data_dir / "ledger-2026-01-03.md").write_text(
+            json.dumps(entries[1], ensure_ascii=True) + "\n",
+            encoding="utf-8",
+        )
+
+        migrate = self.run_cli("migrate")
+        self.assertEqual(migrate.returncode, 0, msg=migrate.stderr)
+        summary = json.loads(migrate.stdout.strip())
+        self.assertEqual(summary["files"], 2)
+        self.assertEqual(summary["entries_added"], 2)
+        self.assertTrue((data_dir / "ledger.sqlite3").exists())
+
+        queries = [
+            ("--invoked-skill", "specy"),
+            ("--workspace", str(self.workspace)),
+            ("--mode", "code"),
+            ("--parent-session-id", "sess-root"),
+            ("--from", "2026-01-03"),
+            ("--match", "TELEMETRY"),
+        ]
+        for query in queries:
+            with self.subTest(query=query):
+                sqlite_result = self.run_cli("filter", *query)
+                jsonl_result = self.run_cli("--store", "jsonl", "filter", *query)
+                self.assertEqual(sqlite_result.returncode, 0, msg=sqlite_result.stderr)
+                self.assertTrue(sqlite_result.stdout.strip())
+                self.assertEqual(sqlite_result.stdout, jsonl_result.stdout)
+
+        appended = self.run_cli("append", "sess-new", "added", "after", "migrate")
+        self.assertEqual(appended.returncode, 0, msg=appended.stderr)
+        with (data_dir / "ledger-2026-01-03.md").open("a", encoding="utf-8") as handle:
+            handle.write(
+                json.dumps(
+                    {
+                        "time": "2026-01-03 12:00",
+                        "workspace": "/tmp/other-workspace",
+                        "session": "sess-external",
+                        "msg": "written by another tool",
+                    },
+                    ensure_ascii=True,
+                )
+                + "\n"
+            )
+
+        for session in ("sess-new", "sess-external"):
+            with self.subTest(session=session):
+                result = self.run_cli("--store", "sqlite", "filter", "--session", session)
+                self.assertEqual(result.returncode, 0, msg=result.stderr)
+                self.assertEqual(json.loads(result.stdout.strip())["session"], session)
+
+    def test_match_uses_substring_semantics_on_both_stores(self) -> None:
+        data_dir = self.root / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        messages = [
+            "foobar rollout",
+            "Foo-Bar.qux (retry)",
+            "Ünïcode ÄBC done",
+            "a b",
+            "plain words",
+        ]
+        (data_dir / "ledger-2026-01-02.md").write_text(
+            "".join(
+                json.dumps(
+                    {"time": f"2026-01-02 10:0{index}", "session": "sess", "msg": msg},
+                    ensure_ascii=True,
+                )
+                + "\n"
+                for index, msg in enumerate(messages)
+            ),
+            encoding="utf-8",
+        )
+        migrate = self.run_cli("migrate")
+        self.assertEqual(migrate.returncode, 0, msg=migrate.stderr)
+
+        expected = {
+            "foo": ["foobar rollout", "Foo-Bar.qux (retry)"],
+            "OBA": ["foobar rollout"],
+            "bar.q": ["Foo-Bar.qux (retry)"],
+            "(retry)": ["Foo-Bar.qux (retry)"],
+            'x "(': [],
+            "äbc": ["Ünïcode ÄBC done"],
+            "b": ["foobar rollout", "Foo-Bar.qux (retry)", "Ünïcode ÄBC done", "a b"],
+            "fo ll": ["foobar rollout"],
+        }
+        for term, msgs in expected.items():
+            with self.subTest(term=term):
+                sqlite_result = self.run_cli("--store", "sqlite", "filter", "--match", term)
+                jsonl_result = self.run_cli("--store", "jsonl", "filter", "--match", term)
+                self.assertEqual(sqlite_result.returncode, 0, msg=sqlite_result.stderr)
+                self.assertEqual(sqlite_result.stdout, jsonl_result.stdout)
+                self.assertEqual(
+                    [json.loads(line)["msg"] for line in sqlite_result.stdout.splitlines()],
+                    msgs,
+                )
+
+    def test_filter_formats_counts_groups_and_limits_on_both_stores(self) -> None:
+        data_dir = self.root / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        entries = [
+            {
+                "time": "2026-01-02 10:00",
+                "workspace": "/tmp/alpha",
+                "session": "sess-a",
+                "msg": "review, with a comma",
+                "invoked_skill": "ag-learn",
+                "invoked_skills": ["ag-learn", "specy"],
+            },
+            {
+                "time": "2026-01-02 11:00",
+                "workspace": "/tmp/alpha",
+                "session": "sess-a",
+                "msg": "second step",
+                "invoked_skill": "ag-learn",
+            },
+            {
+                "time": "2026-01-03 09:00",
+                "workspace": "/tmp/beta",
+                "session": "sess-b",
+                "msg": "no skill here",
+            },
+        ]
+        (data_dir / "ledger-2026-01-02.md").write_text(
+            "".join(json.dumps(entry, ensure_ascii=True) + "\n" for entry in entries[:2]),
+            encoding="utf-8",
+        )
+        (data_dir / "ledger-2026-01-03.md").write_text(
+            json.dumps(entries[2], ensure_ascii=True) + "\n",
+            encoding="utf-8",
+        )
+        migrate = self.run_cli("migrate")
+        self.assertEqual(migrate.returncode, 0, msg=migrate.stderr)
+
+        for store in ("jsonl", "sqlite"):
+            with self.subTest(store=store):
+                count = self.run_cli("--store", store, "filter", "--count")
+                self.assertEqual(count.returncode, 0, msg=count.stderr)
+                self.assertEqual(json.loads(count.stdout), {"count": 3})
+
+                by_skill = self.run_cli("--store", store, "filter", "--group-by", "skill")
+                self.assertEqual(
+                    [json.loads(line) for line in by_skill.stdout.splitlines()],
+                    [
+                        {
+                            "skill": "ag-learn",
+                            "count": 2,
+                            "first_time": "2026-01-02 10:00",
+                            "last_time": "2026-01-02 11:00",
+                        },
+                        {
+                            "skill": "specy",
+                            "count": 1,
+                            "first_time": "2026-01-02 10:00",
+                            "last_time": "2026-01-02 10:00",
+                        },
+                        {
+                            "skill": None,
+                            "count": 1,
+                            "first_time": "2026-01-03 09:00",
+                            "last_time": "2026-01-03 09:00",
+                        },
+                    ],
+                )
+
+                by_workspace = self.run_cli(
+                    "--store", store, "filter", "--group-by", "workspace", "--limit", "1",
+                    "--from", "2026-01-02 10:30",
+                )
+                self.assertEqual(
+                    [json.loads(line)["workspace"] for line in by_workspace.stdout.splitlines()],
+                    ["/tmp/alpha"],
+                )
+
+                limited = self.run_cli("--store", store, "filter", "--limit", "2")
+                self.assertEqual(
+                    [json.loads(line) for line in limited.stdout.splitlines()], entries[:2]
+                )
+
+                as_csv = self.run_cli("--store", store, "filter", "--format", "csv")
+                rows = list(csv.DictReader(io.StringIO(as_csv.stdout)))
+                self.assertEqual([row["msg"] for row in rows], [entry["msg"] for entry in entries])
+                self.assertEqual(rows[0]["invoked_skills"], "ag-learn;specy")
+
+                as_msgpack = subprocess.run(
+                    [
+                        sys.executable,
+                        str(SCRIPT_PATH),
+                        "--root",
+                        str(self.root),
+                        "--store",
+                        store,
+                        "filter",
+                        "--format",
+                        "msgpack",
+                    ],
+                    cwd=str(self.workspace),
+                    capture_output=True,
+                    check=False,
+                )
+                self.assertEqual(as_msgpack.returncode, 0, msg=as_msgpack.stderr)
+                self.assertEqual(decode_msgpack_stream(as_msgpack.stdout), entries)
+
+        bad_limit = self.run_cli("filter", "--limit", "0")
+        self.assertEqual(bad_limit.returncode, 2)
+
+    def test_sqlite_store_requires_migrate(self) -> None:
+        result = self.run_cli("--store", "sqlite", "filter")
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("ag-ledger migrate", result.stderr)
+
     def test_init_prints_deprecation_and_leaves_agents_unchanged(self) -> None:
         agents_file = self.workspace / "AGENTS.md"
         original = "# Workspace Instructions\n"
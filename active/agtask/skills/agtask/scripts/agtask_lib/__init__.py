@@ -0,0 +1,6 @@
+"""Implementation modules behind the `agtask` CLI entrypoint.
+
+`core` holds the shared ledger model. Each remaining module backs one command
+family and is imported only when that command runs, so hook invocations avoid
+the dashboard, audit, and argument-parsing code.
+"""
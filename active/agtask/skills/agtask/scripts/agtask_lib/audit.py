@@ -0,0 +1,281 @@
+"""Archive audit planning against model-mediated Codex observations."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from typing import Any, Optional, TYPE_CHECKING
+
+from .core import (
+    TaskError,
+    append_rollout,
+    emit,
+    fresh_event_id,
+    open_database,
+    transition_thread,
+    utc_now,
+)
+
+if TYPE_CHECKING:
+    import argparse
+
+
+AUDIT_OBSERVATIONS_SCHEMA_VERSION = 1
+AUDIT_LOOKUP_STATES = {"archived", "not_archived", "missing", "error"}
+AUDIT_TASK_FIELDS = (
+    "id",
+    "session_id",
+    "parent_session_id",
+    "project",
+    "title",
+    "updated",
+    "status",
+)
+
+
+def parse_audit_observations(text: str) -> dict[str, dict[str, str]]:
+    def unique_object(pairs: list[tuple[str, Any]]) -> dict[str, Any]:
+        value: dict[str, Any] = {}
+        for key, item in pairs:
+            if key in value:
+                raise TaskError(f"duplicate audit JSON key: {key}")
+            value[key] = item
+        return value
+
+    try:
+        document = json.loads(text, object_pairs_hook=unique_object)
+    except json.JSONDecodeError as error:
+        raise TaskError(f"invalid audit observations JSON: {error.msg}") from error
+    if not isinstance(document, dict):
+        raise TaskError("audit observations must be a JSON object")
+    if set(document) != {"schema_version", "sessions"}:
+        raise TaskError(
+            "audit observations require exactly schema_version and sessions"
+        )
+    if (
+        type(document["schema_version"]) is not int
+        or document["schema_version"] != AUDIT_OBSERVATIONS_SCHEMA_VERSION
+    ):
+        raise TaskError(
+            "unsupported audit observations schema_version: "
+            f"{document['schema_version']!r}"
+        )
+    sessions = document["sessions"]
+    if not isinstance(sessions, list):
+        raise TaskError("audit observations sessions must be an array")
+    observations: dict[str, dict[str, str]] = {}
+    for index, value in enumerate(sessions):
+        if not isinstance(value, dict):
+            raise TaskError(f"audit observation {index} must be a JSON object")
+        allowed = {"session_id", "state", "detail"}
+        if not {"session_id", "state"} <= set(value) or set(value) - allowed:
+            raise TaskError(
+                f"audit observation {index} requires session_id and state "
+                "with optional detail"
+            )
+        session_id = value["session_id"]
+        state = value["state"]
+        if not isinstance(session_id, str) or not session_id.strip():
+            raise TaskError(
+                f"audit observation {index} session_id must be a nonempty string"
+            )
+        if session_id != session_id.strip():
+            raise TaskError(
+                f"audit observation {index} session_id must not contain "
+                "surrounding whitespace"
+            )
+        if not isinstance(state, str) or state not in AUDIT_LOOKUP_STATES:
+            raise TaskError(f"unsupported archive lookup state: {state!r}")
+        detail = value.get("detail")
+        if state == "error":
+            if not isinstance(detail, str) or not detail.strip():
+                raise TaskError("error archive observation requires detail")
+        elif detail is not None:
+            raise TaskError("only error archive observations accept detail")
+        if session_id in observations:
+            raise TaskError(f"duplicate archive observation for {session_id}")
+        observation = {"session_id": session_id, "state": state}
+        if detail is not None:
+            observation["detail"] = detail
+        observations[session_id] = observation
+    return observations
+
+
+def active_audit_tasks(connection: sqlite3.Connection) -> list[dict[str, Any]]:
+    fields = ",".join(AUDIT_TASK_FIELDS)
+    return [
+        dict(row)
+        for row in connection.execute(
+            f"SELECT {fields} FROM thread WHERE status='active' "
+            "ORDER BY session_id,id"
+        )
+    ]
+
+
+def audit_plan_token(
+    active_tasks: list[dict[str, Any]],
+    affected_tasks: list[dict[str, Any]],
+    observations: dict[str, dict[str, str]],
+) -> Optional[str]:
+    if not affected_tasks:
+        return None
+    payload = {
+        "version": 1,
+        "tasks": [
+            {
+                "id": task["id"],
+                "session_id": task["session_id"],
+                "updated": task["updated"],
+                "lookup_state": observations.get(
+                    task["session_id"], {"state": "unobserved"}
+                )["state"],
+            }
+            for task in active_tasks
+        ],
+    }
+    encoded = json.dumps(
+        payload, separators=(",", ":"), sort_keys=True
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def audit_report(
+    connection: sqlite3.Connection,
+    observations: Optional[dict[str, dict[str, str]]],
+) -> dict[str, Any]:
+    active_tasks = active_audit_tasks(connection)
+    report: dict[str, Any] = {
+        "phase": "lookup_required" if observations is None else "complete",
+        "applied": False,
+        "active_tasks": active_tasks,
+        "lookup_requests": [
+            {"session_id": task["session_id"]} for task in active_tasks
+        ],
+        "affected_tasks": [],
+        "unresolved": [],
+        "ignored_observations": [],
+        "plan_token": None,
+    }
+    if observations is None:
+        return report
+
+    active_session_ids = {task["session_id"] for task in active_tasks}
+    report["ignored_observations"] = sorted(
+        set(observations) - active_session_ids
+    )
+    for task in active_tasks:
+        observation = observations.get(task["session_id"])
+        if observation is None:
+            report["unresolved"].append(
+                {
+                    "id": task["id"],
+                    "session_id": task["session_id"],
+                    "lookup_state": "unobserved",
+                }
+            )
+            continue
+        state = observation["state"]
+        if state == "archived":
+            report["affected_tasks"].append(task)
+        elif state in {"missing", "error"}:
+            unresolved = {
+                "id": task["id"],
+                "session_id": task["session_id"],
+                "lookup_state": state,
+            }
+            if "detail" in observation:
+                unresolved["detail"] = observation["detail"]
+            report["unresolved"].append(unresolved)
+    report["unresolved"].sort(key=lambda value: (value["session_id"], value["id"]))
+    report["plan_token"] = audit_plan_token(
+        active_tasks, report["affected_tasks"], observations
+    )
+    if report["affected_tasks"]:
+        report["phase"] = "confirmation_required"
+    return report
+
+
+def emit_audit(report: dict[str, Any], as_json: bool) -> None:
+    if as_json:
+        emit(report, True)
+        return
+    if report["phase"] == "lookup_required":
+        print(
+            f"Codex archive lookup required for "
+            f"{len(report['active_tasks'])} active task(s)."
+        )
+        for task in report["active_tasks"]:
+            print(f"- {task['title']} [{task['id']}] ({task['session_id']})")
+        return
+    if report["affected_tasks"]:
+        label = "Archived" if report["applied"] else "Active tasks with archived Codex threads"
+        print(f"{label}:")
+        for task in report["affected_tasks"]:
+            print(f"- {task['title']} [{task['id']}] ({task['session_id']})")
+    else:
+        print("No active ledger tasks have confirmed archived Codex threads.")
+    if report["unresolved"]:
+        print("Unresolved Codex archive lookups:")
+        for item in report["unresolved"]:
+            detail = f": {item['detail']}" if "detail" in item else ""
+            print(f"- {item['session_id']}: {item['lookup_state']}{detail}")
+    if report["phase"] == "confirmation_required":
+        print("No ledger changes made.")
+        print(
+            "After explicit user confirmation, re-run with "
+            f"--apply {report['plan_token']}."
+        )
+
+
+def command_audit(args: argparse.Namespace) -> None:
+    if args.apply is not None and args.observations_json is None:
+        raise TaskError("--apply requires --observations-json")
+    observations = (
+        parse_audit_observations(args.observations_json)
+        if args.observations_json is not None
+        else None
+    )
+    connection = open_database(initialize=False)
+    try:
+        if args.apply is None:
+            emit_audit(audit_report(connection, observations), args.json)
+            return
+
+        connection.execute("BEGIN IMMEDIATE")
+        report = audit_report(connection, observations)
+        if not report["affected_tasks"]:
+            connection.commit()
+            emit_audit(report, args.json)
+            return
+        if args.apply != report["plan_token"]:
+            raise TaskError(
+                "audit plan changed; review the affected tasks and obtain "
+                "confirmation again"
+            )
+        timestamp = utc_now()
+        for task in report["affected_tasks"]:
+            transition_thread(
+                connection,
+                thread_id=task["id"],
+                target="done",
+                now=timestamp,
+            )
+            append_rollout(
+                connection,
+                thread_id=task["id"],
+                turn_id=fresh_event_id(),
+                role="meta",
+                message="archival:codex-thread-archived",
+                created=timestamp,
+            )
+        connection.commit()
+        report["phase"] = "complete"
+        report["applied"] = True
+        emit_audit(report, args.json)
+    except Exception:
+        if connection.in_transaction:
+            connection.rollback()
+        raise
+    finally:
+        connection.close()
@@ -0,0 +1,212 @@
+"""Bulk backfill of native Codex rollout JSONL into the ledger."""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+from pathlib import Path
+import sqlite3
+from typing import Any, Generator, Iterator, Optional, TYPE_CHECKING
+
+from .core import (
+    TaskError,
+    archived_rollouts,
+    archived_turn,
+    emit,
+    normalized_message,
+    open_database,
+)
+
+if TYPE_CHECKING:
+    import argparse
+
+
+IMPORT_BATCH_ROWS = 5000
+ROLLOUT_FILE_PATTERN = "rollout-*.jsonl"
+
+# Hooks stay authoritative: the unique rollout_turn_event_idx turns a
+# re-imported or hook-recorded turn into a no-op, and a user row still parked
+# under the bootstrap turn id is not duplicated under its real turn id.
+# Turns a compaction moved to the archive are filtered before insertion.
+IMPORT_ROLLOUT_SQL = """INSERT OR IGNORE INTO rollout(created,thread_id,turn_id,role,message)
+  SELECT :created,:thread_id,:turn_id,:role,:message
+  WHERE NOT EXISTS (
+    SELECT 1 FROM rollout
+    WHERE thread_id=:thread_id AND role=:role AND turn_id='bootstrap' AND message=:message
+  )"""
+
+
+def rollout_files(root: Path) -> list[Path]:
+    if not root.exists():
+        raise TaskError(f"rollout path does not exist: {root}")
+    if root.is_file():
+        return [root]
+    return sorted(root.rglob(ROLLOUT_FILE_PATTERN))
+
+
+def ledger_timestamp(value: Any, path: Path, line_number: int) -> str:
+    if not isinstance(value, str):
+        raise TaskError(f"missing timestamp in {path}:{line_number}")
+    try:
+        moment = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as error:
+        raise TaskError(f"invalid timestamp in {path}:{line_number}") from error
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=dt.timezone.utc)
+    return (
+        moment.astimezone(dt.timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def rollout_records(path: Path) -> Generator[tuple[int, dict[str, Any]], None, None]:
+    """Stream complete JSON lines; a trailing partial line is still being written."""
+    with path.open("rb") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.endswith(b"\n"):
+                return
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as error:
+                raise TaskError(f"invalid JSON in {path}:{line_number}") from error
+            if isinstance(record, dict):
+                yield line_number, record
+
+
+def rollout_session_id(records: Iterator[tuple[int, dict[str, Any]]]) -> Optional[str]:
+    for _line_number, record in records:
+        if record.get("type") != "session_meta":
+            continue
+        payload = record.get("payload")
+        if isinstance(payload, dict) and isinstance(payload.get("id"), str):
+            return payload["id"]
+        return None
+    return None
+
+
+def rollout_turns(
+    path: Path,
+    thread_id: str,
+    records: Iterator[tuple[int, dict[str, Any]]],
+) -> Iterator[dict[str, str]]:
+    """Yield the rows the UserPromptSubmit and Stop hooks would have recorded.
+
+    Codex opens each turn with `task_started`, logs the prompt as a
+    `user_message` event, and closes the turn with `task_complete`, whose
+    `last_agent_message` is the Stop hook's `last_assistant_message`.
+    """
+    turn_id: Optional[str] = None
+    for line_number, record in records:
+        if record.get("type") != "event_msg":
+            continue
+        payload = record.get("payload")
+        if not isinstance(payload, dict):
+            continue
+        kind = payload.get("type")
+        if kind == "task_started":
+            started = payload.get("turn_id")
+            turn_id = started if isinstance(started, str) and started else None
+            continue
+        if kind == "user_message":
+            role, text, current = "user", payload.get("message"), turn_id
+        elif kind == "task_complete":
+            completed = payload.get("turn_id")
+            current = completed if isinstance(completed, str) and completed else turn_id
+            role, text = "assistant", payload.get("last_agent_message")
+            turn_id = None
+        else:
+            continue
+        if current is None or not isinstance(text, str):
+            continue
+        try:
+            message = normalized_message(text)
+        except TaskError:
+            continue
+        yield {
+            "created": ledger_timestamp(record.get("timestamp"), path, line_number),
+            "thread_id": thread_id,
+            "turn_id": current,
+            "role": role,
+            "message": message,
+        }
+
+
+def insert_rollout_batch(
+    connection: sqlite3.Connection, rows: list[dict[str, str]]
+) -> int:
+    """Insert one batch in a single write transaction.
+
+    SQLite checks unique indexes per row, so only the foreign keys can wait
+    for the commit; the batch still pays one journal sync instead of one per
+    turn.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute("PRAGMA defer_foreign_keys=ON")
+        inserted = connection.executemany(IMPORT_ROLLOUT_SQL, rows).rowcount
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return inserted
+
+
+def import_rollouts(
+    connection: sqlite3.Connection, root: Path, *, batch_rows: int = IMPORT_BATCH_ROWS
+) -> dict[str, Any]:
+    threads = {
+        row["session_id"]: row["id"]
+        for row in connection.execute("SELECT session_id,id FROM thread")
+    }
+    report = {
+        "root": str(root),
+        "files": 0,
+        "tracked_files": 0,
+        "turns": 0,
+        "inserted": 0,
+    }
+    archives: dict[str, list[dict[str, Any]]] = {}
+    batch: list[dict[str, str]] = []
+    for path in rollout_files(root):
+        report["files"] += 1
+        records = rollout_records(path)
+        thread_id = threads.get(rollout_session_id(records))
+        if thread_id is None:
+            records.close()
+            continue
+        report["tracked_files"] += 1
+        if thread_id not in archives:
+            archives[thread_id] = archived_rollouts(connection, thread_id) or []
+        archived = archives[thread_id]
+        for row in rollout_turns(path, thread_id, records):
+            if archived and archived_turn(
+                archived, role=row["role"], turn_id=row["turn_id"], message=row["message"]
+            ):
+                report["turns"] += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                report["inserted"] += insert_rollout_batch(connection, batch)
+                report["turns"] += len(batch)
+                batch = []
+    if batch:
+        report["inserted"] += insert_rollout_batch(connection, batch)
+        report["turns"] += len(batch)
+    report["existing"] = report["turns"] - report["inserted"]
+    return report
+
+
+def command_import_rollouts(args: argparse.Namespace) -> None:
+    if args.batch_rows < 1:
+        raise TaskError("--batch-rows must be at least 1")
+    connection = open_database(initialize=False)
+    try:
+        report = import_rollouts(
+            connection, Path(args.root).expanduser(), batch_rows=args.batch_rows
+        )
+    finally:
+        connection.close()
+    emit(report, args.json)
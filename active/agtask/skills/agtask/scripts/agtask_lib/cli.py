@@ -0,0 +1,843 @@
+"""Argument parsing and the remaining direct subcommands."""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import importlib
+import json
+import os
+from pathlib import Path
+import shlex
+import sqlite3
+import sys
+import tempfile
+from typing import Any, Callable
+
+from .core import (
+    CONFIG_FILENAME,
+    DASHBOARD_DIRECTIONS,
+    DASHBOARD_SEARCH_SCOPES,
+    DASHBOARD_SORT_FIELDS,
+    DASHBOARD_STATUSES,
+    MANUAL_STATUSES,
+    RENAME_PLAN_VERSION,
+    SCHEMA_VERSION,
+    TERMINAL_STATUSES,
+    TaskError,
+    append_rollout,
+    cancel_merge_slot,
+    claim_merge_slot,
+    database_path,
+    default_global_configuration,
+    emit,
+    fresh_event_id,
+    heartbeat_merge_slot,
+    hooks_path,
+    lifecycle_result,
+    load_configuration,
+    merge_claim_result,
+    mode,
+    open_database,
+    open_readonly_database,
+    record_turn,
+    rename_plan,
+    rename_thread,
+    require_merge_token,
+    selected_thread_id,
+    thread_by_session,
+    thread_dict,
+    transition_manual_status,
+    transition_thread,
+    utc_now,
+    validate_title,
+)
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+
+
+def subcommand(module: str, name: str) -> Callable[[argparse.Namespace], None]:
+    """Defer importing a subcommand module until its command actually runs."""
+
+    def handler(args: argparse.Namespace) -> None:
+        getattr(importlib.import_module(f".{module}", __package__), name)(args)
+
+    return handler
+
+
+def command_init(args: argparse.Namespace) -> None:
+    configuration_path = Path.home() / CONFIG_FILENAME
+    configuration_created = False
+    if not configuration_path.exists():
+        configuration_created = atomic_json_update(
+            configuration_path,
+            lambda _document: default_global_configuration(),
+            "agtask",
+        )
+    connection = open_database(initialize=True)
+    connection.close()
+    emit(
+        {
+            "configuration": str(configuration_path),
+            "configuration_created": configuration_created,
+            "database": str(database_path()),
+            "schema_version": SCHEMA_VERSION,
+        },
+        args.json,
+    )
+
+
+def command_doctor(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=False, verify=True)
+    try:
+        integrity = [row[0] for row in connection.execute("PRAGMA quick_check")]
+        if integrity != ["ok"]:
+            raise TaskError(f"ledger integrity check failed: {integrity[0]}")
+        if connection.execute("PRAGMA foreign_key_check").fetchone() is not None:
+            raise TaskError("ledger foreign-key check failed")
+    finally:
+        connection.close()
+    emit(
+        {
+            "database": str(database_path()),
+            "integrity": "ok",
+            "schema_version": SCHEMA_VERSION,
+        },
+        args.json,
+    )
+
+
+def command_config(args: argparse.Namespace) -> None:
+    emit(
+        {
+            "defaults": args.configuration["defaults"],
+            "hooks": args.configuration["hooks"],
+            "sources": args.configuration["sources"],
+            "precedence": args.configuration["precedence"],
+        },
+        args.json,
+    )
+
+
+def command_show(args: argparse.Namespace) -> None:
+    connection = open_readonly_database()
+    try:
+        thread_id = selected_thread_id(connection, args)
+        emit(thread_dict(connection, thread_id), args.json)
+    finally:
+        connection.close()
+
+
+def command_rename(args: argparse.Namespace) -> None:
+    validate_title(args.title)
+    connection = open_database(initialize=False)
+    if args.apply is None:
+        try:
+            row = thread_by_session(connection, args.session_id)
+            if row is None:
+                raise TaskError(f"thread is not tracked: {args.session_id}")
+            emit(rename_plan(row, args.title), args.json)
+        finally:
+            connection.close()
+        return
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        row = thread_by_session(connection, args.session_id)
+        if row is None:
+            raise TaskError(f"thread is not tracked: {args.session_id}")
+        plan = rename_plan(row, args.title)
+        if args.apply != plan["plan_token"]:
+            raise TaskError(
+                "stale rename plan: tracked title or requested title changed"
+            )
+        changed = rename_thread(
+            connection,
+            thread_id=row["id"],
+            expected_title=row["title"],
+            title=args.title,
+        )
+        connection.commit()
+        emit(
+            {
+                "phase": "complete",
+                "plan_version": RENAME_PLAN_VERSION,
+                "applied": True,
+                "changed": changed,
+                "plan_token": args.apply,
+                "thread": thread_dict(connection, row["id"]),
+            },
+            args.json,
+        )
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def command_list(args: argparse.Namespace) -> None:
+    connection = open_readonly_database()
+    try:
+        sql = "SELECT * FROM thread"
+        params: list[Any] = []
+        if args.status:
+            sql += " WHERE status=?"
+            params.append(args.status)
+        sql += " ORDER BY updated DESC, created DESC LIMIT ?"
+        params.append(args.limit)
+        emit([dict(row) for row in connection.execute(sql, params)], args.json)
+    finally:
+        connection.close()
+
+
+def search_rollouts(
+    connection: sqlite3.Connection, literal: str, limit: int
+) -> list[dict[str, Any]]:
+    # Rank threads by their best-matching rollout, then build snippets for the
+    # returned page only; snippet() is the costly part of a broad match.
+    rows = connection.execute(
+        "WITH hits AS ("
+        "SELECT rollout.id AS rollout_id,rollout.thread_id,rollout.created,rollout.role,"
+        "bm25(rollout_fts) AS rank "
+        "FROM rollout_fts JOIN rollout ON rollout.id=rollout_fts.rowid "
+        "WHERE rollout_fts MATCH ?), "
+        "ranked AS (SELECT *,"
+        "ROW_NUMBER() OVER (PARTITION BY thread_id ORDER BY rank,created DESC,rollout_id DESC) "
+        "AS position,COUNT(*) OVER (PARTITION BY thread_id) AS matches FROM hits) "
+        "SELECT thread.*,ranked.rank,ranked.matches,ranked.rollout_id,"
+        "ranked.role AS match_role,ranked.created AS match_created "
+        "FROM ranked JOIN thread ON thread.id=ranked.thread_id "
+        "WHERE ranked.position=1 ORDER BY ranked.rank,thread.updated DESC LIMIT ?",
+        (literal, limit),
+    ).fetchall()
+    results = [dict(row) for row in rows]
+    if not results:
+        return results
+    rollout_ids = [result["rollout_id"] for result in results]
+    snippets = dict(
+        connection.execute(
+            "SELECT rowid,snippet(rollout_fts,0,'[',']','…',16) FROM rollout_fts "
+            f"WHERE rollout_fts MATCH ? AND rowid IN ({','.join('?' * len(rollout_ids))})",
+            (literal, *rollout_ids),
+        ).fetchall()
+    )
+    for result in results:
+        result["snippet"] = snippets[result.pop("rollout_id")]
+    return results
+
+
+def command_search(args: argparse.Namespace) -> None:
+    connection = open_readonly_database()
+    try:
+        literal = '"' + args.query.replace('"', '""') + '"'
+        if args.scope == "rollouts":
+            emit(search_rollouts(connection, literal, args.limit), args.json)
+            return
+        rows = connection.execute(
+            "SELECT thread.*, bm25(thread_fts) AS rank "
+            "FROM thread_fts JOIN thread ON thread.rowid=thread_fts.rowid "
+            "WHERE thread_fts MATCH ? ORDER BY rank, thread.updated DESC LIMIT ?",
+            (literal, args.limit),
+        ).fetchall()
+        emit([dict(row) for row in rows], args.json)
+    except sqlite3.OperationalError as error:
+        raise TaskError(f"invalid FTS query: {error}") from error
+    finally:
+        connection.close()
+
+
+def command_status(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=False)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        thread_id = selected_thread_id(connection, args)
+        transition_manual_status(
+            connection, thread_id=thread_id, target=args.status
+        )
+        connection.commit()
+        emit(thread_dict(connection, thread_id), args.json)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def command_reopen(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=False)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        thread_id = selected_thread_id(connection, args)
+        row = connection.execute("SELECT status FROM thread WHERE id=?", (thread_id,)).fetchone()
+        if row["status"] in TERMINAL_STATUSES:
+            transition_thread(connection, thread_id=thread_id, target="active")
+        connection.commit()
+        emit(thread_dict(connection, thread_id), args.json)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def command_close(args: argparse.Namespace) -> None:
+    event = "OnPreClose" if args.prepare else "OnPostClose"
+    if (args.heartbeat or args.cancel) and not args.merge_token:
+        raise TaskError("--heartbeat and --cancel require --merge-token")
+    if args.prepare and args.merge_token:
+        raise TaskError("--prepare does not accept --merge-token")
+    if args.if_tracked and not database_path().exists():
+        untracked = {"status": "untracked"}
+        untracked["id" if args.id is not None else "session_id"] = (
+            args.id if args.id is not None else args.session_id
+        )
+        emit(
+            lifecycle_result(
+                untracked,
+                args.configuration,
+                event,
+                triggered=False,
+            ),
+            args.json,
+        )
+        return
+    connection = open_database(initialize=False)
+    try:
+        try:
+            thread_id = selected_thread_id(connection, args)
+        except TaskError:
+            if args.if_tracked:
+                untracked = {"status": "untracked"}
+                untracked["id" if args.id is not None else "session_id"] = (
+                    args.id if args.id is not None else args.session_id
+                )
+                emit(
+                    lifecycle_result(
+                        untracked,
+                        args.configuration,
+                        event,
+                        triggered=False,
+                    ),
+                    args.json,
+                )
+                return
+            raise
+        row = connection.execute("SELECT status FROM thread WHERE id=?", (thread_id,)).fetchone()
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute("SELECT status FROM thread WHERE id=?", (thread_id,)).fetchone()
+        if row is None:
+            raise TaskError(f"thread is not tracked: {thread_id}")
+        if args.prepare:
+            claim = claim_merge_slot(connection, thread_id=thread_id)
+            connection.commit()
+            result = lifecycle_result(
+                thread_dict(connection, thread_id),
+                args.configuration,
+                "OnPreClose",
+                triggered=claim["state"] == "claimed",
+            )
+            result["merge_claim"] = claim
+            emit(result, args.json)
+            return
+        if args.heartbeat:
+            claim = heartbeat_merge_slot(
+                connection, thread_id=thread_id, token=args.merge_token
+            )
+            connection.commit()
+            result = lifecycle_result(
+                thread_dict(connection, thread_id),
+                args.configuration,
+                "OnPreClose",
+                triggered=False,
+            )
+            result["merge_claim"] = claim
+            emit(result, args.json)
+            return
+        if args.cancel:
+            claim = cancel_merge_slot(
+                connection, thread_id=thread_id, token=args.merge_token
+            )
+            connection.commit()
+            result = lifecycle_result(
+                thread_dict(connection, thread_id),
+                args.configuration,
+                "OnPreClose",
+                triggered=False,
+            )
+            result["merge_claim"] = claim
+            emit(result, args.json)
+            return
+        closed = row["status"] not in TERMINAL_STATUSES
+        if closed:
+            if not args.merge_token:
+                raise TaskError("closing a non-terminal thread requires --merge-token")
+            claim = require_merge_token(
+                connection, thread_id=thread_id, token=args.merge_token
+            )
+            if row["status"] != "merging":
+                raise TaskError("closing requires the thread to be in merging status")
+            now = utc_now()
+            transition_thread(connection, thread_id=thread_id, target="done", now=now)
+            append_rollout(
+                connection,
+                thread_id=thread_id,
+                turn_id=fresh_event_id(),
+                role="meta",
+                message="finalization:completed",
+                created=now,
+            )
+            connection.execute(
+                "DELETE FROM project_merge_claim WHERE project=?", (claim["project"],)
+            )
+        connection.commit()
+        result = lifecycle_result(
+            thread_dict(connection, thread_id),
+            args.configuration,
+            "OnPostClose",
+            triggered=closed,
+        )
+        if closed:
+            result["merge_claim"] = merge_claim_result(
+                connection, project=claim["project"], state="completed"
+            )
+        emit(result, args.json)
+    except Exception:
+        if connection.in_transaction:
+            connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def command_append_rollout(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=False)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        thread_id = selected_thread_id(connection, args)
+        append_rollout(
+            connection,
+            thread_id=thread_id,
+            turn_id=args.turn_id,
+            role=args.role,
+            message=args.message,
+        )
+        connection.commit()
+        emit(thread_dict(connection, thread_id), args.json)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def command_record_turn(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=False)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        thread_id = selected_thread_id(connection, args)
+        record_turn(
+            connection,
+            thread_id=thread_id,
+            role=args.role,
+            turn_id=args.turn_id,
+            content=args.content,
+            summary=args.summary,
+        )
+        connection.commit()
+        emit(thread_dict(connection, thread_id), args.json)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def is_agtask_hook_command(value: Any) -> bool:
+    if not isinstance(value, str):
+        return False
+    try:
+        tokens = shlex.split(value)
+    except ValueError:
+        return False
+    if len(tokens) >= 2 and Path(tokens[-1]).name == "agtask-hook":
+        cli = Path(tokens[-1])
+    elif len(tokens) >= 3 and tokens[-1] == "hook" and Path(tokens[-2]).name == "agtask":
+        cli = Path(tokens[-2])
+    else:
+        return False
+    return cli.parent.name == "scripts" and cli.parent.parent.name == "agtask"
+
+
+def owned_group(group: Any, command: str) -> bool:
+    if not isinstance(group, dict):
+        return False
+    handlers = group.get("hooks")
+    return isinstance(handlers, list) and any(
+        isinstance(handler, dict)
+        and (
+            handler.get("command") == command
+            or is_agtask_hook_command(handler.get("command"))
+        )
+        for handler in handlers
+    )
+
+
+def desired_hook_groups(command: str) -> dict[str, dict[str, Any]]:
+    handler = {"type": "command", "command": command, "timeout": 5}
+    return {
+        "SessionStart": {
+            "matcher": "^(startup|resume|clear|compact)$",
+            "hooks": [handler.copy()],
+        },
+        "UserPromptSubmit": {"hooks": [handler.copy()]},
+        "Stop": {"hooks": [handler.copy()]},
+        "PostCompact": {"matcher": "^(manual|auto)$", "hooks": [handler.copy()]},
+    }
+
+
+def atomic_json_update(path: Path, transform: Any, backup_label: str) -> bool:
+    original_exists = path.exists()
+    original_bytes = path.read_bytes() if original_exists else b""
+    original_mode = mode(path) if original_exists else 0o600
+    if original_exists:
+        try:
+            document = json.loads(original_bytes)
+        except json.JSONDecodeError as error:
+            raise TaskError(f"invalid JSON in {path}: {error}") from error
+        if not isinstance(document, dict):
+            raise TaskError(f"JSON root must be an object: {path}")
+    else:
+        document = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    updated = transform(document)
+    new_bytes = (json.dumps(updated, indent=2) + "\n").encode("utf-8")
+    if original_exists and json.loads(original_bytes) == updated:
+        return False
+
+    current_bytes = path.read_bytes() if path.exists() else b""
+    if current_bytes != original_bytes:
+        raise TaskError(f"concurrent modification detected: {path}")
+
+    if original_exists:
+        stamp = dt.datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+        backup = path.with_name(f"{path.name}.{backup_label}.{stamp}.bak")
+        descriptor = os.open(backup, os.O_WRONLY | os.O_CREAT | os.O_EXCL, original_mode)
+        with os.fdopen(descriptor, "wb") as stream:
+            stream.write(original_bytes)
+            stream.flush()
+            os.fsync(stream.fileno())
+
+    descriptor, temporary_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    temporary = Path(temporary_name)
+    try:
+        os.chmod(temporary, original_mode)
+        with os.fdopen(descriptor, "wb") as stream:
+            stream.write(new_bytes)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(temporary, path)
+        directory_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+    return True
+
+
+def update_hooks(install: bool, *, daemon: bool = False) -> bool:
+    cli = SCRIPTS_DIR / "agtask"
+    if daemon:
+        command = f"python3 {shlex.quote(str(cli.with_name('agtask-hook')))}"
+    else:
+        command = f"python3 {shlex.quote(str(cli))} hook"
+    desired = desired_hook_groups(command)
+
+    def transform(document: dict[str, Any]) -> dict[str, Any]:
+        hooks = document.setdefault("hooks", {})
+        if not isinstance(hooks, dict):
+            raise TaskError("hooks.json field 'hooks' must be an object")
+        for event, group in desired.items():
+            groups = hooks.get(event, [])
+            if not isinstance(groups, list):
+                raise TaskError(f"hooks.json event {event} must be a list")
+            groups = [candidate for candidate in groups if not owned_group(candidate, command)]
+            if install:
+                groups.append(group)
+            if groups:
+                hooks[event] = groups
+            else:
+                hooks.pop(event, None)
+        return document
+
+    return atomic_json_update(hooks_path(), transform, "agtask")
+
+
+def command_install_hooks(args: argparse.Namespace) -> None:
+    changed = update_hooks(True, daemon=args.daemon)
+    emit(
+        {
+            "changed": changed,
+            "daemon": args.daemon,
+            "hooks_file": str(hooks_path()),
+            "trust": "manual-review-required",
+            "trust_action": "Open /hooks in the Codex TUI and approve each agtask handler.",
+        },
+        args.json,
+    )
+
+
+def command_uninstall_hooks(args: argparse.Namespace) -> None:
+    changed = update_hooks(False)
+    emit({"changed": changed, "hooks_file": str(hooks_path())}, args.json)
+
+
+def add_common_json(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--json", action="store_true")
+
+
+def add_thread_selector(parser: argparse.ArgumentParser) -> None:
+    selector = parser.add_mutually_exclusive_group(required=True)
+    selector.add_argument("--id")
+    selector.add_argument("--session-id")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="agtask")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    resolve_create = subparsers.add_parser("resolve-create")
+    resolve_create.add_argument("--mode", choices=("clean", "fork"), action="append")
+    resolve_create.add_argument("--kind", choices=("main", "child"), action="append")
+    resolve_create.add_argument("--project", action="append")
+    resolve_create.add_argument("--parent-session-id")
+    resolve_create.add_argument("--title", required=True)
+    resolve_create.add_argument(
+        "--worktree", choices=("true", "false"), action="append"
+    )
+    resolve_create.add_argument("--model", action="append")
+    resolve_create.add_argument("--pin", choices=("true", "false"), action="append")
+    resolve_create.add_argument("--nopin", action="store_true")
+    add_common_json(resolve_create)
+    resolve_create.set_defaults(handler=subcommand("registration", "command_resolve_create"))
+
+    init = subparsers.add_parser("init")
+    add_common_json(init)
+    init.set_defaults(handler=command_init)
+
+    doctor = subparsers.add_parser("doctor")
+    add_common_json(doctor)
+    doctor.set_defaults(handler=command_doctor)
+
+    config = subparsers.add_parser("config")
+    add_common_json(config)
+    config.set_defaults(handler=command_config)
+
+    register = subparsers.add_parser("register")
+    register.add_argument("--id", required=True)
+    register.add_argument("--session-id", required=True)
+    register.add_argument("--parent-session-id")
+    register.add_argument("--kind", choices=("main", "child"), required=True)
+    register.add_argument("--project", required=True)
+    register.add_argument("--title", required=True)
+    register.add_argument("--initial-prompt")
+    register.add_argument("--description")
+    register.add_argument("--status", choices=("todo", "active"), default="active")
+    register.add_argument("--authoritative-session", action="store_true")
+    add_common_json(register)
+    register.set_defaults(handler=subcommand("registration", "command_register"))
+
+    add = subparsers.add_parser("add")
+    add.add_argument("project")
+    add.add_argument("--session-id", required=True)
+    add.add_argument("--title", required=True)
+    add.add_argument("--initial-prompt", required=True)
+    add_common_json(add)
+    add.set_defaults(handler=subcommand("registration", "command_add"))
+
+    show = subparsers.add_parser("show")
+    add_thread_selector(show)
+    add_common_json(show)
+    show.set_defaults(handler=command_show)
+
+    rename = subparsers.add_parser("rename")
+    rename.add_argument("--session-id", required=True)
+    rename.add_argument("--title", required=True)
+    rename.add_argument("--apply", metavar="PLAN_TOKEN")
+    add_common_json(rename)
+    rename.set_defaults(handler=command_rename)
+
+    list_parser = subparsers.add_parser("list")
+    list_parser.add_argument(
+        "--status", choices=DASHBOARD_STATUSES
+    )
+    list_parser.add_argument("--limit", type=int, default=50)
+    add_common_json(list_parser)
+    list_parser.set_defaults(handler=command_list)
+
+    search = subparsers.add_parser("search")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument(
+        "--in", dest="scope", choices=("threads", "rollouts"), default="threads"
+    )
+    add_common_json(search)
+    search.set_defaults(handler=command_search)
+
+    dashboard = subparsers.add_parser("dashboard")
+    dashboard.add_argument("--project", action="append")
+    dashboard.add_argument("--parent-session-id", action="append")
+    dashboard.add_argument("--root-parent", action="store_true")
+    dashboard.add_argument("--status", choices=DASHBOARD_STATUSES, action="append")
+    dashboard.add_argument("--sort", choices=DASHBOARD_SORT_FIELDS, default="updated")
+    dashboard.add_argument("--direction", choices=DASHBOARD_DIRECTIONS, default="desc")
+    dashboard.add_argument("--search", default="")
+    dashboard.add_argument(
+        "--search-in", choices=DASHBOARD_SEARCH_SCOPES, default="title"
+    )
+    dashboard.add_argument("--no-open", action="store_true")
+    add_common_json(dashboard)
+    dashboard.set_defaults(handler=subcommand("dashboard", "command_dashboard"))
+
+    stats = subparsers.add_parser("stats")
+    stats.add_argument(
+        "--days", type=int, default=30, help="UTC days to report, ending today"
+    )
+    stats.add_argument(
+        "--project", action="append", default=[], help="Limit to a project; repeatable"
+    )
+    add_common_json(stats)
+    stats.set_defaults(handler=subcommand("stats", "command_stats"))
+
+    status_parser = subparsers.add_parser("status")
+    add_thread_selector(status_parser)
+    status_parser.add_argument("--status", choices=MANUAL_STATUSES, required=True)
+    add_common_json(status_parser)
+    status_parser.set_defaults(handler=command_status)
+
+    reopen = subparsers.add_parser("reopen")
+    add_thread_selector(reopen)
+    add_common_json(reopen)
+    reopen.set_defaults(handler=command_reopen)
+
+    close = subparsers.add_parser("close")
+    add_thread_selector(close)
+    close.add_argument("--if-tracked", action="store_true")
+    close_action = close.add_mutually_exclusive_group()
+    close_action.add_argument(
+        "--prepare",
+        action="store_true",
+        help="Atomically claim the project merge slot and surface OnPreClose",
+    )
+    close_action.add_argument(
+        "--heartbeat",
+        action="store_true",
+        help="Renew an owned project merge claim",
+    )
+    close_action.add_argument(
+        "--cancel",
+        action="store_true",
+        help="Release an owned project merge claim without closing",
+    )
+    close.add_argument("--merge-token")
+    add_common_json(close)
+    close.set_defaults(handler=command_close)
+
+    audit = subparsers.add_parser("audit")
+    audit.add_argument(
+        "--observations-json",
+        help=(
+            "Model-mediated Codex archive observations using the versioned "
+            "audit JSON contract"
+        ),
+    )
+    audit.add_argument(
+        "--apply",
+        metavar="PLAN_TOKEN",
+        help=(
+            "Apply an unchanged audit plan only after the listed tasks received "
+            "explicit user confirmation"
+        ),
+    )
+    add_common_json(audit)
+    audit.set_defaults(handler=subcommand("audit", "command_audit"))
+
+    append = subparsers.add_parser("append-rollout")
+    add_thread_selector(append)
+    append.add_argument("--turn-id", required=True)
+    append.add_argument("--role", choices=("user", "assistant", "meta"), required=True)
+    append.add_argument("--message", required=True)
+    add_common_json(append)
+    append.set_defaults(handler=command_append_rollout)
+
+    record = subparsers.add_parser("record-turn")
+    add_thread_selector(record)
+    record.add_argument("--role", choices=("user", "assistant"), required=True)
+    record.add_argument("--turn-id", required=True)
+    record.add_argument("--content", required=True)
+    record.add_argument("--summary")
+    add_common_json(record)
+    record.set_defaults(handler=command_record_turn)
+
+    import_rollouts = subparsers.add_parser("import-rollouts")
+    import_rollouts.add_argument("root", help="Codex sessions directory or one rollout file")
+    import_rollouts.add_argument(
+        "--batch-rows",
+        type=int,
+        default=5000,
+        help="Rollout rows inserted per write transaction",
+    )
+    add_common_json(import_rollouts)
+    import_rollouts.set_defaults(handler=subcommand("backfill", "command_import_rollouts"))
+
+    compact = subparsers.add_parser("compact")
+    compact.add_argument(
+        "--older-than-days",
+        type=int,
+        default=90,
+        help="Archive rollouts of done or dropped threads closed at least this long ago",
+    )
+    compact.add_argument(
+        "--dry-run", action="store_true", help="Report what would be archived without writing"
+    )
+    add_common_json(compact)
+    compact.set_defaults(handler=subcommand("compact", "command_compact"))
+
+    hook = subparsers.add_parser("hook")
+    hook.set_defaults(handler=subcommand("hook", "command_hook"))
+
+    hookd = subparsers.add_parser("hookd")
+    add_common_json(hookd)
+    hookd.set_defaults(handler=subcommand("hookd", "command_hookd"))
+
+    install_hooks = subparsers.add_parser("install-hooks")
+    install_hooks.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Route hooks through the agtask-hook shim, which forwards to hookd",
+    )
+    add_common_json(install_hooks)
+    install_hooks.set_defaults(handler=command_install_hooks)
+
+    uninstall_hooks = subparsers.add_parser("uninstall-hooks")
+    add_common_json(uninstall_hooks)
+    uninstall_hooks.set_defaults(handler=command_uninstall_hooks)
+    return parser
+
+
+def main() -> int:
+    os.umask(0o077)
+    parser = build_parser()
+    args = parser.parse_args()
+    try:
+        if args.command != "hook":
+            args.configuration = load_configuration()
+        args.handler(args)
+        return 0
+    except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+        print(f"agtask: {error}", file=sys.stderr)
+        return 1
@@ -0,0 +1,222 @@
+"""Rollout retention: archive old terminal-thread history and reclaim ledger space."""
+
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+from typing import Any, TYPE_CHECKING
+
+from .core import (
+    ARCHIVE_DDL,
+    ARCHIVE_TURN_ID,
+    BUSY_TIMEOUT_MS,
+    TaskError,
+    archive_path,
+    decode_rollout_archive,
+    emit,
+    encode_rollout_archive,
+    open_database,
+    prepare_store,
+    record_schema_fingerprint,
+    secure_store_files,
+    utc_now,
+)
+
+if TYPE_CHECKING:
+    import argparse
+
+
+COMPACT_DEFAULT_DAYS = 90
+# VACUUM may renumber implicit rowids, which these external-content indexes key on.
+ROWID_FTS_TABLES = ("thread_fts", "thread_title_fts")
+
+
+def compact_cutoff(days: int) -> str:
+    return (
+        (dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days))
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def compact_candidates(connection: sqlite3.Connection, cutoff: str) -> list[sqlite3.Row]:
+    return connection.execute(
+        "SELECT thread.id, COUNT(rollout.id) AS rollout_count FROM thread "
+        "JOIN rollout ON rollout.thread_id=thread.id "
+        "AND NOT (rollout.role='meta' AND rollout.turn_id=?) "
+        "WHERE thread.status IN ('done', 'drop') AND thread.closed<? "
+        "GROUP BY thread.id ORDER BY thread.closed, thread.id",
+        (ARCHIVE_TURN_ID, cutoff),
+    ).fetchall()
+
+
+def open_archive() -> sqlite3.Connection:
+    path = archive_path()
+    prepare_store(path, repair=True)
+    archive = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        archive.execute(ARCHIVE_DDL)
+        archive.commit()
+        secure_store_files(path, repair=True)
+        return archive
+    except Exception:
+        archive.close()
+        raise
+
+
+def compact_thread(
+    connection: sqlite3.Connection,
+    archive: sqlite3.Connection,
+    *,
+    thread_id: str,
+    cutoff: str,
+) -> int:
+    """Move one thread's live rollouts into its archive blob and leave a marker.
+
+    The ledger write lock is held throughout, and the archive commits before
+    the ledger deletes anything. A crash in between leaves both copies, and
+    the next run merges them again by rollout id.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        eligible = connection.execute(
+            "SELECT 1 FROM thread WHERE id=? AND status IN ('done', 'drop') AND closed<?",
+            (thread_id, cutoff),
+        ).fetchone()
+        rollouts = [
+            dict(row)
+            for row in connection.execute(
+                "SELECT id,created,thread_id,turn_id,role,message FROM rollout "
+                "WHERE thread_id=? AND NOT (role='meta' AND turn_id=?) "
+                "ORDER BY created,id",
+                (thread_id, ARCHIVE_TURN_ID),
+            )
+        ]
+        if eligible is None or not rollouts:
+            connection.rollback()
+            return 0
+
+        stored = archive.execute(
+            "SELECT payload FROM rollout_archive WHERE thread_id=?", (thread_id,)
+        ).fetchone()
+        merged = {
+            rollout["id"]: rollout
+            for rollout in (decode_rollout_archive(stored[0]) if stored else [])
+        }
+        merged.update((rollout["id"], rollout) for rollout in rollouts)
+        history = sorted(merged.values(), key=lambda rollout: (rollout["created"], rollout["id"]))
+        archive.execute(
+            "INSERT INTO rollout_archive(thread_id,archived,rollout_count,payload) "
+            "VALUES (?,?,?,?) ON CONFLICT(thread_id) DO UPDATE SET "
+            "archived=excluded.archived,rollout_count=excluded.rollout_count,"
+            "payload=excluded.payload",
+            (thread_id, utc_now(), len(history), encode_rollout_archive(history)),
+        )
+        archive.commit()
+
+        # Re-inserting the marker before the delete keeps its id above every
+        # archived id, so SQLite never hands an archived id to a later rollout.
+        connection.execute(
+            "DELETE FROM rollout WHERE thread_id=? AND role='meta' AND turn_id=?",
+            (thread_id, ARCHIVE_TURN_ID),
+        )
+        connection.execute(
+            "INSERT INTO rollout(created,thread_id,turn_id,role,message) VALUES (?,?,?,?,?)",
+            (
+                history[-1]["created"],
+                thread_id,
+                ARCHIVE_TURN_ID,
+                "meta",
+                f"{ARCHIVE_TURN_ID}:{len(history)}",
+            ),
+        )
+        connection.execute(
+            "DELETE FROM rollout WHERE thread_id=? AND NOT (role='meta' AND turn_id=?)",
+            (thread_id, ARCHIVE_TURN_ID),
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        archive.rollback()
+        raise
+    return len(rollouts)
+
+
+def reclaim_space(connection: sqlite3.Connection) -> str:
+    """Return freed pages to the filesystem and truncate the WAL.
+
+    Ledgers created before incremental auto-vacuum need one full VACUUM to
+    switch modes; later runs only release the free list.
+    """
+    if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        connection.execute("PRAGMA incremental_vacuum").fetchall()
+        vacuum = "incremental"
+    else:
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.execute("VACUUM")
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ROWID_FTS_TABLES:
+                connection.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            record_schema_fingerprint(connection)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        vacuum = "full"
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return vacuum
+
+
+def compact_ledger(
+    connection: sqlite3.Connection, *, days: int, dry_run: bool
+) -> dict[str, Any]:
+    cutoff = compact_cutoff(days)
+    candidates = compact_candidates(connection, cutoff)
+    report: dict[str, Any] = {
+        "archive": str(archive_path()),
+        "cutoff": cutoff,
+        "dry_run": dry_run,
+        "thread_ids": [row["id"] for row in candidates],
+        "rollouts": sum(row["rollout_count"] for row in candidates),
+        "freed_pages": 0,
+        "vacuum": None,
+    }
+    if dry_run:
+        return report
+
+    pages_before = connection.execute("PRAGMA page_count").fetchone()[0]
+    archived = 0
+    compacted = []
+    if candidates:
+        archive = open_archive()
+        try:
+            for row in candidates:
+                moved = compact_thread(
+                    connection, archive, thread_id=row["id"], cutoff=cutoff
+                )
+                if moved:
+                    archived += moved
+                    compacted.append(row["id"])
+        finally:
+            archive.close()
+    report["thread_ids"] = compacted
+    report["rollouts"] = archived
+    report["vacuum"] = reclaim_space(connection)
+    report["freed_pages"] = max(
+        pages_before - connection.execute("PRAGMA page_count").fetchone()[0], 0
+    )
+    return report
+
+
+def command_compact(args: argparse.Namespace) -> None:
+    if args.older_than_days < 0:
+        raise TaskError("--older-than-days must not be negative")
+    connection = open_database(initialize=False)
+    try:
+        report = compact_ledger(
+            connection, days=args.older_than_days, dry_run=args.dry_run
+        )
+    finally:
+        connection.close()
+    emit(report, args.json)
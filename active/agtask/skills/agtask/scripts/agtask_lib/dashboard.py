@@ -0,0 +1,1978 @@
+"""Local HTML dashboard, task detail pages, and their HTTP server."""
+
+from __future__ import annotations
+
+from collections import Counter
+import contextlib
+import gzip
+import html
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import queue
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterator, NamedTuple, Optional, TYPE_CHECKING
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+import webbrowser
+
+from .core import (
+    ARCHIVE_TURN_ID,
+    DASHBOARD_DIRECTIONS,
+    DASHBOARD_SEARCH_SCOPES,
+    DASHBOARD_SORT_FIELDS,
+    DASHBOARD_STATUSES,
+    MANUAL_STATUSES,
+    StatusConflict,
+    TaskError,
+    archived_rollouts,
+    database_path,
+    emit,
+    open_database,
+    open_readonly_database,
+    schema_fingerprint_matches,
+    transition_manual_status,
+    utc_after,
+)
+from .stats import STATS_MAX_DAYS, stats_report, utc_today
+
+if TYPE_CHECKING:
+    import argparse
+
+
+DASHBOARD_CSP = (
+    "default-src 'none'; style-src 'self'; script-src 'self'; connect-src 'self'; "
+    "img-src 'self' data:; base-uri 'none'; form-action 'none'; frame-ancestors 'none'"
+)
+
+DASHBOARD_HTML = """<!doctype html>
+<html lang="en"><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>agtask dashboard</title><link rel="stylesheet" href="app.css"><script src="app.js" defer></script></head>
+<body><header class="topbar"><div><p class="eyebrow">LOCAL TASK LEDGER</p><h1>agtask dashboard</h1></div><div class="summary" id="summary">Loading tasks…</div></header>
+<main><section class="toolbar" aria-label="Dashboard controls">
+<label class="search">Search<input id="search" type="search" autocomplete="off" placeholder="Search titles"></label>
+<div class="toolbar-actions"><label>Search in<select id="search-in"><option value="title">Titles</option><option value="rollouts">Messages</option></select></label><label>Sort by<select id="sort"><option value="updated">Updated</option><option value="created">Created</option><option value="closed">Closed</option></select></label>
+<label>Direction<select id="direction"><option value="desc">Newest first</option><option value="asc">Oldest first</option></select></label>
+<button id="refresh" class="secondary-button" type="button">Refresh</button><div class="filter-launcher">
+<button id="filter-trigger" class="filter-trigger" type="button" aria-haspopup="dialog" aria-controls="filter-menu" aria-expanded="false"><span aria-hidden="true">＋</span> Add filter</button>
+<div id="filter-menu" class="filter-menu" role="dialog" aria-modal="false" aria-labelledby="filter-menu-title" hidden>
+<div class="filter-menu-header"><button id="filter-menu-back" class="icon-button" type="button" aria-label="Back to filter fields" hidden>←</button><strong id="filter-menu-title">Add filter</strong><button id="filter-menu-close" class="icon-button" type="button" aria-label="Close filter menu">×</button></div>
+<input id="filter-menu-search" class="filter-menu-search" type="search" autocomplete="off" placeholder="Find a filter…" aria-label="Search available filters" aria-controls="filter-menu-list">
+<div id="filter-menu-list" class="filter-menu-list" role="menu"></div></div></div></div>
+</section><section id="filter-bar" class="filter-bar" aria-label="Active filters"><div id="active-filters" class="active-filters"></div><button id="add-filter" class="add-filter" type="button" aria-label="Add another filter" aria-haspopup="dialog" aria-controls="filter-menu" aria-expanded="false">+</button></section>
+<div id="notice" class="notice" role="status" aria-live="polite"></div>
+<section id="activity" class="activity" aria-labelledby="activity-heading" hidden><div class="group-header"><h2 id="activity-heading">Activity</h2><span id="activity-range" class="badge"></span></div><div id="activity-body" class="activity-body"></div></section>
+<div id="groups" class="groups" aria-busy="true"></div></main>
+<div id="status-modal" class="status-modal" role="dialog" aria-modal="true" aria-labelledby="status-heading" hidden>
+<section class="status-dialog"><header class="status-header"><div><p id="status-heading">Change status</p><strong id="status-task-title"></strong></div><button id="status-close" class="icon-button" type="button" aria-label="Close status picker">×</button></header>
+<label class="visually-hidden" for="status-search">Find a status</label><input id="status-search" class="status-search" type="search" autocomplete="off" placeholder="Change status…" aria-controls="status-options">
+<div id="status-options" class="status-options" role="listbox" aria-label="Available statuses"></div><p class="status-guidance">Merging and Done are managed by task close workflows. Drop ends work without completing it.</p><p id="status-error" class="status-error" role="status" aria-live="polite"></p></section></div></body></html>
+"""
+
+TASK_DETAIL_HTML = """<!doctype html>
+<html lang="en"><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Task detail · agtask</title><link rel="stylesheet" href="../app.css"><script src="../task.js" defer></script></head>
+<body class="task-detail-page"><header class="detail-topbar"><a class="back-link" href="../">← All tasks</a></header>
+<main class="detail-layout"><article id="detail-content" class="detail-content" aria-busy="true">
+<h1 id="task-title">Loading task…</h1><p id="task-description" class="task-description"></p>
+<section class="timeline-section" aria-labelledby="timeline-heading"><h2 id="timeline-heading">Timeline <span id="timeline-count" class="badge"></span></h2><ol id="timeline" class="timeline"></ol>
+<button id="timeline-more" class="secondary-button timeline-more" type="button" hidden>Load older entries</button></section>
+</article><aside class="properties" aria-labelledby="properties-heading"><h2 id="properties-heading">Properties</h2>
+<dl><div><dt>Created</dt><dd id="task-created">—</dd></div><div><dt>Updated</dt><dd id="task-updated">—</dd></div><div><dt>Session ID</dt><dd><a id="task-session-id" class="session-link" href="">—</a></dd></div></dl></aside>
+<p id="detail-notice" class="detail-notice" role="status" aria-live="polite"></p></main></body></html>
+"""
+
+DASHBOARD_CSS = """:root { color-scheme:light dark; --bg:#f7f7f8; --panel:#fff; --raised:#fff; --text:#17171a; --muted:#696970; --line:#e4e4e8; --line-strong:#d4d4da; --hover:#f0f0f3; --accent:#5e6ad2; --accent-soft:#eef0ff; --danger:#b42318; font-family:Inter,ui-sans-serif,system-ui,-apple-system,BlinkMacSystemFont,"Segoe UI",sans-serif; }
+@media (prefers-color-scheme:dark) { :root { --bg:#111113; --panel:#19191c; --raised:#202024; --text:#f2f2f3; --muted:#a0a0a8; --line:#303036; --line-strong:#414149; --hover:#29292e; --accent:#8b93ff; --accent-soft:#292c49; --danger:#ff8a80; } }
+* { box-sizing:border-box; } body { margin:0; background:var(--bg); color:var(--text); min-height:100vh; }
+.topbar { display:flex; justify-content:space-between; gap:1rem; align-items:end; padding:2rem clamp(1rem,4vw,3.5rem) 1.25rem; border-bottom:1px solid var(--line); }
+h1 { font-size:clamp(1.5rem,3vw,2.25rem); line-height:1.1; margin:.1rem 0 0; letter-spacing:-.035em; }.eyebrow { color:var(--muted); font-size:.7rem; font-weight:700; letter-spacing:.14em; margin:0; }.summary { color:var(--muted); font-size:.9rem; }
+main { padding:1.25rem clamp(1rem,4vw,3.5rem) 3rem; }.toolbar { position:relative; display:flex; align-items:end; gap:.75rem; padding:1rem; background:var(--panel); border:1px solid var(--line); border-radius:10px 10px 0 0; }.toolbar-actions { display:flex; align-items:end; gap:.65rem; margin-left:auto; }
+label { display:flex; flex-direction:column; gap:.4rem; color:var(--muted); font-size:.72rem; font-weight:650; letter-spacing:.02em; }.search { flex:1 1 20rem; max-width:34rem; }input,select,button { min-height:2.25rem; color:var(--text); background:var(--bg); border:1px solid var(--line); border-radius:6px; padding:.45rem .6rem; font:inherit; }
+button { cursor:pointer; font-weight:650; }button:hover { background:var(--hover); border-color:var(--line-strong); }:focus-visible { outline:3px solid var(--accent); outline-offset:2px; }.secondary-button { background:var(--bg); }.filter-trigger { display:flex; align-items:center; gap:.35rem; background:var(--accent); border-color:var(--accent); color:white; white-space:nowrap; }.filter-trigger:hover { background:var(--accent); filter:brightness(1.08); border-color:var(--accent); }
+.filter-launcher { position:relative; }.filter-menu { position:absolute; z-index:20; top:calc(100% + .5rem); right:0; width:min(21rem,calc(100vw - 2rem)); max-height:min(30rem,calc(100vh - 8rem)); overflow:hidden; padding:.4rem; border:1px solid var(--line-strong); border-radius:10px; background:var(--raised); box-shadow:0 18px 50px rgb(0 0 0 / .24); }.filter-menu[hidden] { display:none; }.filter-menu-header { min-height:2.25rem; display:grid; grid-template-columns:2rem 1fr 2rem; align-items:center; gap:.35rem; padding:.15rem .2rem .35rem; }.filter-menu-header strong { text-align:center; font-size:.82rem; }.icon-button { min-height:1.9rem; width:1.9rem; padding:0; border-color:transparent; background:transparent; color:var(--muted); }.filter-menu-search { width:100%; margin-bottom:.35rem; border-color:transparent; background:var(--bg); }.filter-menu-list { max-height:22rem; overflow:auto; display:grid; gap:.15rem; }.filter-menu-item { width:100%; min-height:2.55rem; display:grid; grid-template-columns:1fr auto; align-items:center; gap:.75rem; padding:.55rem .65rem; border-color:transparent; background:transparent; text-align:left; font-weight:550; }.filter-menu-item:hover,.filter-menu-item[aria-current="true"] { background:var(--hover); }.filter-menu-meta { display:flex; align-items:center; gap:.45rem; color:var(--muted); font-size:.75rem; }.filter-menu-check { color:var(--accent); font-weight:800; }.filter-menu-empty { margin:.35rem; padding:1rem .6rem; color:var(--muted); text-align:center; font-size:.8rem; }
+.filter-bar { min-height:3.35rem; display:flex; align-items:center; gap:.45rem; padding:.6rem 1rem; border:1px solid var(--line); border-top:0; border-radius:0 0 10px 10px; background:var(--panel); overflow:hidden; }.active-filters { min-width:0; flex:1 1 auto; display:flex; align-items:center; gap:.45rem; overflow-x:auto; }.filter-empty-label { color:var(--muted); font-size:.8rem; white-space:nowrap; }.filter-chip { flex:0 0 auto; display:flex; min-height:2rem; align-items:stretch; border:1px solid var(--line-strong); border-radius:7px; background:var(--bg); overflow:hidden; white-space:nowrap; }.chip-segment { display:flex; align-items:center; padding:.35rem .55rem; border-right:1px solid var(--line); font-size:.78rem; }.chip-field { font-weight:700; }.chip-operator { color:var(--muted); }.chip-value { max-width:20rem; overflow:hidden; text-overflow:ellipsis; }.chip-remove { min-height:0; width:2rem; padding:0; border:0; border-radius:0; background:transparent; color:var(--muted); font-size:1rem; }.chip-remove:hover { color:var(--text); }.add-filter { flex:0 0 auto; min-height:2rem; width:2rem; padding:0; border-color:transparent; background:transparent; color:var(--muted); font-size:1.2rem; }
+.notice { min-height:2.2rem; padding:.7rem .1rem; color:var(--muted); }.notice.error { color:var(--danger); font-weight:650; }.groups { display:grid; gap:1rem; }.group { background:var(--panel); border:1px solid var(--line); border-radius:10px; overflow:hidden; }.group-header { display:flex; align-items:center; gap:.55rem; padding:.8rem 1rem; border-bottom:1px solid var(--line); }.group-header h2 { margin:0; font-size:.82rem; text-transform:uppercase; letter-spacing:.08em; }.badge { min-width:1.65rem; text-align:center; padding:.15rem .4rem; border-radius:999px; background:var(--bg); color:var(--muted); font-size:.72rem; }
+.activity { margin-bottom:1rem; background:var(--panel); border:1px solid var(--line); border-radius:10px; overflow:hidden; }.activity[hidden] { display:none; }.activity-body { display:grid; grid-template-columns:minmax(0,1fr) auto; gap:1.5rem; align-items:end; padding:1rem; }.activity-chart { height:4.5rem; display:flex; align-items:end; gap:3px; }.activity-bar { flex:1 1 0; min-width:3px; border-radius:3px 3px 0 0; background:var(--accent); opacity:.75; }.activity-facts { margin:0; display:flex; flex-wrap:wrap; gap:1.25rem; }.activity-facts div { display:grid; gap:.2rem; }.activity-facts dt { color:var(--muted); font-size:.68rem; font-weight:700; text-transform:uppercase; letter-spacing:.06em; }.activity-facts dd { margin:0; font-size:.95rem; font-weight:650; }
+.table-wrap { overflow-x:auto; }table { width:100%; border-collapse:collapse; font-size:.82rem; }th { color:var(--muted); font-size:.7rem; text-transform:uppercase; letter-spacing:.055em; text-align:left; font-weight:650; }th,td { padding:.72rem 1rem; border-bottom:1px solid var(--line); white-space:nowrap; }tr:last-child td { border-bottom:0; }td:first-child { width:42%; white-space:normal; font-weight:600; }.task-row { cursor:pointer; }.task-row:hover { background:var(--hover); }.task-link { color:inherit; text-decoration:none; }.task-link:hover { color:var(--accent); text-decoration:underline; text-underline-offset:.18em; }.empty { padding:1.2rem 1rem; color:var(--muted); font-size:.82rem; }.empty-state { padding:2.5rem 1rem; border:1px solid var(--line); border-radius:10px; background:var(--panel); text-align:center; }.empty-state h2 { margin:0 0 .45rem; font-size:1rem; }.empty-state p { margin:0 auto 1rem; color:var(--muted); font-size:.85rem; }.empty-state button { background:var(--accent); border-color:var(--accent); color:white; }
+.visually-hidden { position:absolute; width:1px; height:1px; padding:0; margin:-1px; overflow:hidden; clip:rect(0,0,0,0); white-space:nowrap; border:0; }.status-modal { position:fixed; z-index:50; inset:0; display:grid; place-items:start center; padding:clamp(4rem,12vh,8rem) 1rem 1rem; background:rgb(0 0 0 / .48); backdrop-filter:blur(2px); }.status-modal[hidden] { display:none; }.status-dialog { width:min(42rem,100%); overflow:hidden; padding:.75rem; border:1px solid var(--line-strong); border-radius:14px; background:var(--raised); box-shadow:0 24px 80px rgb(0 0 0 / .42); }.status-header { display:flex; align-items:start; justify-content:space-between; gap:1rem; padding:.3rem .35rem .7rem .55rem; }.status-header p { margin:0 0 .25rem; color:var(--muted); font-size:.72rem; font-weight:700; text-transform:uppercase; letter-spacing:.08em; }.status-header strong { display:block; max-width:35rem; overflow:hidden; text-overflow:ellipsis; white-space:nowrap; font-size:.9rem; }.status-search { width:100%; margin-bottom:.45rem; border-color:transparent; background:var(--bg); }.status-options { display:grid; gap:.2rem; }.status-option { width:100%; min-height:3.2rem; display:grid; grid-template-columns:1.25rem 1fr auto auto; align-items:center; gap:.75rem; padding:.65rem .75rem; border-color:transparent; background:transparent; text-align:left; font-weight:600; }.status-option:hover,.status-option:focus-visible { background:var(--hover); }.status-option[aria-selected="true"] { background:var(--accent-soft); }.status-option:disabled { cursor:not-allowed; opacity:.5; }.status-symbol { font-size:1rem; text-align:center; }.status-symbol.todo,.status-symbol.drop { color:var(--muted); }.status-symbol.active { color:#e4b400; }.status-symbol.blocked { color:var(--danger); }.status-current { color:var(--accent); font-size:.78rem; }.status-shortcut { min-width:1.8rem; padding:.18rem .35rem; border:1px solid var(--line); border-radius:5px; color:var(--muted); font-size:.7rem; text-align:center; }.status-guidance { margin:.55rem .55rem 0; color:var(--muted); font-size:.72rem; }.status-error { min-height:1.2rem; margin:.35rem .55rem 0; color:var(--danger); font-size:.78rem; font-weight:650; }
+.detail-topbar { min-height:4.5rem; display:flex; align-items:center; padding:1rem clamp(1rem,4vw,3.5rem); border-bottom:1px solid var(--line); }.back-link { color:var(--muted); font-size:.85rem; font-weight:650; text-decoration:none; }.back-link:hover { color:var(--text); }.detail-layout { max-width:88rem; margin:0 auto; display:grid; grid-template-columns:minmax(0,1fr) minmax(14rem,20rem); gap:clamp(2rem,6vw,6rem); padding:clamp(2rem,6vw,5rem) clamp(1rem,5vw,5rem); }.detail-content { min-width:0; }.detail-content h1 { margin:0; font-size:clamp(2rem,5vw,3.25rem); }.task-description { margin:2rem 0 0; max-width:52rem; white-space:pre-wrap; font-size:1rem; line-height:1.7; }.timeline-section { margin-top:3.5rem; }.timeline-section h2,.properties h2 { margin:0 0 1.25rem; font-size:1.1rem; }.timeline { margin:0; padding:0; list-style:none; border-top:1px solid var(--line); }.timeline-item { display:grid; grid-template-columns:minmax(9.5rem,12rem) minmax(5rem,7rem) minmax(0,1fr); gap:1rem; padding:1rem 0; border-bottom:1px solid var(--line); line-height:1.5; }.timeline-time,.timeline-role { color:var(--muted); font-size:.78rem; }.timeline-role { font-weight:700; text-transform:capitalize; }.timeline-message { min-width:0; white-space:pre-wrap; overflow-wrap:anywhere; }.properties { align-self:start; padding-left:clamp(1rem,3vw,2rem); border-left:1px solid var(--line); }.properties h2 { color:var(--muted); }.properties dl { margin:0; display:grid; gap:1.5rem; }.properties dl div { display:grid; gap:.4rem; }.properties dt { color:var(--muted); font-size:.72rem; font-weight:700; text-transform:uppercase; letter-spacing:.06em; }.properties dd { margin:0; font-size:.86rem; overflow-wrap:anywhere; }.session-link { color:var(--accent); text-decoration:none; }.session-link:hover { text-decoration:underline; text-underline-offset:.18em; }.detail-notice { grid-column:1/-1; margin:0; color:var(--danger); font-weight:650; }.timeline-empty { padding:1.25rem 0; color:var(--muted); }.timeline-more { display:block; margin:1rem auto 0; }.timeline-more[hidden] { display:none; }
+@media (max-width:900px) { .toolbar { align-items:stretch; flex-direction:column; }.search { flex:none; max-width:none; }.toolbar-actions { width:100%; margin-left:0; }.filter-launcher { margin-left:auto; } }
+@media (max-width:700px) { .topbar { align-items:start; flex-direction:column; }.toolbar-actions { display:grid; grid-template-columns:1fr 1fr; }.toolbar-actions .secondary-button { align-self:end; }.filter-launcher { position:static; margin-left:0; align-self:end; }.filter-menu { top:calc(100% - .5rem); left:.75rem; right:.75rem; width:auto; max-height:min(28rem,calc(100vh - 5rem)); }.filter-bar { align-items:flex-start; }.active-filters { flex:1 1 0; max-width:calc(100% - 2.45rem); flex-wrap:wrap; }.add-filter { align-self:flex-start; }.chip-value { max-width:11rem; }.optional-parent,.optional-time { display:none; }.activity-body { grid-template-columns:1fr; }.detail-layout { grid-template-columns:1fr; }.properties { grid-row:2; padding:1.5rem 0 0; border-left:0; border-top:1px solid var(--line); }.timeline-item { grid-template-columns:1fr; gap:.35rem; } }
+"""
+
+DASHBOARD_JS = r"""(() => {
+  "use strict";
+  const ROOT_PARENT = "__root__";
+  const ids = [
+    "search", "search-in", "sort", "direction", "refresh", "filter-trigger", "filter-menu",
+    "filter-menu-title", "filter-menu-back", "filter-menu-close", "filter-menu-search",
+    "filter-menu-list", "filter-bar", "active-filters", "add-filter", "notice",
+    "groups", "summary", "status-modal", "status-task-title", "status-close",
+    "status-search", "status-options", "status-error", "activity", "activity-range",
+    "activity-body"
+  ];
+  const el = Object.fromEntries(ids.map(id => [id.replace(/-([a-z])/g,(_match,letter)=>letter.toUpperCase()), document.getElementById(id)]));
+  let lastSnapshot = null;
+  let currentState = stateFromUrl();
+  let debounceTimer = null;
+  let requestGeneration = 0;
+  let stream = null;
+  let finishStream = null;
+  let menuField = null;
+  let menuInvoker = null;
+  let hoveredTask = null;
+  let statusTask = null;
+  let statusInvoker = null;
+  let statusSaving = false;
+  let statusModalGeneration = 0;
+  let activityGeneration = 0;
+  const ACTIVITY_DAYS = 14;
+
+  const STATUS_LABELS = {todo:"Todo",active:"Active",blocked:"Blocked",merging:"Merging",done:"Done",drop:"Drop"};
+  const STATUS_OPTIONS = [
+    {value:"todo",label:"Todo",symbol:"○",shortcut:"1"},
+    {value:"active",label:"Active",symbol:"◐",shortcut:"2"},
+    {value:"blocked",label:"Blocked",symbol:"!",shortcut:"3"},
+    {value:"drop",label:"Drop",symbol:"×",shortcut:"4"}
+  ];
+  const FILTER_DEFS = [
+    {
+      id:"project", label:"Project",
+      values:state => state.projects,
+      withValues:(state,values) => ({...state,projects:values}),
+      options:snapshot => snapshot.facets.projects.map(item => ({value:item.value,label:item.value,count:item.count}))
+    },
+    {
+      id:"parent", label:"Parent task",
+      values:state => [...state.parents,...(state.root?[ROOT_PARENT]:[])],
+      withValues:(state,values) => ({...state,parents:values.filter(value=>value!==ROOT_PARENT),root:values.includes(ROOT_PARENT)}),
+      options:snapshot => snapshot.facets.parents.map(item => ({value:item.value===null?ROOT_PARENT:item.value,label:item.value===null?"Root tasks":item.value,count:item.count}))
+    },
+    {
+      id:"status", label:"Status",
+      values:state => state.statuses,
+      withValues:(state,values) => ({...state,statuses:values}),
+      options:snapshot => snapshot.facets.statuses.map(item => ({value:item.value,label:STATUS_LABELS[item.value]||item.value,count:item.count}))
+    }
+  ];
+
+  function stateFromUrl() {
+    const query = new URLSearchParams(location.search);
+    return {
+      projects:query.getAll("project"), parents:query.getAll("parent_session_id"),
+      root:query.get("root_parent")==="1", statuses:query.getAll("status"),
+      sort:query.get("sort")||"updated", direction:query.get("direction")||"desc",
+      search:query.get("search")||"", searchIn:query.get("search_in")||"title"
+    };
+  }
+
+  function stateFromSnapshot(snapshot) {
+    return {
+      projects:snapshot.filters.projects, parents:snapshot.filters.parent_session_ids,
+      root:snapshot.filters.include_root, statuses:snapshot.filters.statuses,
+      sort:snapshot.sort.field, direction:snapshot.sort.direction, search:snapshot.search,
+      searchIn:snapshot.search_in
+    };
+  }
+
+  function queryFor(state) {
+    const query = new URLSearchParams();
+    const sorted = values => [...new Set(values)].sort((left,right)=>left.localeCompare(right,undefined,{sensitivity:"base"})||left.localeCompare(right));
+    sorted(state.projects).forEach(value=>query.append("project",value));
+    sorted(state.parents).forEach(value=>query.append("parent_session_id",value));
+    if(state.root)query.set("root_parent","1");
+    ["todo","active","blocked","merging","done","drop"].filter(value=>state.statuses.includes(value)).forEach(value=>query.append("status",value));
+    if(state.sort!=="updated")query.set("sort",state.sort);
+    if(state.direction!=="desc")query.set("direction",state.direction);
+    if(state.search)query.set("search",state.search);
+    if(state.searchIn!=="title")query.set("search_in",state.searchIn);
+    return query.toString();
+  }
+
+  function acceptedQueryFor(state) {
+    const query = new URLSearchParams();
+    state.projects.forEach(value=>query.append("project",value));
+    state.parents.forEach(value=>query.append("parent_session_id",value));
+    if(state.root)query.set("root_parent","1");
+    state.statuses.forEach(value=>query.append("status",value));
+    if(state.sort!=="updated")query.set("sort",state.sort);
+    if(state.direction!=="desc")query.set("direction",state.direction);
+    if(state.search)query.set("search",state.search);
+    if(state.searchIn!=="title")query.set("search_in",state.searchIn);
+    return query.toString();
+  }
+
+  function filterDef(id) { return FILTER_DEFS.find(definition=>definition.id===id); }
+  function filterValues(definition,state=currentState) { return definition.values(state); }
+  function valueLabel(definition,value) {
+    if(value===ROOT_PARENT)return "Root tasks";
+    if(definition.id==="status")return STATUS_LABELS[value]||value;
+    return value;
+  }
+
+  function formatFilterValue(definition,values) {
+    return values.map(value=>valueLabel(definition,value)).join(" or ");
+  }
+
+  function renderActiveFilters() {
+    const chips = FILTER_DEFS.flatMap(definition => {
+      const values = filterValues(definition);
+      if(!values.length)return [];
+      const chip = document.createElement("div");
+      chip.className = "filter-chip";
+      chip.setAttribute("role","group");
+      chip.setAttribute("aria-label",`${definition.label} filter`);
+      const field = document.createElement("span"); field.className="chip-segment chip-field"; field.textContent=definition.label;
+      const operator = document.createElement("span"); operator.className="chip-segment chip-operator"; operator.textContent=values.length>1?"is any of":"is";
+      const value = document.createElement("span"); value.className="chip-segment chip-value"; value.textContent=formatFilterValue(definition,values); value.title=value.textContent;
+      const remove = document.createElement("button"); remove.className="chip-remove"; remove.type="button"; remove.textContent="×"; remove.setAttribute("aria-label",`Remove ${definition.label} filter`);
+      remove.addEventListener("click",()=>{
+        currentState=definition.withValues(currentState,[]);
+        renderActiveFilters();
+        closeFilterMenu(false);
+        el.addFilter.focus();
+        load(currentState);
+      });
+      chip.append(field,operator,value,remove);
+      return [chip];
+    });
+    if(!chips.length){
+      const empty=document.createElement("span"); empty.className="filter-empty-label"; empty.textContent="No filters applied";
+      el.activeFilters.replaceChildren(empty);
+    }else el.activeFilters.replaceChildren(...chips);
+  }
+
+  function availableOptions(definition) {
+    if(!lastSnapshot)return [];
+    const options=definition.options(lastSnapshot);
+    const known=new Set(options.map(option=>option.value));
+    filterValues(definition).forEach(value=>{
+      if(!known.has(value))options.push({value,label:valueLabel(definition,value),count:0});
+    });
+    return options;
+  }
+
+  function menuItem(label,meta,attributes,onChoose) {
+    const button=document.createElement("button");
+    button.type="button"; button.className="filter-menu-item"; button.setAttribute("role",attributes.role||"menuitem");
+    Object.entries(attributes).forEach(([name,value])=>{if(name!=="role")button.setAttribute(name,String(value));});
+    const name=document.createElement("span"); name.textContent=label;
+    const detail=document.createElement("span"); detail.className="filter-menu-meta"; detail.textContent=meta;
+    button.append(name,detail); button.addEventListener("click",onChoose); return button;
+  }
+
+  function renderFilterMenu() {
+    if(el.filterMenu.hidden)return;
+    const term=el.filterMenuSearch.value.trim().toLocaleLowerCase();
+    el.filterMenuBack.hidden=menuField===null;
+    el.filterMenuTitle.textContent=menuField?filterDef(menuField).label:"Add filter";
+    el.filterMenuSearch.placeholder=menuField?"Find a value…":"Find a filter…";
+    el.filterMenuSearch.setAttribute("aria-label",menuField?`Search ${filterDef(menuField).label} values`:"Search available filters");
+    const items=[];
+    if(menuField===null){
+      FILTER_DEFS.filter(definition=>definition.label.toLocaleLowerCase().includes(term)).forEach(definition=>{
+        const count=filterValues(definition).length;
+        items.push(menuItem(definition.label,count?`${count} active  ›`:"Choose values  ›",{"data-menu-key":definition.id,"aria-current":count?"true":"false"},()=>showFilterValues(definition.id)));
+      });
+    }else{
+      const definition=filterDef(menuField); const selected=new Set(filterValues(definition));
+      availableOptions(definition).filter(option=>option.label.toLocaleLowerCase().includes(term)).forEach(option=>{
+        const active=selected.has(option.value);
+        items.push(menuItem(option.label,active?"✓ Added":`${option.count} tasks`,{role:"menuitemcheckbox","aria-checked":active?"true":"false","data-menu-key":option.value},()=>toggleFilterValue(definition,option.value)));
+      });
+    }
+    if(!items.length){const empty=document.createElement("p");empty.className="filter-menu-empty";empty.textContent=menuField?"No available values":"No matching filters";items.push(empty);}
+    el.filterMenuList.replaceChildren(...items);
+  }
+
+  function showFilterValues(id) {
+    menuField=id; el.filterMenuSearch.value=""; renderFilterMenu(); el.filterMenuSearch.focus();
+  }
+
+  function toggleFilterValue(definition,value) {
+    const values=filterValues(definition); const active=values.includes(value);
+    const next=active?values.filter(item=>item!==value):[...values,value];
+    currentState=definition.withValues(currentState,next);
+    renderActiveFilters(); closeFilterMenu(); load(currentState);
+  }
+
+  function openFilterMenu(invoker) {
+    menuInvoker=invoker; menuField=null; el.filterMenuSearch.value=""; el.filterMenu.hidden=false;
+    el.filterTrigger.setAttribute("aria-expanded","true"); el.addFilter.setAttribute("aria-expanded","true");
+    renderFilterMenu(); el.filterMenuSearch.focus();
+  }
+
+  function closeFilterMenu(restoreFocus=true) {
+    if(el.filterMenu.hidden)return;
+    el.filterMenu.hidden=true; el.filterTrigger.setAttribute("aria-expanded","false"); el.addFilter.setAttribute("aria-expanded","false");
+    const invoker=menuInvoker; menuInvoker=null; menuField=null; if(restoreFocus&&invoker)invoker.focus();
+  }
+
+  function focusMenuItem(position) {
+    const items=Array.from(el.filterMenuList.querySelectorAll('[role="menuitem"],[role="menuitemcheckbox"]'));
+    if(!items.length)return;
+    let index=items.indexOf(document.activeElement);
+    if(position==="first")index=0; else if(position==="last")index=items.length-1;
+    else if(index<0)index=position==="next"?0:items.length-1;
+    else index=(index+(position==="next"?1:-1)+items.length)%items.length;
+    items[index].focus();
+  }
+
+  function menuKeydown(event) {
+    if(el.filterMenu.hidden)return;
+    if(event.key==="Escape"){event.preventDefault();closeFilterMenu();return;}
+    if(event.key==="Tab"){closeFilterMenu(false);return;}
+    if(event.key==="ArrowDown"){event.preventDefault();focusMenuItem("next");}
+    else if(event.key==="ArrowUp"){event.preventDefault();focusMenuItem("previous");}
+    else if(event.key==="Home"){event.preventDefault();focusMenuItem("first");}
+    else if(event.key==="End"){event.preventDefault();focusMenuItem("last");}
+    else if((event.key==="Enter"||event.key===" ")&&document.activeElement&&["menuitem","menuitemcheckbox"].includes(document.activeElement.getAttribute("role"))){event.preventDefault();document.activeElement.click();}
+    else if(event.key==="ArrowLeft"&&menuField){event.preventDefault();menuField=null;el.filterMenuSearch.value="";renderFilterMenu();el.filterMenuSearch.focus();}
+  }
+
+  function isTypingTarget(target) {
+    return Boolean(target&&(target===el.search||target===el.filterMenuSearch||target===el.statusSearch||["INPUT","TEXTAREA","SELECT"].includes(target.tagName)||target.getAttribute&&target.getAttribute("contenteditable")==="true"));
+  }
+
+  function statusButtons() {
+    return Array.from(el.statusOptions.querySelectorAll('[role="option"]')).filter(item=>!item.disabled);
+  }
+
+  function statusLockMessage(task) {
+    if(task.status==="done")return "Done tasks must be reopened explicitly.";
+    if(task.status==="drop")return "Dropped tasks must be reopened explicitly.";
+    if(task.status==="merging")return "Merging tasks must be closed or released explicitly.";
+    return "";
+  }
+
+  function renderStatusOptions() {
+    if(el.statusModal.hidden||!statusTask)return;
+    const term=el.statusSearch.value.trim().toLocaleLowerCase();
+    const options=STATUS_OPTIONS.filter(option=>option.label.toLocaleLowerCase().includes(term));
+    const items=options.map(option=>{
+      const button=document.createElement("button"); button.type="button"; button.className="status-option";
+      button.setAttribute("role","option"); button.setAttribute("aria-selected",statusTask.status===option.value?"true":"false");
+      button.disabled=statusSaving||Boolean(statusLockMessage(statusTask));
+      const symbol=document.createElement("span"); symbol.className=`status-symbol ${option.value}`; symbol.textContent=option.symbol; symbol.setAttribute("aria-hidden","true");
+      const label=document.createElement("span"); label.textContent=option.label;
+      const current=document.createElement("span"); current.className="status-current"; current.textContent=statusTask.status===option.value?"Current":"";
+      const shortcut=document.createElement("span"); shortcut.className="status-shortcut"; shortcut.textContent=option.shortcut; shortcut.setAttribute("aria-hidden","true");
+      button.append(symbol,label,current,shortcut); button.addEventListener("click",()=>updateStatus(option.value)); return button;
+    });
+    if(!items.length){const empty=document.createElement("p");empty.className="filter-menu-empty";empty.textContent="No matching statuses";items.push(empty);}
+    el.statusOptions.replaceChildren(...items);
+  }
+
+  function openStatusModal(task) {
+    closeFilterMenu(false);
+    statusModalGeneration+=1;
+    statusTask=task; statusInvoker=document.activeElement; statusSaving=false;
+    el.statusTaskTitle.textContent=task.title; el.statusSearch.value=""; el.statusError.textContent=statusLockMessage(task);
+    el.statusModal.hidden=false; renderStatusOptions(); el.statusSearch.focus();
+  }
+
+  function closeStatusModal(restoreFocus=true) {
+    if(el.statusModal.hidden)return;
+    statusModalGeneration+=1;
+    el.statusModal.hidden=true; el.statusError.textContent="";
+    const invoker=statusInvoker; statusTask=null; statusInvoker=null; statusSaving=false;
+    if(restoreFocus&&invoker&&invoker.focus)invoker.focus();
+  }
+
+  async function updateStatus(status) {
+    if(!statusTask||statusSaving)return;
+    const lockMessage=statusLockMessage(statusTask);
+    if(lockMessage){el.statusError.textContent=lockMessage;return;}
+    const task=statusTask; const generation=statusModalGeneration;
+    statusSaving=true; el.statusError.textContent=""; renderStatusOptions();
+    try {
+      const response=await fetch(`api/tasks/~${encodeURIComponent(task.session_id)}/status`,{
+        method:"PATCH",cache:"no-store",headers:{"Content-Type":"application/json"},
+        body:JSON.stringify({expected_status:task.status,status})
+      });
+      const payload=await response.json();
+      if(!response.ok)throw new Error(payload.error||`Status update failed (${response.status})`);
+      // A live stream delivers the moved row; without one, refetch the view.
+      const refreshed=stream?true:await load(currentState);
+      if(generation===statusModalGeneration&&!el.statusModal.hidden&&statusTask&&statusTask.session_id===task.session_id){
+        closeStatusModal(false);
+        if(refreshed){el.notice.textContent=`Set ${task.title} to ${STATUS_LABELS[status]||status}.`; el.notice.className="notice";}
+      }
+    } catch (error) {
+      if(generation===statusModalGeneration&&!el.statusModal.hidden)el.statusError.textContent=error.message;
+    } finally {
+      if(generation===statusModalGeneration){statusSaving=false;if(!el.statusModal.hidden)renderStatusOptions();}
+    }
+  }
+
+  function focusStatusOption(position) {
+    const items=statusButtons(); if(!items.length)return;
+    let index=items.indexOf(document.activeElement);
+    if(position==="first")index=0; else if(position==="last")index=items.length-1;
+    else if(index<0)index=position==="next"?0:items.length-1;
+    else index=(index+(position==="next"?1:-1)+items.length)%items.length;
+    items[index].focus();
+  }
+
+  function statusKeydown(event) {
+    if(el.statusModal.hidden)return;
+    if(event.key==="Escape"){event.preventDefault();closeStatusModal();return;}
+    if(event.key==="ArrowDown"){event.preventDefault();focusStatusOption("next");return;}
+    if(event.key==="ArrowUp"){event.preventDefault();focusStatusOption("previous");return;}
+    if(event.key==="Home"){event.preventDefault();focusStatusOption("first");return;}
+    if(event.key==="End"){event.preventDefault();focusStatusOption("last");return;}
+    if(event.key==="Tab"){
+      const focusable=[el.statusClose,el.statusSearch,...statusButtons()];
+      const index=focusable.indexOf(document.activeElement);
+      if((event.shiftKey&&index<=0)||(!event.shiftKey&&index===focusable.length-1)){
+        event.preventDefault();focusable[event.shiftKey?focusable.length-1:0].focus();
+      }
+      return;
+    }
+    const option=STATUS_OPTIONS.find(item=>item.shortcut===event.key);
+    if(option&&!event.metaKey&&!event.ctrlKey&&!event.altKey){event.preventDefault();updateStatus(option.value);return;}
+    if(event.key==="Enter"&&document.activeElement===el.statusSearch){
+      const first=statusButtons()[0]; if(first){event.preventDefault();first.click();}
+    }
+  }
+
+  function formatTime(value) { return value ? value.slice(0,16).replace("T"," ")+"Z" : "—"; }
+  function cell(value,className) { const node=document.createElement("td"); if(className)node.className=className; node.textContent=value; return node; }
+  function taskPath(sessionId) { return `tasks/~${encodeURIComponent(sessionId)}`; }
+  function taskSessionPath(sessionId) { return `codex://threads/${encodeURIComponent(sessionId)}`; }
+  function taskTitleCell(thread) {
+    const node=document.createElement("td"); const link=document.createElement("a");
+    link.className="task-link"; link.href=taskSessionPath(thread.session_id); link.textContent=thread.title;
+    link.title="Open task in Codex";
+    link.addEventListener("keydown",event=>{if(event.key===" "){event.preventDefault();location.assign(link.href);}});
+    node.append(link); return {node,link};
+  }
+  function taskRow(thread,link) {
+    const row=document.createElement("tr"); row.className="task-row"; row.setAttribute("data-task-id",thread.id); row.setAttribute("data-session-id",thread.session_id); row.setAttribute("data-status",thread.status);
+    row.addEventListener("click",event=>{if(!link.contains(event.target))location.assign(taskPath(thread.session_id));});
+    row.addEventListener("mouseenter",()=>{hoveredTask=thread;});
+    row.addEventListener("mouseleave",()=>{if(hoveredTask&&hoveredTask.session_id===thread.session_id)hoveredTask=null;});
+    row.addEventListener("focusin",()=>{hoveredTask=thread;});
+    row.addEventListener("focusout",event=>{if(!row.contains(event.relatedTarget)&&hoveredTask&&hoveredTask.session_id===thread.session_id)hoveredTask=null;});
+    return row;
+  }
+
+  function emptyState(title,message,buttonLabel,onChoose) {
+    const section=document.createElement("section"); section.className="empty-state";
+    const heading=document.createElement("h2"); heading.textContent=title;
+    const copy=document.createElement("p"); copy.textContent=message;
+    const button=document.createElement("button"); button.type="button"; button.textContent=buttonLabel; button.addEventListener("click",onChoose);
+    section.append(heading,copy,button); return section;
+  }
+
+  function clearFiltersAndSearch() {
+    currentState={...currentState,projects:[],parents:[],root:false,statuses:[],search:""};
+    el.search.value=""; renderActiveFilters(); closeFilterMenu(false); load(currentState);
+  }
+
+  function renderGroups(snapshot) {
+    hoveredTask=null;
+    if(snapshot.total_count===0){
+      el.groups.replaceChildren(emptyState("No tracked tasks yet","Create or register a task, then refresh this dashboard.","Refresh",()=>load(currentState)));
+      return;
+    }
+    if(snapshot.visible_count===0&&(FILTER_DEFS.some(definition=>filterValues(definition).length)||currentState.search)){
+      el.groups.replaceChildren(emptyState("No tasks match this view","Try another filter or clear the current filters and search.","Clear filters and search",clearFiltersAndSearch));
+      return;
+    }
+    const sections=snapshot.groups.map(group=>{
+      const section=document.createElement("section");section.className="group";section.setAttribute("aria-labelledby",`status-${group.status}`);
+      const header=document.createElement("div");header.className="group-header";const heading=document.createElement("h2");heading.id=`status-${group.status}`;heading.textContent=STATUS_LABELS[group.status]||group.status;
+      const badge=document.createElement("span");badge.className="badge";badge.textContent=String(group.count);header.append(heading,badge);section.append(header);
+      if(!group.threads.length){const empty=document.createElement("p");empty.className="empty";empty.textContent="No tasks in this status.";section.append(empty);return section;}
+      const wrapper=document.createElement("div");wrapper.className="table-wrap";const table=document.createElement("table");const thead=document.createElement("thead");const headingRow=document.createElement("tr");
+      [["Title",""],["Project",""],["Parent task","optional-parent"],["Created","optional-time"],["Updated","optional-time"],["Closed","optional-time"]].forEach(([label,className])=>{const th=document.createElement("th");th.scope="col";th.className=className;th.textContent=label;headingRow.append(th);});thead.append(headingRow);table.append(thead);
+      const tbody=document.createElement("tbody");group.threads.forEach(thread=>{const title=taskTitleCell(thread);const row=taskRow(thread,title.link);row.append(title.node,cell(thread.project),cell(thread.parent_session_id||"—","optional-parent"),cell(formatTime(thread.created),"optional-time"),cell(formatTime(thread.updated),"optional-time"),cell(formatTime(thread.closed),"optional-time"));tbody.append(row);});table.append(tbody);wrapper.append(table);section.append(wrapper);return section;
+    });
+    el.groups.replaceChildren(...sections);
+  }
+
+  function formatDuration(seconds) {
+    if(seconds<60)return `${Math.round(seconds)}s`;
+    if(seconds<3600)return `${Math.round(seconds/60)}m`;
+    return seconds<86400?`${(seconds/3600).toFixed(1)}h`:`${(seconds/86400).toFixed(1)}d`;
+  }
+  function renderActivity(report) {
+    const turns=day=>day.user_turns+day.assistant_turns;
+    const peak=Math.max(1,...report.days.map(turns));
+    const chart=document.createElement("div");chart.className="activity-chart";chart.setAttribute("role","img");
+    chart.setAttribute("aria-label",`${turns(report.totals)} turns from ${report.since} to ${report.until}`);
+    report.days.forEach(day=>{const bar=document.createElement("span");bar.className="activity-bar";bar.style.height=`${Math.max(4,Math.round(turns(day)/peak*100))}%`;bar.title=`${day.day}: ${turns(day)} turns · ${day.threads_created} created · ${day.threads_done} done`;chart.append(bar);});
+    const facts=document.createElement("dl");facts.className="activity-facts";
+    const entries=[["Turns",String(turns(report.totals))],["Created",String(report.totals.threads_created)],["Done",String(report.totals.threads_done)],["Dropped",String(report.totals.threads_dropped)]];
+    report.dwell.filter(item=>!["done","drop"].includes(item.status)).forEach(item=>entries.push([`Avg ${STATUS_LABELS[item.status]||item.status}`,formatDuration(item.mean_seconds)]));
+    entries.forEach(([label,value])=>{const entry=document.createElement("div");const term=document.createElement("dt");term.textContent=label;const detail=document.createElement("dd");detail.textContent=value;entry.append(term,detail);facts.append(entry);});
+    el.activityBody.replaceChildren(chart,facts); el.activityRange.textContent=`${report.since} – ${report.until}`; el.activity.hidden=false;
+  }
+  async function loadActivity() {
+    const generation=++activityGeneration;
+    const query=new URLSearchParams({days:String(ACTIVITY_DAYS)}); currentState.projects.forEach(value=>query.append("project",value));
+    try{
+      const response=await fetch(`api/stats?${query}`,{cache:"no-cache"});
+      if(response.ok&&generation===activityGeneration)renderActivity(await response.json());
+    }catch(_error){
+      // The panel is supplementary; the task groups report ledger errors.
+    }
+  }
+
+  function render(snapshot) {
+    currentState=stateFromSnapshot(snapshot); lastSnapshot=snapshot;
+    const acceptedQuery=acceptedQueryFor(currentState);
+    history.replaceState(null,"",acceptedQuery?`?${acceptedQuery}`:location.pathname);
+    syncSearchControls(); el.sort.value=currentState.sort; el.direction.value=currentState.direction;
+    renderActiveFilters(); renderGroups(snapshot); if(!el.filterMenu.hidden)renderFilterMenu(); el.groups.setAttribute("aria-busy","false");
+    el.summary.textContent=`${snapshot.visible_count} visible · ${snapshot.total_count} total`; loadActivity();
+    el.notice.textContent=`Updated ${new Date().toLocaleTimeString()}`; el.notice.className="notice";
+  }
+
+  function syncSearchControls() {
+    el.search.value=currentState.search; el.searchIn.value=currentState.searchIn;
+    el.search.placeholder=currentState.searchIn==="rollouts"?"Search messages":"Search titles";
+  }
+
+  function compareThreads(left,right) {
+    const field=lastSnapshot.sort.field; const leftValue=left[field]; const rightValue=right[field];
+    if(leftValue===null&&rightValue!==null)return 1;
+    if(leftValue!==null&&rightValue===null)return -1;
+    if(leftValue!==rightValue){const result=leftValue<rightValue?-1:1;return lastSnapshot.sort.direction==="asc"?result:-result;}
+    for(const tie of ["updated","created"]){if(left[tie]!==right[tie])return left[tie]>right[tie]?-1:1;}
+    return left.id===right.id?0:(left.id<right.id?-1:1);
+  }
+
+  function facetKey(value) { return value===null?"":value.toLowerCase(); }
+  function mergeFacets(items,updates) {
+    updates.forEach(update=>{
+      const index=items.findIndex(item=>item.value===update.value);
+      if(update.count===0){if(index>=0)items.splice(index,1);}
+      else if(index>=0)items[index].count=update.count;
+      else items.push({value:update.value,count:update.count});
+    });
+    items.sort((left,right)=>(left.value!==null)-(right.value!==null)||(facetKey(left.value)<facetKey(right.value)?-1:facetKey(left.value)>facetKey(right.value)?1:0)||(left.value<right.value?-1:left.value>right.value?1:0));
+  }
+
+  function applyChanges(change) {
+    if(!lastSnapshot)return;
+    const snapshot=lastSnapshot;
+    const touched=new Set([...change.removed,...change.threads.map(thread=>thread.id)]);
+    snapshot.groups.forEach(group=>{group.threads=group.threads.filter(thread=>!touched.has(thread.id));});
+    change.threads.forEach(thread=>{const group=snapshot.groups.find(item=>item.status===thread.status);if(group)group.threads.push(thread);});
+    snapshot.groups.forEach(group=>{group.threads.sort(compareThreads);group.count=group.threads.length;});
+    snapshot.visible_count=snapshot.groups.reduce((total,group)=>total+group.count,0);
+    snapshot.total_count=change.total_count;
+    mergeFacets(snapshot.facets.projects,change.facets.projects);
+    mergeFacets(snapshot.facets.parents,change.facets.parents);
+    snapshot.facets.statuses=change.facets.statuses;
+    render(snapshot);
+  }
+
+  function openStream(query) {
+    if(finishStream)finishStream(false);
+    if(stream)stream.close();
+    const source=new EventSource(`api/events${query?`?${query}`:""}`); stream=source;
+    return new Promise(resolve=>{
+      let settled=false;
+      const finish=value=>{if(!settled){settled=true;if(finishStream===finish)finishStream=null;resolve(value);}};
+      finishStream=finish;
+      // Each (re)connection starts with a full snapshot, so a dropped stream
+      // never leaves the view missing changes.
+      source.addEventListener("snapshot",event=>{if(stream!==source)return;render(JSON.parse(event.data));finish(true);});
+      source.addEventListener("changes",event=>{if(stream===source)applyChanges(JSON.parse(event.data));});
+      source.addEventListener("error",()=>{
+        if(stream!==source||source.readyState!==EventSource.CLOSED)return;
+        stream=null; fetchSnapshot(query,++requestGeneration).then(finish);
+      });
+    });
+  }
+
+  async function load(state,updateUrl=true,initialQuery=null) {
+    const query=initialQuery===null?queryFor(state):initialQuery; const generation=++requestGeneration;
+    if(updateUrl)history.replaceState(null,"",query?`?${query}`:location.pathname);
+    el.groups.setAttribute("aria-busy","true");
+    if(typeof EventSource==="function")return openStream(query);
+    return fetchSnapshot(query,generation);
+  }
+
+  async function fetchSnapshot(query,generation) {
+    try{
+      const response=await fetch(`api/dashboard${query?`?${query}`:""}`,{cache:"no-cache"}); const payload=await response.json();
+      if(!response.ok)throw new Error(payload.error||`Dashboard request failed (${response.status})`);
+      if(generation===requestGeneration){render(payload);return true;}
+      return false;
+    }catch(error){
+      if(generation!==requestGeneration)return false; el.groups.setAttribute("aria-busy","false");
+      el.notice.textContent=`${lastSnapshot?"Showing the last successful snapshot. ":""}${error.message}`; el.notice.className="notice error";
+      return false;
+    }
+  }
+
+  el.filterTrigger.addEventListener("click",()=>el.filterMenu.hidden?openFilterMenu(el.filterTrigger):closeFilterMenu());
+  el.addFilter.addEventListener("click",()=>el.filterMenu.hidden?openFilterMenu(el.addFilter):closeFilterMenu());
+  el.filterMenuBack.addEventListener("click",()=>{menuField=null;el.filterMenuSearch.value="";renderFilterMenu();el.filterMenuSearch.focus();});
+  el.filterMenuClose.addEventListener("click",()=>closeFilterMenu());
+  el.filterMenuSearch.addEventListener("input",renderFilterMenu);
+  el.filterMenu.addEventListener("keydown",menuKeydown);
+  document.addEventListener("pointerdown",event=>{if(!el.filterMenu.hidden&&!el.filterMenu.contains(event.target)&&!el.filterTrigger.contains(event.target)&&!el.addFilter.contains(event.target))closeFilterMenu(false);});
+  el.statusClose.addEventListener("click",()=>closeStatusModal());
+  el.statusSearch.addEventListener("input",renderStatusOptions);
+  el.statusModal.addEventListener("keydown",statusKeydown);
+  el.statusModal.addEventListener("pointerdown",event=>{if(event.target===el.statusModal)closeStatusModal();});
+  document.addEventListener("keydown",event=>{
+    if(event.key.toLocaleLowerCase()!=="s"||event.metaKey||event.ctrlKey||event.altKey||event.defaultPrevented)return;
+    if(!el.statusModal.hidden||!el.filterMenu.hidden||isTypingTarget(event.target)||!hoveredTask)return;
+    event.preventDefault();openStatusModal(hoveredTask);
+  });
+  el.refresh.addEventListener("click",()=>load(currentState));
+  el.sort.addEventListener("change",()=>{currentState={...currentState,sort:el.sort.value};load(currentState);});
+  el.direction.addEventListener("change",()=>{currentState={...currentState,direction:el.direction.value};load(currentState);});
+  el.search.addEventListener("input",()=>{currentState={...currentState,search:el.search.value};clearTimeout(debounceTimer);debounceTimer=setTimeout(()=>load(currentState),180);});
+  el.searchIn.addEventListener("change",()=>{currentState={...currentState,searchIn:el.searchIn.value};syncSearchControls();load(currentState);});
+  renderActiveFilters(); syncSearchControls(); el.sort.value=currentState.sort; el.direction.value=currentState.direction;
+  load(currentState,false,location.search.slice(1));
+})();
+"""
+
+TASK_DETAIL_JS = r"""(() => {
+  "use strict";
+  const byId = id => document.getElementById(id);
+  const pathParts = location.pathname.split("/").filter(Boolean);
+  let sessionId;
+  const markedSessionId = pathParts.at(-1)||"";
+  try {
+    if(!markedSessionId.startsWith("~"))throw new Error("missing task marker");
+    sessionId = decodeURIComponent(markedSessionId.slice(1));
+  }
+  catch (_error) { showError("Invalid task URL."); return; }
+
+  function formatTime(value) { return value ? value.slice(0,19).replace("T"," ")+" Z" : "—"; }
+  function showError(message) {
+    byId("task-title").textContent="Task unavailable";
+    byId("detail-notice").textContent=message;
+    byId("detail-content").setAttribute("aria-busy","false");
+  }
+  function timelineItem(rollout) {
+    const item=document.createElement("li"); item.className="timeline-item";
+    const time=document.createElement("time"); time.className="timeline-time"; time.dateTime=rollout.created; time.textContent=formatTime(rollout.created);
+    const role=document.createElement("span"); role.className="timeline-role"; role.textContent=`${rollout.role}:`;
+    const message=document.createElement("span"); message.className="timeline-message"; message.textContent=rollout.message;
+    item.append(time,role,message); return item;
+  }
+  function render(task) {
+    document.title=`${task.title} · agtask`;
+    byId("task-title").textContent=task.title;
+    byId("task-description").textContent=task.description||"No description provided.";
+    byId("task-created").textContent=formatTime(task.created);
+    byId("task-updated").textContent=formatTime(task.updated);
+    const sessionLink=byId("task-session-id");
+    sessionLink.textContent=task.session_id;
+    sessionLink.href=`codex://threads/${encodeURIComponent(task.session_id)}`;
+    sessionLink.title="Open task in Codex";
+    const items=task.rollouts.map(timelineItem);
+    if(!items.length){const empty=document.createElement("li");empty.className="timeline-empty";empty.textContent="No rollout items yet.";items.push(empty);}
+    byId("timeline").replaceChildren(...items);
+    showPage(task);
+    byId("detail-content").setAttribute("aria-busy","false");
+  }
+  // History arrives newest first in keyset pages; the button doubles as the
+  // infinite-scroll sentinel and stays usable without IntersectionObserver.
+  let nextCursor=null, loadingMore=false, observer=null;
+  function showPage(page) {
+    nextCursor=page.next_cursor;
+    byId("timeline-count").textContent=String(page.rollout_count);
+    const more=byId("timeline-more"); more.hidden=!nextCursor; more.disabled=false; more.textContent="Load older entries";
+    // Re-observing reports the current intersection, so a short page that
+    // leaves the sentinel on screen still pulls the next one.
+    if(observer&&nextCursor){observer.unobserve(more);observer.observe(more);}
+  }
+  async function fetchDetail(query) {
+    const response=await fetch(`../api/tasks/~${encodeURIComponent(sessionId)}${query}`,{cache:"no-cache"});
+    const payload=await response.json();
+    if(!response.ok)throw new Error(payload.error||`Task request failed (${response.status})`);
+    return payload;
+  }
+  async function loadMore() {
+    if(!nextCursor||loadingMore)return;
+    loadingMore=true;
+    const more=byId("timeline-more"); more.disabled=true; more.textContent="Loading…";
+    try {
+      const page=await fetchDetail(`?before=${encodeURIComponent(nextCursor)}`);
+      byId("timeline").append(...page.rollouts.map(timelineItem));
+      byId("detail-notice").textContent="";
+      showPage(page);
+    } catch (error) {
+      byId("detail-notice").textContent=error.message;
+      more.disabled=false; more.textContent="Retry loading older entries";
+    } finally { loadingMore=false; }
+  }
+  async function load() {
+    try { render(await fetchDetail("")); }
+    catch (error) { showError(error.message); }
+  }
+  byId("timeline-more").addEventListener("click",loadMore);
+  if(typeof IntersectionObserver==="function"){
+    observer=new IntersectionObserver(entries=>{if(entries.some(entry=>entry.isIntersecting))loadMore();},{rootMargin:"600px 0px"});
+  }
+  document.addEventListener("keydown",event=>{
+    if(event.key!=="Escape")return;
+    event.preventDefault();
+    location.assign("../");
+  });
+  load();
+})();
+"""
+
+
+def dashboard_sorted_values(values: list[str]) -> list[str]:
+    return sorted(set(values), key=lambda value: (value.casefold(), value))
+
+
+def dashboard_state(
+    *,
+    projects: Optional[list[str]] = None,
+    parent_session_ids: Optional[list[str]] = None,
+    include_root: bool = False,
+    statuses: Optional[list[str]] = None,
+    sort_field: str = "updated",
+    direction: str = "desc",
+    search: str = "",
+    search_in: str = "title",
+) -> dict[str, Any]:
+    normalized_projects = dashboard_sorted_values(projects or [])
+    normalized_parents = dashboard_sorted_values(parent_session_ids or [])
+    normalized_statuses = [
+        status for status in DASHBOARD_STATUSES if status in set(statuses or [])
+    ]
+    for label, values in (
+        ("project", normalized_projects),
+        ("parent_session_id", normalized_parents),
+        ("status", normalized_statuses),
+    ):
+        if any(value == "" for value in values):
+            raise TaskError(f"{label} must not be empty")
+    invalid_statuses = set(statuses or []) - set(DASHBOARD_STATUSES)
+    if invalid_statuses:
+        raise TaskError(f"invalid dashboard status: {sorted(invalid_statuses)[0]}")
+    if sort_field not in DASHBOARD_SORT_FIELDS:
+        raise TaskError(f"invalid dashboard sort field: {sort_field}")
+    if direction not in DASHBOARD_DIRECTIONS:
+        raise TaskError(f"invalid dashboard direction: {direction}")
+    if search_in not in DASHBOARD_SEARCH_SCOPES:
+        raise TaskError(f"invalid dashboard search scope: {search_in}")
+    return {
+        "projects": normalized_projects,
+        "parent_session_ids": normalized_parents,
+        "include_root": bool(include_root),
+        "statuses": normalized_statuses,
+        "sort_field": sort_field,
+        "direction": direction,
+        "search": search,
+        "search_in": search_in,
+    }
+
+
+def dashboard_state_from_args(args: argparse.Namespace) -> dict[str, Any]:
+    return dashboard_state(
+        projects=args.project,
+        parent_session_ids=args.parent_session_id,
+        include_root=args.root_parent,
+        statuses=args.status,
+        sort_field=args.sort,
+        direction=args.direction,
+        search=args.search,
+        search_in=args.search_in,
+    )
+
+
+def dashboard_state_from_query(query: str) -> dict[str, Any]:
+    if not query:
+        return dashboard_state()
+    if re.search(r"%(?![0-9A-Fa-f]{2})", query):
+        raise TaskError("malformed percent encoding")
+    try:
+        pairs = parse_qsl(
+            query,
+            keep_blank_values=True,
+            strict_parsing=True,
+            encoding="utf-8",
+            errors="strict",
+            max_num_fields=100,
+        )
+    except (UnicodeDecodeError, ValueError) as error:
+        raise TaskError("invalid dashboard query string") from error
+    allowed = {
+        "project",
+        "parent_session_id",
+        "root_parent",
+        "status",
+        "sort",
+        "direction",
+        "search",
+        "search_in",
+    }
+    values: dict[str, list[str]] = {}
+    for key, value in pairs:
+        if key not in allowed:
+            raise TaskError(f"unknown query parameter: {key}")
+        values.setdefault(key, []).append(value)
+    for key in ("root_parent", "sort", "direction", "search", "search_in"):
+        if len(values.get(key, [])) > 1:
+            raise TaskError(f"duplicate query parameter: {key}")
+    for key in ("project", "parent_session_id", "status"):
+        if any(value == "" for value in values.get(key, [])):
+            raise TaskError(f"{key} must not be empty")
+    root_values = values.get("root_parent", [])
+    if root_values and root_values[0] != "1":
+        raise TaskError("root_parent must equal 1")
+    return dashboard_state(
+        projects=values.get("project", []),
+        parent_session_ids=values.get("parent_session_id", []),
+        include_root=bool(root_values),
+        statuses=values.get("status", []),
+        sort_field=values.get("sort", ["updated"])[0],
+        direction=values.get("direction", ["desc"])[0],
+        search=values.get("search", [""])[0],
+        search_in=values.get("search_in", ["title"])[0],
+    )
+
+
+def dashboard_query(state: dict[str, Any]) -> str:
+    pairs: list[tuple[str, str]] = []
+    pairs.extend(("project", value) for value in state["projects"])
+    pairs.extend(
+        ("parent_session_id", value) for value in state["parent_session_ids"]
+    )
+    if state["include_root"]:
+        pairs.append(("root_parent", "1"))
+    pairs.extend(("status", value) for value in state["statuses"])
+    if state["sort_field"] != "updated":
+        pairs.append(("sort", state["sort_field"]))
+    if state["direction"] != "desc":
+        pairs.append(("direction", state["direction"]))
+    if state["search"]:
+        pairs.append(("search", state["search"]))
+    if state["search_in"] != "title":
+        pairs.append(("search_in", state["search_in"]))
+    return urlencode(pairs)
+
+
+DASHBOARD_COLUMNS = (
+    "id,session_id,parent_session_id,project,title,created,updated,closed,status"
+)
+# Substring search below this length cannot use trigrams and scans titles.
+DASHBOARD_TRIGRAM_LENGTH = 3
+
+
+def dashboard_filter_sql(state: dict[str, Any]) -> tuple[str, list[Any]]:
+    clauses: list[str] = []
+    parameters: list[Any] = []
+    if state["projects"]:
+        clauses.append(f"project IN ({','.join('?' * len(state['projects']))})")
+        parameters.extend(state["projects"])
+    parent_clauses = []
+    if state["parent_session_ids"]:
+        parent_clauses.append(
+            f"parent_session_id IN ({','.join('?' * len(state['parent_session_ids']))})"
+        )
+        parameters.extend(state["parent_session_ids"])
+    if state["include_root"]:
+        parent_clauses.append("parent_session_id IS NULL")
+    if parent_clauses:
+        clauses.append(f"({' OR '.join(parent_clauses)})")
+    if state["statuses"]:
+        clauses.append(f"status IN ({','.join('?' * len(state['statuses']))})")
+        parameters.extend(state["statuses"])
+    search = state["search"].casefold()
+    if search and state["search_in"] == "rollouts":
+        # Message search is token based: the rollout index answers it whole,
+        # and the phrase literal keeps user punctuation out of FTS syntax.
+        clauses.append(
+            "id IN (SELECT rollout.thread_id FROM rollout_fts "
+            "JOIN rollout ON rollout.id=rollout_fts.rowid WHERE rollout_fts MATCH ?)"
+        )
+        parameters.append('"' + state["search"].replace('"', '""') + '"')
+    elif search:
+        if len(search) >= DASHBOARD_TRIGRAM_LENGTH:
+            clauses.append(
+                "rowid IN (SELECT rowid FROM thread_title_fts WHERE thread_title_fts MATCH ? "
+                "UNION ALL SELECT rowid FROM thread "
+                "WHERE length(title) <> length(CAST(title AS BLOB)))"
+            )
+            parameters.append('"' + search.replace('"', '""') + '"')
+        # Trigrams only narrow the candidates; the casefold test stays exact.
+        clauses.append("instr(agtask_casefold(title), ?) > 0")
+        parameters.append(search)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), parameters
+
+
+def dashboard_order_sql(field: str, direction: str) -> str:
+    # Leading with status lets the (status, field) indexes deliver each group
+    # in order. Missing values sort last in either direction; ties fall back to
+    # the most recently updated, then created, then the stable id.
+    return (
+        f"status,{field} {direction.upper()} NULLS LAST,"
+        "updated DESC,created DESC,id ASC"
+    )
+
+
+def open_dashboard_connection(*, check_same_thread: bool = True) -> sqlite3.Connection:
+    connection = open_readonly_database(check_same_thread=check_same_thread)
+    connection.create_function("agtask_casefold", 1, str.casefold, deterministic=True)
+    return connection
+
+
+def dashboard_snapshot(
+    connection: sqlite3.Connection, state: dict[str, Any]
+) -> dict[str, Any]:
+    where, parameters = dashboard_filter_sql(state)
+    project_counts = {
+        row[0]: row[1]
+        for row in connection.execute("SELECT project,COUNT(*) FROM thread GROUP BY project")
+    }
+    parent_counts: dict[Optional[str], int] = {
+        row[0]: row[1]
+        for row in connection.execute(
+            "SELECT parent_session_id,COUNT(*) FROM thread GROUP BY parent_session_id"
+        )
+    }
+    status_counts = {status: 0 for status in DASHBOARD_STATUSES}
+    status_counts.update(
+        connection.execute("SELECT status,COUNT(*) FROM thread GROUP BY status")
+    )
+    threads_by_status: dict[str, list[dict[str, Any]]] = {
+        status: [] for status in DASHBOARD_STATUSES
+    }
+    for row in connection.execute(
+        f"SELECT {DASHBOARD_COLUMNS} FROM thread{where} "
+        f"ORDER BY {dashboard_order_sql(state['sort_field'], state['direction'])}",
+        parameters,
+    ):
+        threads_by_status[row["status"]].append(dict(row))
+
+    group_statuses = state["statuses"] or list(DASHBOARD_STATUSES)
+    groups = [
+        {
+            "status": status,
+            "count": len(threads_by_status[status]),
+            "threads": threads_by_status[status],
+        }
+        for status in group_statuses
+    ]
+    parent_values = sorted(
+        parent_counts,
+        key=lambda value: (value is not None, (value or "").casefold(), value or ""),
+    )
+    return {
+        "filters": {
+            "projects": state["projects"],
+            "parent_session_ids": state["parent_session_ids"],
+            "include_root": state["include_root"],
+            "statuses": state["statuses"],
+        },
+        "search": state["search"],
+        "search_in": state["search_in"],
+        "sort": {"field": state["sort_field"], "direction": state["direction"]},
+        "total_count": sum(status_counts.values()),
+        "visible_count": sum(len(threads) for threads in threads_by_status.values()),
+        "facets": {
+            "projects": [
+                {"value": value, "count": project_counts[value]}
+                for value in dashboard_sorted_values(list(project_counts))
+            ],
+            "parents": [
+                {"value": value, "count": parent_counts[value]} for value in parent_values
+            ],
+            "statuses": [
+                {"value": status, "count": status_counts[status]}
+                for status in DASHBOARD_STATUSES
+            ],
+        },
+        "groups": groups,
+    }
+
+
+DASHBOARD_POLL_SECONDS = 0.5
+DASHBOARD_STATS_DAYS = 14
+DASHBOARD_KEEPALIVE_SECONDS = 15
+# Writers stamp `updated` before they commit, so a commit can land slightly
+# behind the newest timestamp already seen; rescan this far back each time.
+DASHBOARD_CHANGE_SLACK_SECONDS = 60
+DASHBOARD_RECONNECT_MS = 1000
+DASHBOARD_ID_BATCH = 500
+
+
+def dashboard_store_identity() -> tuple[int, int]:
+    info = os.stat(database_path())
+    return info.st_dev, info.st_ino
+
+
+class DashboardSubscription(NamedTuple):
+    state: dict[str, Any]
+    events: queue.Queue[Optional[dict[str, Any]]]
+
+
+class DashboardFeed:
+    """Turn ledger commits into per-view thread changes for event streams.
+
+    One polling thread runs while at least one stream is open. Each poll reads
+    `PRAGMA data_version`, which changes only when another connection commits,
+    so an idle ledger costs one pragma per interval regardless of how many
+    dashboards are watching.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.subscriptions: list[DashboardSubscription] = []
+        self.running = False
+        self.identity: tuple[int, int] = (0, 0)
+        self.data_version = 0
+        self.watermark = ""
+        self.rows: dict[str, dict[str, Any]] = {}
+        self.counts: dict[str, Counter[Any]] = {}
+
+    def subscribe(self, state: dict[str, Any]) -> DashboardSubscription:
+        subscription = DashboardSubscription(state, queue.Queue())
+        with self.lock:
+            if not self.running:
+                self.start()
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: DashboardSubscription) -> None:
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def start(self) -> None:
+        # SQLite connections stay on their creating thread, so the poller opens
+        # its own and reports baseline failures back to the first subscriber.
+        started = threading.Event()
+        failures: list[Exception] = []
+        threading.Thread(
+            target=self.run, args=(started, failures), daemon=True
+        ).start()
+        started.wait()
+        if failures:
+            raise failures[0]
+        self.running = True
+
+    def run(self, started: threading.Event, failures: list[Exception]) -> None:
+        try:
+            connection = open_dashboard_connection()
+        except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+            failures.append(error)
+            started.set()
+            return
+        try:
+            try:
+                self.load_baseline(connection)
+            except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+                failures.append(error)
+                return
+            finally:
+                started.set()
+            while True:
+                time.sleep(DASHBOARD_POLL_SECONDS)
+                with self.lock:
+                    if not self.subscriptions:
+                        self.running = False
+                        return
+                    try:
+                        self.poll(connection)
+                    except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+                        print(f"agtask: dashboard change feed stopped: {error}", file=sys.stderr)
+                        # Ending every stream makes browsers reconnect and fetch a
+                        # fresh snapshot, or surface the error if the ledger is gone.
+                        for subscription in self.subscriptions:
+                            subscription.events.put(None)
+                        self.subscriptions.clear()
+                        self.running = False
+                        return
+        finally:
+            connection.close()
+
+    def load_baseline(self, connection: sqlite3.Connection) -> None:
+        self.identity = dashboard_store_identity()
+        self.data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+        self.rows = {}
+        self.counts = {"projects": Counter(), "parents": Counter(), "statuses": Counter()}
+        self.watermark = ""
+        for row in connection.execute(f"SELECT {DASHBOARD_COLUMNS} FROM thread"):
+            self.apply(None, dict(row))
+
+    def apply(
+        self, previous: Optional[dict[str, Any]], current: Optional[dict[str, Any]]
+    ) -> None:
+        for row, step in ((previous, -1), (current, 1)):
+            if row is None:
+                continue
+            self.counts["projects"][row["project"]] += step
+            self.counts["parents"][row["parent_session_id"]] += step
+            self.counts["statuses"][row["status"]] += step
+        if current is None:
+            assert previous is not None
+            del self.rows[previous["id"]]
+            return
+        self.rows[current["id"]] = current
+        self.watermark = max(self.watermark, current["updated"])
+
+    def changed_rows(
+        self, connection: sqlite3.Connection
+    ) -> list[tuple[Optional[dict[str, Any]], Optional[dict[str, Any]]]]:
+        try:
+            since = utc_after(self.watermark, -DASHBOARD_CHANGE_SLACK_SECONDS)
+        except ValueError:
+            since = ""
+        changes: list[tuple[Optional[dict[str, Any]], Optional[dict[str, Any]]]] = []
+        for row in connection.execute(
+            f"SELECT {DASHBOARD_COLUMNS} FROM thread WHERE updated >= ?", (since,)
+        ):
+            current = dict(row)
+            previous = self.rows.get(current["id"])
+            if previous != current:
+                changes.append((previous, current))
+        inserted = sum(1 for previous, _current in changes if previous is None)
+        total = connection.execute("SELECT COUNT(*) FROM thread").fetchone()[0]
+        if total == len(self.rows) + inserted:
+            return changes
+        # Deletions, or writes stamped before the slack window, need a full diff.
+        current_rows = {
+            row["id"]: dict(row)
+            for row in connection.execute(f"SELECT {DASHBOARD_COLUMNS} FROM thread")
+        }
+        changes = [
+            (self.rows.get(thread_id), row)
+            for thread_id, row in current_rows.items()
+            if self.rows.get(thread_id) != row
+        ]
+        changes.extend(
+            (row, None) for thread_id, row in self.rows.items() if thread_id not in current_rows
+        )
+        return changes
+
+    def poll(self, connection: sqlite3.Connection) -> None:
+        if dashboard_store_identity() != self.identity:
+            raise TaskError("ledger was replaced")
+        version = connection.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return
+        self.data_version = version
+        changes = self.changed_rows(connection)
+        if not changes:
+            return
+        touched: dict[str, set[Any]] = {"projects": set(), "parents": set()}
+        changed_ids = []
+        for previous, current in changes:
+            for row in (previous, current):
+                if row is not None:
+                    touched["projects"].add(row["project"])
+                    touched["parents"].add(row["parent_session_id"])
+            changed = current if current is not None else previous
+            assert changed is not None
+            changed_ids.append(changed["id"])
+            self.apply(previous, current)
+        facets = {
+            "projects": [
+                {"value": value, "count": self.counts["projects"][value]}
+                for value in dashboard_sorted_values(list(touched["projects"]))
+            ],
+            "parents": [
+                {"value": value, "count": self.counts["parents"][value]}
+                for value in touched["parents"]
+            ],
+            "statuses": [
+                {"value": status, "count": self.counts["statuses"][status]}
+                for status in DASHBOARD_STATUSES
+            ],
+        }
+        live = [current for _previous, current in changes if current is not None]
+        for subscription in self.subscriptions:
+            visible = self.visible_ids(connection, subscription.state, live)
+            subscription.events.put(
+                {
+                    "threads": [row for row in live if row["id"] in visible],
+                    "removed": [
+                        thread_id for thread_id in changed_ids if thread_id not in visible
+                    ],
+                    "total_count": len(self.rows),
+                    "facets": facets,
+                }
+            )
+
+    def visible_ids(
+        self,
+        connection: sqlite3.Connection,
+        state: dict[str, Any],
+        rows: list[dict[str, Any]],
+    ) -> set[str]:
+        # Reuse the snapshot's SQL filter so streamed rows match a fresh load.
+        where, parameters = dashboard_filter_sql(state)
+        visible: set[str] = set()
+        for start in range(0, len(rows), DASHBOARD_ID_BATCH):
+            batch = [row["id"] for row in rows[start : start + DASHBOARD_ID_BATCH]]
+            visible.update(
+                row[0]
+                for row in connection.execute(
+                    f"SELECT id FROM thread{where} {'AND' if where else 'WHERE'} "
+                    f"id IN ({','.join('?' * len(batch))})",
+                    [*parameters, *batch],
+                )
+            )
+        return visible
+
+
+# Bodies smaller than this gain little from compression and skip it.
+DASHBOARD_GZIP_MIN_BYTES = 1024
+
+
+class DashboardLedgerClock:
+    """Name the committed ledger state for conditional API responses.
+
+    A long-lived connection's `PRAGMA data_version` changes whenever another
+    connection commits. Paired with a per-server epoch and an open counter that
+    advances when the ledger file is replaced, it identifies one committed
+    state without reading any table, so unchanged polls skip the snapshot.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.epoch = secrets.token_hex(8)
+        self.opened = 0
+        self.identity: tuple[int, int] = (0, 0)
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def generation(self) -> Optional[str]:
+        with self.lock:
+            try:
+                identity = dashboard_store_identity()
+                if self.connection is None or identity != self.identity:
+                    self.close()
+                    # Handler threads share this connection under the lock; it
+                    # only ever reads the pragma.
+                    self.connection = sqlite3.connect(
+                        f"{database_path().as_uri()}?mode=ro",
+                        uri=True,
+                        check_same_thread=False,
+                    )
+                    self.identity = identity
+                    self.opened += 1
+                version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            except (sqlite3.Error, OSError):
+                self.close()
+                return None
+            return f"{self.epoch}-{self.opened}-{version}"
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def dashboard_accepts_gzip(header: str) -> bool:
+    for item in header.split(","):
+        coding, *parameters = (part.strip() for part in item.split(";"))
+        if coding.lower() not in {"gzip", "x-gzip", "*"}:
+            continue
+        for parameter in parameters:
+            name, _separator, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    if float(value) <= 0:
+                        break
+                except ValueError:
+                    break
+        else:
+            return True
+    return False
+
+
+def dashboard_etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes still match.
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+DASHBOARD_ROLLOUT_PAGE = 100
+DASHBOARD_ROLLOUT_PAGE_MAX = 500
+
+
+def dashboard_rollout_page_from_query(query: str) -> tuple[Optional[tuple[str, int]], int]:
+    if not query:
+        return None, DASHBOARD_ROLLOUT_PAGE
+    if re.search(r"%(?![0-9A-Fa-f]{2})", query):
+        raise TaskError("malformed percent encoding")
+    try:
+        pairs = parse_qsl(
+            query,
+            keep_blank_values=True,
+            strict_parsing=True,
+            encoding="utf-8",
+            errors="strict",
+            max_num_fields=10,
+        )
+    except (UnicodeDecodeError, ValueError) as error:
+        raise TaskError("invalid task detail query string") from error
+    values: dict[str, str] = {}
+    for key, value in pairs:
+        if key not in {"before", "limit"}:
+            raise TaskError(f"unknown query parameter: {key}")
+        if key in values:
+            raise TaskError(f"duplicate query parameter: {key}")
+        values[key] = value
+    before = None
+    if "before" in values:
+        created, _separator, rollout_id = values["before"].rpartition(",")
+        if not created or not re.fullmatch(r"[0-9]{1,18}", rollout_id):
+            raise TaskError("invalid rollout cursor")
+        before = (created, int(rollout_id))
+    limit = DASHBOARD_ROLLOUT_PAGE
+    if "limit" in values:
+        if not re.fullmatch(r"[0-9]{1,4}", values["limit"]) or not (
+            1 <= int(values["limit"]) <= DASHBOARD_ROLLOUT_PAGE_MAX
+        ):
+            raise TaskError(f"limit must be between 1 and {DASHBOARD_ROLLOUT_PAGE_MAX}")
+        limit = int(values["limit"])
+    return before, limit
+
+
+def dashboard_stats_from_query(query: str) -> tuple[int, list[str]]:
+    if re.search(r"%(?![0-9A-Fa-f]{2})", query):
+        raise TaskError("malformed percent encoding")
+    try:
+        pairs = parse_qsl(
+            query,
+            keep_blank_values=True,
+            strict_parsing=bool(query),
+            encoding="utf-8",
+            errors="strict",
+            max_num_fields=100,
+        )
+    except (UnicodeDecodeError, ValueError) as error:
+        raise TaskError("invalid stats query string") from error
+    days = DASHBOARD_STATS_DAYS
+    projects: list[str] = []
+    seen_days = False
+    for key, value in pairs:
+        if key == "project":
+            if not value:
+                raise TaskError("project must not be empty")
+            projects.append(value)
+        elif key == "days":
+            if seen_days:
+                raise TaskError("duplicate query parameter: days")
+            if not re.fullmatch(r"[0-9]{1,4}", value) or not 1 <= int(value) <= STATS_MAX_DAYS:
+                raise TaskError(f"days must be between 1 and {STATS_MAX_DAYS}")
+            days, seen_days = int(value), True
+        else:
+            raise TaskError(f"unknown query parameter: {key}")
+    return days, sorted(set(projects))
+
+
+def dashboard_task_detail(
+    connection: sqlite3.Connection,
+    session_id: str,
+    *,
+    before: Optional[tuple[str, int]] = None,
+    limit: int = DASHBOARD_ROLLOUT_PAGE,
+) -> Optional[dict[str, Any]]:
+    row = connection.execute(
+        "SELECT id,session_id,parent_session_id,title,description,created,updated "
+        "FROM thread WHERE session_id=?",
+        (session_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    detail = dict(row)
+    detail["rollout_count"] = connection.execute(
+        "SELECT COUNT(*) FROM rollout WHERE thread_id=?", (row["id"],)
+    ).fetchone()[0]
+    archived = archived_rollouts(connection, row["id"])
+    # Keyset pages walk rollout_thread_order_idx backwards from the cursor,
+    # so deep pages cost the same as the first and ignore concurrent inserts.
+    cursor_clause = " AND (created,id)<(?,?)" if before is not None else ""
+    page = connection.execute(
+        "SELECT id,created,turn_id,role,message FROM rollout "
+        f"WHERE thread_id=?{cursor_clause} ORDER BY created DESC,id DESC LIMIT ?",
+        (row["id"], *(before or ()), limit + (1 if archived is None else 2)),
+    ).fetchall()
+    if archived is not None:
+        # Compacted history keeps its original ids, so the archive merges
+        # into the same (created, id) keyset in place of its marker row.
+        detail["rollout_count"] += len(archived) - 1
+        page = sorted(
+            [
+                rollout
+                for rollout in page
+                if not (rollout["role"] == "meta" and rollout["turn_id"] == ARCHIVE_TURN_ID)
+            ]
+            + [
+                rollout
+                for rollout in archived
+                if before is None or (rollout["created"], rollout["id"]) < before
+            ],
+            key=lambda rollout: (rollout["created"], rollout["id"]),
+            reverse=True,
+        )[: limit + 1]
+    detail["rollouts"] = [
+        {key: rollout[key] for key in ("created", "role", "message")}
+        for rollout in page[:limit]
+    ]
+    detail["next_cursor"] = (
+        f"{page[limit - 1]['created']},{page[limit - 1]['id']}"
+        if len(page) > limit
+        else None
+    )
+    return detail
+
+
+def dashboard_update_task_status(
+    session_id: str, expected_status: str, target: str
+) -> Optional[dict[str, Any]]:
+    connection = open_database(initialize=False)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute(
+            "SELECT id,status FROM thread WHERE session_id=?", (session_id,)
+        ).fetchone()
+        if row is None:
+            connection.rollback()
+            return None
+        if row["status"] != expected_status:
+            raise StatusConflict(
+                f"task status changed from {expected_status} to {row['status']}; "
+                "refresh and try again"
+            )
+        changed = transition_manual_status(
+            connection, thread_id=row["id"], target=target
+        )
+        task = connection.execute(
+            "SELECT id,session_id,parent_session_id,project,title,created,updated,closed,status "
+            "FROM thread WHERE id=?",
+            (row["id"],),
+        ).fetchone()
+        assert task is not None
+        connection.commit()
+        return {"changed": changed, "task": dict(task)}
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def dashboard_task_session_id(path: str, prefix: str) -> Optional[str]:
+    if not path.startswith(prefix):
+        return None
+    marked = path[len(prefix) :]
+    if not marked.startswith("~"):
+        raise TaskError("invalid task path")
+    encoded = marked[1:]
+    if not encoded or "/" in encoded or re.search(r"%(?![0-9A-Fa-f]{2})", encoded):
+        raise TaskError("invalid task path")
+    try:
+        session_id = unquote(encoded, encoding="utf-8", errors="strict")
+    except (UnicodeDecodeError, ValueError) as error:
+        raise TaskError("invalid task path") from error
+    if not session_id:
+        raise TaskError("invalid task path")
+    return session_id
+
+
+def dashboard_status_session_id(path: str, prefix: str) -> Optional[str]:
+    suffix = "/status"
+    if not path.endswith(suffix):
+        return None
+    return dashboard_task_session_id(path[: -len(suffix)], prefix)
+
+
+DASHBOARD_POOL_SIZE = 4
+
+
+class DashboardConnectionPool:
+    """Lend read-only ledger connections to dashboard request threads.
+
+    ThreadingHTTPServer starts a thread per request, so a thread-local
+    connection would never be reused; idle connections are shared instead and
+    each is used by one request at a time. A replaced ledger file or any DDL
+    since a connection was opened closes it rather than reusing stale state.
+    """
+
+    def __init__(self, size: int = DASHBOARD_POOL_SIZE) -> None:
+        self.lock = threading.Lock()
+        self.size = size
+        self.idle: list[sqlite3.Connection] = []
+        self.identity: Optional[tuple[int, int]] = None
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        identity = dashboard_store_identity()
+        with self.lock:
+            if identity != self.identity:
+                self.close_idle()
+                self.identity = identity
+            connection = self.idle.pop() if self.idle else None
+        if connection is not None:
+            try:
+                reusable = schema_fingerprint_matches(connection)
+            except sqlite3.Error:
+                reusable = False
+            if not reusable:
+                connection.close()
+                connection = None
+        if connection is None:
+            connection = open_dashboard_connection(check_same_thread=False)
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            raise
+        with self.lock:
+            if identity == self.identity and len(self.idle) < self.size:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def close_idle(self) -> None:
+        while self.idle:
+            self.idle.pop().close()
+
+    def close(self) -> None:
+        with self.lock:
+            self.close_idle()
+
+
+class DashboardHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.connections = DashboardConnectionPool()
+        super().__init__(*args, **kwargs)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.connections.close()
+
+    def handle_error(self, _request: Any, _client_address: Any) -> None:
+        print("agtask: dashboard request failed", file=sys.stderr)
+
+
+def dashboard_handler(token: str, expected_host: str) -> type[BaseHTTPRequestHandler]:
+    root = f"/{token}/"
+    task_page_prefix = root + "tasks/"
+    task_api_prefix = root + "api/tasks/"
+    feed = DashboardFeed()
+    clock = DashboardLedgerClock()
+    assets = {
+        root: ("text/html; charset=utf-8", DASHBOARD_HTML.encode("utf-8"), True),
+        root + "app.css": (
+            "text/css; charset=utf-8",
+            DASHBOARD_CSS.encode("utf-8"),
+            False,
+        ),
+        root + "app.js": (
+            "text/javascript; charset=utf-8",
+            DASHBOARD_JS.encode("utf-8"),
+            False,
+        ),
+        root + "task.js": (
+            "text/javascript; charset=utf-8",
+            TASK_DETAIL_JS.encode("utf-8"),
+            False,
+        ),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, _format: str, *args: Any) -> None:
+            return
+
+        def send_payload(
+            self,
+            status: int,
+            content_type: str,
+            body: bytes,
+            *,
+            html: bool = False,
+            etag: Optional[str] = None,
+            encoding: Optional[str] = None,
+        ) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            if etag is not None:
+                self.send_header("ETag", etag)
+                self.send_header("Vary", "Accept-Encoding")
+                # Browsers may keep validated API bodies but must revalidate each use.
+                self.send_header("Cache-Control", "private, no-cache")
+            else:
+                self.send_header("Cache-Control", "no-store")
+            self.send_header("Referrer-Policy", "no-referrer")
+            self.send_header("X-Content-Type-Options", "nosniff")
+            if html:
+                self.send_header("Content-Security-Policy", DASHBOARD_CSP)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def send_ledger_json(
+            self,
+            read: Callable[[sqlite3.Connection], Optional[Any]],
+            label: str,
+            unavailable: str,
+            *,
+            tag: str = "",
+        ) -> None:
+            # Take the generation before reading: a commit that lands between
+            # the two only makes the next request's tag differ, never hides data.
+            generation = clock.generation()
+            gzip_accepted = dashboard_accepts_gzip(
+                ", ".join(self.headers.get_all("Accept-Encoding", failobj=[]))
+            )
+            etag = None
+            if generation is not None:
+                etag = f'"{generation}{tag}{"-gzip" if gzip_accepted else ""}"'
+                if dashboard_etag_matches(
+                    ", ".join(self.headers.get_all("If-None-Match", failobj=[])), etag
+                ):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.send_header("Cache-Control", "private, no-cache")
+                    self.end_headers()
+                    return
+            try:
+                with self.server.connections.connection() as connection:
+                    payload = read(connection)
+            except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+                print(f"agtask: {label} unavailable: {error}", file=sys.stderr)
+                self.send_json_error(503, unavailable)
+                return
+            if payload is None:
+                self.send_json_error(404, "task not found")
+                return
+            body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode(
+                "utf-8"
+            )
+            encoding = None
+            if gzip_accepted and len(body) >= DASHBOARD_GZIP_MIN_BYTES:
+                body = gzip.compress(body, compresslevel=6, mtime=0)
+                encoding = "gzip"
+            self.send_payload(
+                200,
+                "application/json; charset=utf-8",
+                body,
+                etag=etag,
+                encoding=encoding,
+            )
+
+        def send_json_error(self, status: int, message: str) -> None:
+            self.send_payload(
+                status,
+                "application/json; charset=utf-8",
+                json.dumps({"error": message}, separators=(",", ":")).encode("utf-8"),
+            )
+
+        def valid_host(self) -> bool:
+            values = self.headers.get_all("Host", failobj=[])
+            return len(values) == 1 and values[0] == expected_host
+
+        def valid_origin(self) -> bool:
+            values = self.headers.get_all("Origin", failobj=[])
+            return len(values) == 1 and values[0] == f"http://{expected_host}"
+
+        def handle_read(self) -> None:
+            if not self.valid_host():
+                self.send_json_error(404, "not found")
+                return
+            parsed = urlsplit(self.path)
+            if parsed.path in assets:
+                content_type, body, is_html = assets[parsed.path]
+                self.send_payload(200, content_type, body, html=is_html)
+                return
+            try:
+                page_session_id = dashboard_task_session_id(parsed.path, task_page_prefix)
+                api_session_id = dashboard_task_session_id(parsed.path, task_api_prefix)
+            except TaskError:
+                self.send_json_error(404, "not found")
+                return
+            if page_session_id is not None:
+                if parsed.query:
+                    self.send_json_error(404, "not found")
+                    return
+                self.send_payload(
+                    200,
+                    "text/html; charset=utf-8",
+                    TASK_DETAIL_HTML.encode("utf-8"),
+                    html=True,
+                )
+                return
+            if api_session_id is not None:
+                try:
+                    before, limit = dashboard_rollout_page_from_query(parsed.query)
+                except TaskError as error:
+                    self.send_json_error(400, str(error))
+                    return
+                self.send_ledger_json(
+                    lambda connection: dashboard_task_detail(
+                        connection, api_session_id, before=before, limit=limit
+                    ),
+                    "task detail",
+                    "task data unavailable",
+                )
+                return
+            if parsed.path == root + "api/stats":
+                try:
+                    days, projects = dashboard_stats_from_query(parsed.query)
+                except TaskError as error:
+                    self.send_json_error(400, str(error))
+                    return
+                # The window ends today, so a new UTC day must change the tag
+                # even when the ledger itself has not.
+                today = utc_today()
+                self.send_ledger_json(
+                    lambda connection: stats_report(
+                        connection, days=days, projects=projects, today=today
+                    ),
+                    "activity stats",
+                    "activity data unavailable",
+                    tag=f"-{today.isoformat()}",
+                )
+                return
+            if parsed.path not in {root + "api/dashboard", root + "api/events"}:
+                self.send_json_error(404, "not found")
+                return
+            try:
+                state = dashboard_state_from_query(parsed.query)
+            except TaskError as error:
+                self.send_json_error(400, str(error))
+                return
+            if parsed.path == root + "api/events":
+                self.stream_events(state)
+                return
+            self.send_ledger_json(
+                lambda connection: dashboard_snapshot(connection, state),
+                "dashboard snapshot",
+                "dashboard data unavailable",
+            )
+
+        def write_event(self, name: str, payload: dict[str, Any]) -> None:
+            data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+            self.wfile.write(f"event: {name}\ndata: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def stream_events(self, state: dict[str, Any]) -> None:
+            # Subscribe before taking the snapshot: every later commit is then
+            # delivered, and replaying one the snapshot already holds is harmless.
+            try:
+                subscription = feed.subscribe(state)
+            except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+                print(f"agtask: dashboard events unavailable: {error}", file=sys.stderr)
+                self.send_json_error(503, "dashboard data unavailable")
+                return
+            try:
+                try:
+                    with self.server.connections.connection() as connection:
+                        snapshot = dashboard_snapshot(connection, state)
+                except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+                    print(f"agtask: dashboard snapshot unavailable: {error}", file=sys.stderr)
+                    self.send_json_error(503, "dashboard data unavailable")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Cache-Control", "no-store")
+                self.send_header("Referrer-Policy", "no-referrer")
+                self.send_header("X-Content-Type-Options", "nosniff")
+                self.end_headers()
+                if self.command == "HEAD":
+                    return
+                self.wfile.write(f"retry: {DASHBOARD_RECONNECT_MS}\n".encode("ascii"))
+                self.write_event("snapshot", snapshot)
+                while True:
+                    try:
+                        event = subscription.events.get(
+                            timeout=DASHBOARD_KEEPALIVE_SECONDS
+                        )
+                    except queue.Empty:
+                        self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                        continue
+                    if event is None:
+                        return
+                    self.write_event("changes", event)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            finally:
+                feed.unsubscribe(subscription)
+
+        def handle_status_update(self) -> None:
+            if not self.valid_host():
+                self.send_json_error(404, "not found")
+                return
+            parsed = urlsplit(self.path)
+            try:
+                session_id = dashboard_status_session_id(
+                    parsed.path, task_api_prefix
+                )
+            except TaskError:
+                self.send_json_error(404, "not found")
+                return
+            if session_id is None:
+                self.send_json_error(404, "not found")
+                return
+            if parsed.query:
+                self.send_json_error(400, "task status query is not supported")
+                return
+            if not self.valid_origin():
+                self.send_json_error(403, "invalid origin")
+                return
+            content_types = self.headers.get_all("Content-Type", failobj=[])
+            if (
+                len(content_types) != 1
+                or content_types[0].split(";", 1)[0].strip().lower()
+                != "application/json"
+            ):
+                self.send_json_error(415, "content type must be application/json")
+                return
+            if self.headers.get_all("Transfer-Encoding", failobj=[]):
+                self.send_json_error(400, "transfer encoding is not supported")
+                return
+            content_lengths = self.headers.get_all("Content-Length", failobj=[])
+            try:
+                if len(content_lengths) != 1:
+                    raise ValueError
+                content_length = int(content_lengths[0])
+                if content_length < 1 or content_length > 4096:
+                    raise ValueError
+            except ValueError:
+                self.send_json_error(400, "invalid content length")
+                return
+            def unique_object(pairs: list[tuple[str, Any]]) -> dict[str, Any]:
+                value: dict[str, Any] = {}
+                for key, item in pairs:
+                    if key in value:
+                        raise ValueError(f"duplicate JSON field: {key}")
+                    value[key] = item
+                return value
+
+            try:
+                payload = json.loads(
+                    self.rfile.read(content_length),
+                    object_pairs_hook=unique_object,
+                )
+            except (json.JSONDecodeError, UnicodeDecodeError, ValueError):
+                self.send_json_error(400, "invalid JSON body")
+                return
+            if not isinstance(payload, dict) or set(payload) != {
+                "expected_status",
+                "status",
+            }:
+                self.send_json_error(
+                    400,
+                    "status update requires exactly expected_status and status fields",
+                )
+                return
+            expected_status = payload["expected_status"]
+            target = payload["status"]
+            if (
+                not isinstance(expected_status, str)
+                or expected_status not in DASHBOARD_STATUSES
+            ):
+                self.send_json_error(
+                    400, f"invalid expected task status: {expected_status}"
+                )
+                return
+            if not isinstance(target, str) or target not in MANUAL_STATUSES:
+                self.send_json_error(400, f"invalid task status: {target}")
+                return
+            try:
+                result = dashboard_update_task_status(
+                    session_id, expected_status, target
+                )
+            except StatusConflict as error:
+                self.send_json_error(409, str(error))
+                return
+            except (TaskError, sqlite3.Error, OSError, ValueError) as error:
+                print(f"agtask: dashboard status update unavailable: {error}", file=sys.stderr)
+                self.send_json_error(503, "task status update unavailable")
+                return
+            if result is None:
+                self.send_json_error(404, "task not found")
+                return
+            body = json.dumps(
+                result, separators=(",", ":"), ensure_ascii=False
+            ).encode("utf-8")
+            self.send_payload(200, "application/json; charset=utf-8", body)
+
+        def do_GET(self) -> None:
+            self.handle_read()
+
+        def do_HEAD(self) -> None:
+            self.handle_read()
+
+        def do_PATCH(self) -> None:
+            self.handle_status_update()
+
+        def unsupported(self) -> None:
+            if not self.valid_host():
+                self.send_json_error(404, "not found")
+                return
+            self.send_json_error(405, "method not allowed")
+
+        def __getattr__(self, name: str) -> Any:
+            if name.startswith("do_"):
+                return self.unsupported
+            raise AttributeError(name)
+
+        do_POST = unsupported
+        do_PUT = unsupported
+        do_DELETE = unsupported
+        do_OPTIONS = unsupported
+
+    return Handler
+
+
+def command_dashboard(args: argparse.Namespace) -> None:
+    if args.json and args.no_open:
+        raise TaskError("--json and --no-open cannot be used together")
+    state = dashboard_state_from_args(args)
+    connection = open_dashboard_connection()
+    try:
+        snapshot = dashboard_snapshot(connection, state)
+    finally:
+        connection.close()
+    if args.json:
+        emit(snapshot, True)
+        return
+
+    token = secrets.token_urlsafe(32)
+    server = DashboardHTTPServer(("127.0.0.1", 0), dashboard_handler(token, "pending"))
+    port = server.server_address[1]
+    expected_host = f"127.0.0.1:{port}"
+    server.RequestHandlerClass = dashboard_handler(token, expected_host)
+    base_url = f"http://{expected_host}/{token}/"
+    query = dashboard_query(state)
+    url = base_url + (f"?{query}" if query else "")
+    print(url, flush=True)
+    if not args.no_open:
+        try:
+            if not webbrowser.open(url, new=2):
+                print("agtask: browser did not open; use the printed URL", file=sys.stderr)
+        except Exception:
+            print("agtask: browser did not open; use the printed URL", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
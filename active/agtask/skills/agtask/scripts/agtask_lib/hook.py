@@ -0,0 +1,206 @@
+"""Codex command-hook dispatch shared by `agtask hook`, `agtask-hook`, and `hookd`."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import sqlite3
+import sys
+from typing import Any, Optional, TYPE_CHECKING
+
+from .core import (
+    BOOTSTRAP_VERSION,
+    TaskError,
+    append_rollout,
+    bootstrap_action_context,
+    load_configuration,
+    open_database,
+    parse_bootstrap_envelope,
+    record_turn,
+    thread_by_session,
+    thread_context,
+)
+from .registration import register_thread
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class HookConnections:
+    """Per-invocation hook connections: open for one payload, then close."""
+
+    def acquire(self, *, initialize: bool) -> Optional[sqlite3.Connection]:
+        return open_database(initialize=initialize, hook_mode=True)
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        connection.close()
+
+    def close(self) -> None:
+        pass
+
+
+def dispatch_hook(
+    raw: str,
+    output: list[str],
+    *,
+    cwd: Optional[Path],
+    connections: HookConnections,
+) -> None:
+    connection: Optional[sqlite3.Connection] = None
+    event: Optional[str] = None
+    user_prompt_context: list[str] = []
+    registration_arguments: Optional[dict[str, Any]] = None
+    deferred_v2_action_context = ""
+    try:
+        payload = json.loads(raw)
+        if not isinstance(payload, dict):
+            return
+        event = payload.get("hook_event_name")
+        external_session_id = payload.get("session_id")
+        if not isinstance(event, str) or not isinstance(external_session_id, str):
+            return
+        if event == "UserPromptSubmit":
+            prompt = payload.get("prompt")
+            if isinstance(prompt, str):
+                try:
+                    envelope = parse_bootstrap_envelope(prompt)
+                except TaskError:
+                    envelope = None
+                if envelope is not None:
+                    action_context = bootstrap_action_context(prompt, external_session_id)
+                    if envelope[0] == BOOTSTRAP_VERSION:
+                        registration_arguments = envelope[1]
+                        deferred_v2_action_context = action_context
+                    else:
+                        user_prompt_context.append(action_context)
+        load_configuration(cwd)
+        connection = connections.acquire(initialize=registration_arguments is not None)
+        if connection is None:
+            return
+        if event == "UserPromptSubmit":
+            prompt = payload.get("prompt")
+            turn_id = payload.get("turn_id")
+            if isinstance(prompt, str) and isinstance(turn_id, str):
+                connection.execute("BEGIN IMMEDIATE")
+                session_row = thread_by_session(connection, external_session_id)
+                if registration_arguments is not None:
+                    logical_id = registration_arguments["id"]
+                    id_row = connection.execute(
+                        "SELECT * FROM thread WHERE id=?", (logical_id,)
+                    ).fetchone()
+                    if (
+                        (id_row is not None and id_row["session_id"] != external_session_id)
+                        or (session_row is not None and session_row["id"] != logical_id)
+                    ):
+                        connection.rollback()
+                        return
+                    try:
+                        register_thread(
+                            connection,
+                            thread_id=logical_id,
+                            session_id=external_session_id,
+                            parent_session_id=registration_arguments["parent_session_id"],
+                            kind="child",
+                            project=registration_arguments["project"],
+                            title=registration_arguments["title"],
+                            initial_prompt=prompt,
+                            description=None,
+                            status="active",
+                        )
+                    except TaskError:
+                        connection.rollback()
+                        return
+                else:
+                    if session_row is None:
+                        connection.rollback()
+                        return
+                    logical_id = session_row["id"]
+                record_turn(
+                    connection,
+                    thread_id=logical_id,
+                    role="user",
+                    turn_id=turn_id,
+                    content=prompt,
+                )
+                connection.commit()
+                user_prompt_context.append(deferred_v2_action_context)
+                user_prompt_context.append(thread_context(connection, logical_id))
+        else:
+            session_row = thread_by_session(connection, external_session_id)
+            if session_row is None:
+                return
+            thread_id = session_row["id"]
+            if event == "Stop":
+                message = payload.get("last_assistant_message")
+                turn_id = payload.get("turn_id")
+                if isinstance(message, str) and message and isinstance(turn_id, str):
+                    connection.execute("BEGIN IMMEDIATE")
+                    record_turn(
+                        connection,
+                        thread_id=thread_id,
+                        role="assistant",
+                        turn_id=turn_id,
+                        content=message,
+                    )
+                    connection.commit()
+            elif event == "PostCompact":
+                turn_id = payload.get("turn_id")
+                trigger = payload.get("trigger")
+                if isinstance(turn_id, str) and trigger in {"manual", "auto"}:
+                    connection.execute("BEGIN IMMEDIATE")
+                    append_rollout(
+                        connection,
+                        thread_id=thread_id,
+                        turn_id=f"compact:{turn_id}:{trigger}",
+                        role="meta",
+                        message=f"compaction:{trigger}",
+                    )
+                    connection.commit()
+            elif event == "SessionStart":
+                source = payload.get("source")
+                if source in {"startup", "resume", "clear", "compact"}:
+                    output.append(thread_context(connection, thread_id))
+    except Exception:
+        # Hooks are global and deliberately fail open. Direct CLI commands retain errors.
+        return
+    finally:
+        if connection is not None:
+            connections.release(connection)
+        if event == "UserPromptSubmit":
+            additional_context = "".join(user_prompt_context)
+            if additional_context:
+                output.append(
+                    json.dumps(
+                        {
+                            "hookSpecificOutput": {
+                                "hookEventName": "UserPromptSubmit",
+                                "additionalContext": additional_context,
+                            }
+                        },
+                        separators=(",", ":"),
+                    )
+                    + "\n"
+                )
+
+
+def hook_response(
+    raw: str,
+    *,
+    cwd: Optional[Path] = None,
+    connections: Optional[HookConnections] = None,
+) -> str:
+    output: list[str] = []
+    dispatch_hook(raw, output, cwd=cwd, connections=connections or HookConnections())
+    return "".join(output)
+
+
+def handle_hook() -> None:
+    try:
+        raw = sys.stdin.read()
+    except (OSError, ValueError):
+        return
+    sys.stdout.write(hook_response(raw))
+
+
+def command_hook(_args: argparse.Namespace) -> None:
+    handle_hook()
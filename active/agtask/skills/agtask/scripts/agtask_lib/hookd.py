@@ -0,0 +1,150 @@
+"""Opt-in warm hook daemon serving `agtask-hook` payloads over a Unix socket."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import signal
+import socket
+import sqlite3
+import stat
+import sys
+from typing import Optional, TYPE_CHECKING
+
+from .core import (
+    TaskError,
+    database_path,
+    emit,
+    ensure_mode,
+    hookd_socket_path,
+    open_database,
+    prepare_store,
+    schema_fingerprint_matches,
+)
+from .hook import (
+    HookConnections,
+    hook_response,
+)
+
+if TYPE_CHECKING:
+    import argparse
+
+
+HOOKD_IO_TIMEOUT_SECONDS = 5
+HOOKD_REQUEST_LIMIT = 16 * 1024 * 1024
+HOOKD_REPLY_PREFIX = b"ok\n"
+
+
+class CachedHookConnections(HookConnections):
+    """Keep one warm WAL connection across hook payloads served by `hookd`."""
+
+    def __init__(self) -> None:
+        self.connection: Optional[sqlite3.Connection] = None
+        self.identity: Optional[tuple[Path, int, int]] = None
+
+    def current_identity(self) -> Optional[tuple[Path, int, int]]:
+        path = database_path()
+        try:
+            status = path.stat()
+        except FileNotFoundError:
+            return None
+        return (path, status.st_dev, status.st_ino)
+
+    def acquire(self, *, initialize: bool) -> Optional[sqlite3.Connection]:
+        identity = self.current_identity()
+        if self.connection is not None:
+            # A moved-aside or replaced ledger, or any DDL since the last payload,
+            # reopens through the full open path instead of reusing stale state.
+            if identity == self.identity and schema_fingerprint_matches(self.connection):
+                prepare_store(identity[0], repair=False)
+                return self.connection
+            self.close()
+        connection = open_database(initialize=initialize, hook_mode=True)
+        if connection is not None:
+            self.connection = connection
+            self.identity = self.current_identity()
+        return connection
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        if connection.in_transaction:
+            connection.rollback()
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+        self.identity = None
+
+
+def read_hookd_request(client: socket.socket) -> tuple[Path, str]:
+    chunks: list[bytes] = []
+    size = 0
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > HOOKD_REQUEST_LIMIT:
+            raise TaskError("hookd request exceeds the size limit")
+        chunks.append(chunk)
+    # The shim sends its working directory, a NUL separator, then the raw
+    # payload, so project configuration resolves as it would in-process.
+    cwd, separator, payload = b"".join(chunks).partition(b"\0")
+    if not separator:
+        raise TaskError("hookd request must contain a working directory")
+    return Path(os.fsdecode(cwd)), payload.decode("utf-8", "replace")
+
+
+def serve_hookd(listener: socket.socket) -> None:
+    connections = CachedHookConnections()
+    try:
+        while True:
+            client, _address = listener.accept()
+            with client:
+                try:
+                    client.settimeout(HOOKD_IO_TIMEOUT_SECONDS)
+                    cwd, payload = read_hookd_request(client)
+                    response = hook_response(payload, cwd=cwd, connections=connections)
+                    client.sendall(HOOKD_REPLY_PREFIX + response.encode("utf-8"))
+                except Exception:
+                    # One bad client must not stop the daemon; a shim that gets no
+                    # reply prints the empty fail-open response.
+                    continue
+    finally:
+        connections.close()
+
+
+def command_hookd(args: argparse.Namespace) -> None:
+    path = hookd_socket_path()
+    if path.parent == database_path().parent:
+        prepare_store(database_path(), repair=True)
+    ensure_mode(path.parent, 0o700, False)
+    if path.exists() or path.is_symlink():
+        if not stat.S_ISSOCK(path.lstat().st_mode):
+            raise TaskError(f"hookd socket path is not a socket: {path}")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()
+        else:
+            raise TaskError(f"hookd is already listening on {path}")
+        finally:
+            probe.close()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(str(path))
+        path.chmod(0o600)
+        listener.listen(16)
+        signal.signal(signal.SIGTERM, lambda _signum, _frame: sys.exit(0))
+        emit({"pid": os.getpid(), "socket": str(path)}, args.json)
+        sys.stdout.flush()
+        try:
+            serve_hookd(listener)
+        except KeyboardInterrupt:
+            pass
+    finally:
+        listener.close()
+        if path.exists() and stat.S_ISSOCK(path.lstat().st_mode):
+            path.unlink()
@@ -0,0 +1,452 @@
+"""Thread creation inputs and registration commands."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+from typing import NamedTuple, Optional, TYPE_CHECKING
+
+from .core import (
+    BOOTSTRAP_VERSION,
+    TaskError,
+    append_rollout,
+    bootstrap_trailer,
+    emit,
+    lifecycle_result,
+    normalized_message,
+    open_database,
+    prompt_hooks,
+    require_nonempty,
+    thread_by_session,
+    thread_dict,
+    utc_now,
+    validate_creation_id,
+    validate_title,
+    validate_title_bootstrap_argument,
+)
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class RegistrationResult(NamedTuple):
+    created: bool
+    rebound_from_session_id: Optional[str] = None
+
+
+def register_thread(
+    connection: sqlite3.Connection,
+    *,
+    thread_id: str,
+    session_id: str,
+    parent_session_id: Optional[str],
+    kind: str,
+    project: str,
+    title: str,
+    initial_prompt: Optional[str],
+    description: Optional[str],
+    status: str,
+    authoritative_session: bool = False,
+    now: Optional[str] = None,
+) -> RegistrationResult:
+    validate_creation_id(thread_id)
+    require_nonempty(session_id, "session_id")
+    require_nonempty(project, "project")
+    if project != project.strip():
+        raise TaskError("project must not contain surrounding whitespace")
+    if parent_session_id is not None:
+        require_nonempty(parent_session_id, "parent_session_id")
+    if parent_session_id == session_id:
+        raise TaskError("thread cannot name itself as parent_session_id")
+    if kind == "main" and parent_session_id is not None:
+        raise TaskError("main thread must not have parent_session_id")
+    if kind == "child" and parent_session_id is None:
+        raise TaskError("child thread requires parent_session_id")
+    if kind not in {"main", "child"}:
+        raise TaskError(f"unsupported kind: {kind}")
+    if status not in {"todo", "active"}:
+        raise TaskError(f"unsupported registration status: {status}")
+
+    if authoritative_session and kind != "child":
+        raise TaskError("--authoritative-session is only valid for child threads")
+    if authoritative_session and initial_prompt is None:
+        raise TaskError("--authoritative-session requires --initial-prompt")
+    if authoritative_session and status != "active":
+        raise TaskError("--authoritative-session requires --status active")
+
+    prompt_description = (
+        normalized_message(initial_prompt) if initial_prompt is not None else None
+    )
+    asserted_description = (
+        normalized_message(description) if description is not None else None
+    )
+    if (
+        prompt_description is not None
+        and asserted_description is not None
+        and prompt_description != asserted_description
+    ):
+        raise TaskError(
+            "--description conflicts with the normalized --initial-prompt: "
+            f"description {asserted_description!r}, prompt {prompt_description!r}"
+        )
+    requested_description = prompt_description or asserted_description
+
+    existing = connection.execute(
+        "SELECT status,session_id,parent_session_id,kind,project,title,description,closed "
+        "FROM thread WHERE id=?",
+        (thread_id,),
+    ).fetchone()
+    session_owner = thread_by_session(connection, session_id)
+    if existing is not None and existing["session_id"] != session_id:
+        if not authoritative_session:
+            raise TaskError(
+                f"id conflict for thread {thread_id}: stored session_id "
+                f"{existing['session_id']}, requested {session_id}"
+            )
+        if session_owner is not None:
+            raise TaskError(
+                f"session_id conflict for {session_id}: stored id "
+                f"{session_owner['id']}, requested {thread_id}"
+            )
+        if parent_session_id != existing["parent_session_id"]:
+            raise TaskError(
+                f"parent_session_id conflict for thread {thread_id}: stored "
+                f"{existing['parent_session_id']}, requested {parent_session_id}"
+            )
+        if kind != existing["kind"]:
+            raise TaskError(
+                f"kind conflict for thread {thread_id}: stored {existing['kind']}, "
+                f"requested {kind}"
+            )
+        if project != existing["project"]:
+            raise TaskError(
+                f"project conflict for thread {thread_id}: stored "
+                f"{existing['project']}, requested {project}"
+            )
+        if existing["title"] != title:
+            raise TaskError(
+                f"title conflict for thread {thread_id}: stored "
+                f"{existing['title']!r}, requested {title!r}"
+            )
+        if existing["status"] != "active" or existing["closed"] is not None:
+            raise TaskError(
+                f"cannot rebind non-provisional thread {thread_id}: stored status "
+                f"{existing['status']}"
+            )
+        rollout_shape = connection.execute(
+            "SELECT "
+            "sum(CASE WHEN role='meta' AND turn_id='thread.created' "
+            "AND message='thread.created' THEN 1 ELSE 0 END) AS created_count, "
+            "sum(CASE WHEN role='meta' AND NOT (turn_id='thread.created' "
+            "AND message='thread.created') THEN 1 ELSE 0 END) AS other_meta_count, "
+            "sum(CASE WHEN role='user' THEN 1 ELSE 0 END) AS user_count "
+            "FROM rollout WHERE thread_id=?",
+            (thread_id,),
+        ).fetchone()
+        if (
+            rollout_shape is None
+            or rollout_shape["created_count"] != 1
+            or rollout_shape["other_meta_count"] != 0
+            or rollout_shape["user_count"] != 1
+        ):
+            raise TaskError(
+                f"cannot rebind non-provisional thread {thread_id}: "
+                "unexpected rollout history"
+            )
+        if requested_description is None:
+            raise TaskError(
+                "register requires --initial-prompt or --description when reconciling "
+                "an existing thread"
+            )
+        rebound_from_session_id = existing["session_id"]
+        timestamp = now or utc_now()
+        connection.execute(
+            "DELETE FROM rollout WHERE thread_id=? "
+            "AND NOT (role='meta' AND turn_id='thread.created' "
+            "AND message='thread.created')",
+            (thread_id,),
+        )
+        connection.execute(
+            "UPDATE thread SET session_id=?,description=?,updated=?,status=?,closed=NULL "
+            "WHERE id=?",
+            (
+                session_id,
+                requested_description,
+                timestamp,
+                status,
+                thread_id,
+            ),
+        )
+        return RegistrationResult(
+            created=False,
+            rebound_from_session_id=rebound_from_session_id,
+        )
+    if session_owner is not None and session_owner["id"] != thread_id:
+        raise TaskError(
+            f"session_id conflict for {session_id}: stored id "
+            f"{session_owner['id']}, requested {thread_id}"
+        )
+    created = existing is None
+    if created and prompt_description is None:
+        raise TaskError("--initial-prompt is required when registering a new thread")
+    if requested_description is None:
+        raise TaskError(
+            "register requires --initial-prompt or --description when reconciling "
+            "an existing thread"
+        )
+
+    timestamp = now or utc_now()
+    if created:
+        connection.execute(
+            "INSERT INTO thread(id,session_id,parent_session_id,kind,project,title,description,created,updated,closed,status) "
+            "VALUES (?,?,?,?,?,?,?,?,?,NULL,?)",
+            (
+                thread_id,
+                session_id,
+                parent_session_id,
+                kind,
+                project,
+                title,
+                requested_description,
+                timestamp,
+                timestamp,
+                status,
+            ),
+        )
+        append_rollout(
+            connection,
+            thread_id=thread_id,
+            turn_id="thread.created",
+            role="meta",
+            message="thread.created",
+            created=timestamp,
+        )
+        return RegistrationResult(created=True)
+
+    if parent_session_id != existing["parent_session_id"]:
+        raise TaskError(
+            f"parent_session_id conflict for thread {thread_id}: stored "
+            f"{existing['parent_session_id']}, requested {parent_session_id}"
+        )
+    if kind != existing["kind"]:
+        raise TaskError(
+            f"kind conflict for thread {thread_id}: stored {existing['kind']}, "
+            f"requested {kind}"
+        )
+    if project != existing["project"]:
+        raise TaskError(
+            f"project conflict for thread {thread_id}: stored {existing['project']}, "
+            f"requested {project}"
+        )
+    if existing["description"] != requested_description:
+        raise TaskError(
+            f"description conflict for thread {thread_id}: stored "
+            f"{existing['description']!r}, requested {requested_description!r}"
+        )
+    if existing["title"] != title:
+        raise TaskError(
+            f"title conflict for thread {thread_id}: stored {existing['title']!r}, "
+            f"requested {title!r}"
+        )
+    return RegistrationResult(created=False)
+
+
+def add_current_thread(
+    connection: sqlite3.Connection,
+    *,
+    session_id: str,
+    project: str,
+    title: str,
+    initial_prompt: str,
+) -> tuple[str, bool]:
+    require_nonempty(session_id, "session_id")
+    if session_id != session_id.strip():
+        raise TaskError("session_id must not contain surrounding whitespace")
+    require_nonempty(project, "project")
+    if project != project.strip():
+        raise TaskError("project must not contain surrounding whitespace")
+    validate_title(title)
+
+    import uuid
+
+    existing = thread_by_session(connection, session_id)
+    if existing is not None and existing["kind"] != "main":
+        raise TaskError(
+            f"cannot add existing child thread for session_id {session_id}: "
+            f"stored id {existing['id']}"
+        )
+    thread_id = existing["id"] if existing is not None else str(uuid.uuid4())
+    registration = register_thread(
+        connection,
+        thread_id=thread_id,
+        session_id=session_id,
+        parent_session_id=None,
+        kind="main",
+        project=project,
+        title=title,
+        initial_prompt=initial_prompt,
+        description=None,
+        status="active",
+    )
+    return thread_id, registration.created
+
+
+def resolve_repeated_input(
+    values: Optional[list[str]], *, label: str, default: str
+) -> str:
+    unique = list(dict.fromkeys(values or []))
+    if len(unique) > 1:
+        raise TaskError(f"conflicting {label} values: {', '.join(unique)}")
+    return unique[0] if unique else default
+
+
+def command_resolve_create(args: argparse.Namespace) -> None:
+    import uuid
+
+    creation_id = str(uuid.uuid4())
+    defaults = args.configuration["defaults"]
+    mode_value = resolve_repeated_input(
+        args.mode, label="mode", default=defaults.get("mode", "clean")
+    )
+    kind = resolve_repeated_input(
+        args.kind, label="kind", default=defaults.get("kind", "child")
+    )
+    project = resolve_repeated_input(
+        args.project, label="project", default=defaults.get("project", Path.cwd().name)
+    )
+    require_nonempty(project, "project")
+    if project != project.strip():
+        raise TaskError("project must not contain surrounding whitespace")
+    title = args.title
+    validate_title_bootstrap_argument(title)
+    worktree_value = resolve_repeated_input(
+        args.worktree,
+        label="worktree",
+        default="true" if defaults.get("worktree", False) else "false",
+    )
+    model = resolve_repeated_input(
+        args.model, label="model", default=defaults.get("model", "inherit")
+    )
+    require_nonempty(model, "model")
+    if model != model.strip():
+        raise TaskError("model must not contain surrounding whitespace")
+
+    pin_values = list(args.pin or [])
+    if args.nopin:
+        pin_values.append("false")
+    pin_value = resolve_repeated_input(
+        pin_values,
+        label="pin",
+        default="true" if defaults.get("pin", True) else "false",
+    )
+
+    worktree = worktree_value == "true"
+    pin = pin_value == "true"
+    if kind == "child":
+        if args.parent_session_id is None:
+            raise TaskError("child creation requires --parent-session-id")
+        require_nonempty(args.parent_session_id, "parent_session_id")
+        if args.parent_session_id != args.parent_session_id.strip():
+            raise TaskError("parent_session_id must not contain surrounding whitespace")
+        bootstrap_arguments = {
+            "id": creation_id,
+            "parent_session_id": args.parent_session_id,
+            "pin": pin,
+            "project": project,
+            "title": title,
+        }
+        bootstrap_version = BOOTSTRAP_VERSION
+    else:
+        if args.parent_session_id is not None:
+            raise TaskError("main creation must not have --parent-session-id")
+        bootstrap_arguments = {"pin": pin, "title": title}
+        bootstrap_version = "1"
+    if worktree:
+        environment_type = "worktree"
+    elif mode_value == "fork":
+        environment_type = "same-directory"
+    else:
+        environment_type = "local"
+
+    emit(
+        {
+            "id": creation_id,
+            "mode": mode_value,
+            "kind": kind,
+            "project": project,
+            "title": title,
+            "worktree": worktree,
+            "model": model,
+            "pin": pin,
+            "bootstrap_args": bootstrap_arguments,
+            "bootstrap_trailer": bootstrap_trailer(
+                bootstrap_arguments, version=bootstrap_version
+            ),
+            "environment": {"type": environment_type},
+            "include_model": model != "inherit",
+            "hook_prompts": prompt_hooks(args.configuration, "OnCreate"),
+        },
+        args.json,
+    )
+
+
+def command_register(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=True)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        registration = register_thread(
+            connection,
+            thread_id=args.id,
+            session_id=args.session_id,
+            parent_session_id=args.parent_session_id,
+            kind=args.kind,
+            project=args.project,
+            title=args.title,
+            initial_prompt=args.initial_prompt,
+            description=args.description,
+            status=args.status,
+            authoritative_session=args.authoritative_session,
+        )
+        connection.commit()
+        result = lifecycle_result(
+            thread_dict(connection, args.id),
+            args.configuration,
+            "OnCreate",
+            triggered=registration.created,
+        )
+        if registration.rebound_from_session_id is not None:
+            result["session_rebound_from"] = registration.rebound_from_session_id
+        emit(result, args.json)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def command_add(args: argparse.Namespace) -> None:
+    connection = open_database(initialize=True)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        thread_id, created = add_current_thread(
+            connection,
+            session_id=args.session_id,
+            project=args.project,
+            title=args.title,
+            initial_prompt=args.initial_prompt,
+        )
+        connection.commit()
+        emit(
+            lifecycle_result(
+                thread_dict(connection, thread_id),
+                args.configuration,
+                "OnCreate",
+                triggered=created,
+            ),
+            args.json,
+        )
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
@@ -0,0 +1,111 @@
+"""Activity reports read from the trigger-maintained metric aggregates."""
+
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+from typing import Any, Optional, TYPE_CHECKING
+
+from .core import DASHBOARD_STATUSES, TaskError, emit, open_readonly_database
+
+if TYPE_CHECKING:
+    import argparse
+
+
+STATS_DEFAULT_DAYS = 30
+STATS_MAX_DAYS = 3660
+STATS_COUNTERS = (
+    "threads_created",
+    "threads_done",
+    "threads_dropped",
+    "user_turns",
+    "assistant_turns",
+)
+
+
+def utc_today() -> dt.date:
+    return dt.datetime.now(dt.timezone.utc).date()
+
+
+def stats_window(days: int, today: Optional[dt.date] = None) -> list[str]:
+    if not 1 <= days <= STATS_MAX_DAYS:
+        raise TaskError(f"days must be between 1 and {STATS_MAX_DAYS}")
+    last = today or utc_today()
+    return [(last - dt.timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+
+def stats_report(
+    connection: sqlite3.Connection,
+    *,
+    days: int = STATS_DEFAULT_DAYS,
+    projects: Optional[list[str]] = None,
+    today: Optional[dt.date] = None,
+) -> dict[str, Any]:
+    """Summarize UTC days ending today; cost grows with days and projects only.
+
+    Dwell is attributed to the day a thread left the status, so `mean_seconds`
+    covers completed stays and excludes threads still in that status.
+    """
+    window = stats_window(days, today)
+    where = " WHERE day>=?"
+    parameters: list[Any] = [window[0]]
+    if projects:
+        where += f" AND project IN ({','.join('?' for _ in projects)})"
+        parameters.extend(projects)
+    sums = ",".join(f"SUM({counter})" for counter in STATS_COUNTERS)
+
+    by_day = {
+        row[0]: dict(zip(STATS_COUNTERS, row[1:]))
+        for row in connection.execute(
+            f"SELECT day,{sums} FROM metric_project_day{where} GROUP BY day", parameters
+        )
+    }
+    series = [
+        {"day": day, **by_day.get(day, dict.fromkeys(STATS_COUNTERS, 0))}
+        for day in window
+    ]
+    by_project = [
+        {"project": row[0], **dict(zip(STATS_COUNTERS, row[1:]))}
+        for row in connection.execute(
+            f"SELECT project,{sums} FROM metric_project_day{where} "
+            "GROUP BY project ORDER BY project",
+            parameters,
+        )
+    ]
+    dwell = {
+        row[0]: (row[1], row[2])
+        for row in connection.execute(
+            f"SELECT status,SUM(exits),SUM(seconds) FROM metric_status_dwell{where} "
+            "GROUP BY status",
+            parameters,
+        )
+    }
+    return {
+        "since": window[0],
+        "until": window[-1],
+        "projects": projects or [],
+        "totals": {
+            counter: sum(day[counter] for day in series) for counter in STATS_COUNTERS
+        },
+        "days": series,
+        "by_project": by_project,
+        "dwell": [
+            {
+                "status": status,
+                "exits": dwell[status][0],
+                "total_seconds": round(dwell[status][1], 3),
+                "mean_seconds": round(dwell[status][1] / dwell[status][0], 3),
+            }
+            for status in DASHBOARD_STATUSES
+            if status in dwell and dwell[status][0]
+        ],
+    }
+
+
+def command_stats(args: argparse.Namespace) -> None:
+    connection = open_readonly_database()
+    try:
+        report = stats_report(connection, days=args.days, projects=args.project)
+    finally:
+        connection.close()
+    emit(report, args.json)
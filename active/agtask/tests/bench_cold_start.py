@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Measure agtask cold-start latency and fail when it exceeds the budget."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = Path(__file__).resolve().parents[1]
+CLI = ROOT / "skills" / "agtask" / "scripts" / "agtask"
+SESSION_ID = "bench-session"
+HOOK_PAYLOAD = json.dumps(
+    {"hook_event_name": "SessionStart", "session_id": SESSION_ID, "source": "startup"}
+)
+
+
+def median_ms(
+    command: list[str], env: dict[str, str], runs: int, stdin: str = ""
+) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            command,
+            cwd=ROOT,
+            input=stdin,
+            text=True,
+            capture_output=True,
+            env=env,
+            check=True,
+        )
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument(
+        "--hook-budget-ms",
+        type=float,
+        default=60.0,
+        help="allowed median `agtask hook` time above a bare interpreter start",
+    )
+    parser.add_argument(
+        "--show-budget-ms",
+        type=float,
+        default=100.0,
+        help="allowed median `agtask show` time above a bare interpreter start",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="agtask-bench-") as root:
+        env = os.environ | {
+            "HOME": root,
+            "AGTASK_DB": str(Path(root) / "store" / "ledger.db"),
+        }
+        env.pop("AGTASK_HOOKD_SOCKET", None)
+        # Installed skills run with bytecode caching; measure that, not a recompile.
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        cli = [sys.executable, str(CLI)]
+        subprocess.run([*cli, "init"], env=env, capture_output=True, check=True)
+        subprocess.run(
+            [
+                *cli,
+                "add",
+                "bench",
+                "--session-id",
+                SESSION_ID,
+                "--title",
+                "Bench",
+                "--initial-prompt",
+                "Measure cold start.",
+            ],
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        # Warm the bytecode cache so every sample measures a steady cold start.
+        median_ms([*cli, "hook"], env, 1, HOOK_PAYLOAD)
+
+        baseline = median_ms([sys.executable, "-c", "pass"], env, args.runs)
+        hook = median_ms([*cli, "hook"], env, args.runs, HOOK_PAYLOAD)
+        show = median_ms([*cli, "show", "--session-id", SESSION_ID], env, args.runs)
+
+    report = {
+        "runs": args.runs,
+        "interpreter_ms": round(baseline, 1),
+        "hook_ms": round(hook, 1),
+        "hook_budget_ms": args.hook_budget_ms,
+        "show_ms": round(show, 1),
+        "show_budget_ms": args.show_budget_ms,
+    }
+    print(json.dumps(report, indent=2))
+    over = []
+    if hook - baseline > args.hook_budget_ms:
+        over.append("hook")
+    if show - baseline > args.show_budget_ms:
+        over.append("show")
+    if over:
+        print(f"over budget: {', '.join(over)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
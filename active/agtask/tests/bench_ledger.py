@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Benchmark agtask commands against synthetic ledgers and gate on a baseline.
+
+Each ledger size is generated once with `threads` tracked threads and
+`--rollouts-per-thread` conversational rollouts each. Every command is then
+timed as a cold subprocess, the way Codex and users invoke it, and as warm
+in-process calls that reuse imported modules and the OS page cache. Warm calls
+also count the SQL statements the command issues.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+from pathlib import Path
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+import uuid
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "skills" / "agtask" / "scripts"
+CLI = SCRIPTS / "agtask"
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+STATUSES = ("todo", "active", "blocked", "done", "drop")
+PROJECTS = tuple(f"project-{index:02d}" for index in range(20))
+WORDS = (
+    "dashboard",
+    "ledger",
+    "websocket",
+    "migration",
+    "review",
+    "latency",
+    "release",
+    "hooks",
+    "search",
+    "archive",
+)
+HOT_SESSION = "bench-session-0"
+COMPARED_METRICS = ("cold_p50_ms", "warm_p50_ms", "warm_p99_ms")
+
+sys.path.insert(0, str(SCRIPTS))
+
+
+class CountingConnection(sqlite3.Connection):
+    """Count application statements; FTS trigger bodies are not included."""
+
+    statements = 0
+
+    def execute(self, *args: Any) -> sqlite3.Cursor:
+        CountingConnection.statements += 1
+        return super().execute(*args)
+
+    def executemany(self, *args: Any) -> sqlite3.Cursor:
+        CountingConnection.statements += 1
+        return super().executemany(*args)
+
+
+def timestamp(base: dt.datetime, seconds: int) -> str:
+    return (
+        (base + dt.timedelta(seconds=seconds))
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def generate_ledger(threads: int, rollouts_per_thread: int) -> int:
+    """Write a ledger shaped like long-term use: mostly finished, many projects."""
+    from agtask_lib.core import open_database
+
+    connection = open_database(initialize=True)
+    assert connection is not None
+    base = dt.datetime(2025, 1, 1, tzinfo=dt.timezone.utc)
+    thread_rows = []
+    rollout_rows = []
+    for index in range(threads):
+        thread_id = str(uuid.UUID(int=index + 1, version=4))
+        status = "active" if index == 0 else STATUSES[index % len(STATUSES)]
+        created = timestamp(base, index * 60)
+        updated = timestamp(base, index * 60 + rollouts_per_thread * 5)
+        word = WORDS[index % len(WORDS)]
+        child = index > 0 and index % 3 == 0
+        thread_rows.append(
+            (
+                thread_id,
+                f"bench-session-{index}",
+                f"bench-session-{index // 3}" if child else None,
+                "child" if child else "main",
+                PROJECTS[index % len(PROJECTS)],
+                f"Improve {word} handling #{index}",
+                f"Investigate {word} behaviour for bench thread {index}.",
+                created,
+                updated,
+                updated if status in {"done", "drop"} else None,
+                status,
+            )
+        )
+        rollout_rows.append((created, thread_id, "thread.created", "meta", "thread.created"))
+        for turn in range(rollouts_per_thread):
+            role = "user" if turn % 2 == 0 else "assistant"
+            rollout_rows.append(
+                (
+                    timestamp(base, index * 60 + turn * 5 + 1),
+                    thread_id,
+                    f"turn-{turn // 2}",
+                    role,
+                    f"{role.title()} note about {WORDS[(index + turn) % len(WORDS)]} step {turn}.",
+                )
+            )
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.executemany(
+            "INSERT INTO thread(id,session_id,parent_session_id,kind,project,title,"
+            "description,created,updated,closed,status) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            thread_rows,
+        )
+        connection.executemany(
+            "INSERT INTO rollout(created,thread_id,turn_id,role,message) VALUES (?,?,?,?,?)",
+            rollout_rows,
+        )
+        connection.commit()
+        connection.execute("PRAGMA optimize")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    finally:
+        connection.close()
+    return len(rollout_rows)
+
+
+def commands() -> dict[str, Callable[[], list[str] | str]]:
+    """Map each benchmark to a factory for fresh argv or hook stdin.
+
+    Writers get a new identity on every call so no sample is an idempotent no-op.
+    """
+
+    def register() -> list[str]:
+        label = uuid.uuid4()
+        return [
+            "register",
+            "--id",
+            str(label),
+            "--session-id",
+            f"bench-new-{label.hex}",
+            "--kind",
+            "main",
+            "--project",
+            PROJECTS[0],
+            "--title",
+            "Benchmark registration",
+            "--initial-prompt",
+            "Task:\nBenchmark registration.",
+            "--description",
+            "Benchmark registration.",
+            "--json",
+        ]
+
+    def record_turn() -> list[str]:
+        return [
+            "record-turn",
+            "--session-id",
+            HOT_SESSION,
+            "--turn-id",
+            f"bench-{uuid.uuid4().hex}",
+            "--role",
+            "assistant",
+            "--content",
+            "Recorded a benchmark turn.",
+            "--json",
+        ]
+
+    def hook() -> str:
+        return json.dumps(
+            {
+                "hook_event_name": "UserPromptSubmit",
+                "session_id": HOT_SESSION,
+                "turn_id": f"bench-{uuid.uuid4().hex}",
+                "prompt": "Continue the benchmark.",
+            }
+        )
+
+    return {
+        "hook": hook,
+        "register": register,
+        "record-turn": record_turn,
+        "show": lambda: ["show", "--session-id", HOT_SESSION, "--json"],
+        "search": lambda: ["search", "websocket", "--json"],
+        "search-rollouts": lambda: ["search", "latency", "--in", "rollouts", "--json"],
+        "list": lambda: ["list", "--json"],
+        "dashboard": lambda: ["dashboard", "--json"],
+    }
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def run_cold(invocation: list[str] | str, env: dict[str, str]) -> float:
+    hook = isinstance(invocation, str)
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, str(CLI), *(["hook"] if hook else invocation)],
+        cwd=ROOT,
+        input=invocation if hook else "",
+        text=True,
+        capture_output=True,
+        env=env,
+        check=True,
+    )
+    return (time.perf_counter() - started) * 1000
+
+
+def run_warm(invocation: list[str] | str) -> tuple[float, int]:
+    from agtask_lib import cli, hook
+
+    CountingConnection.statements = 0
+    output = io.StringIO()
+    started = time.perf_counter()
+    if isinstance(invocation, str):
+        hook.hook_response(invocation)
+    else:
+        argv = sys.argv
+        sys.argv = ["agtask", *invocation]
+        try:
+            with contextlib.redirect_stdout(output):
+                status = cli.main()
+        finally:
+            sys.argv = argv
+        if status != 0:
+            raise RuntimeError(f"agtask {' '.join(invocation)} failed")
+    return (time.perf_counter() - started) * 1000, CountingConnection.statements
+
+
+def measure(
+    factory: Callable[[], list[str] | str],
+    env: dict[str, str],
+    *,
+    cold_runs: int,
+    warm_runs: int,
+) -> dict[str, Any]:
+    run_warm(factory())
+    cold = [run_cold(factory(), env) for _ in range(cold_runs)]
+    warm = [run_warm(factory()) for _ in range(warm_runs)]
+    warm_ms = [elapsed for elapsed, _count in warm]
+    return {
+        "cold_p50_ms": round(statistics.median(cold), 2),
+        "cold_p99_ms": round(percentile(cold, 0.99), 2),
+        "warm_p50_ms": round(statistics.median(warm_ms), 3),
+        "warm_p99_ms": round(percentile(warm_ms, 0.99), 3),
+        "queries": max(count for _elapsed, count in warm),
+    }
+
+
+def compare(
+    report: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    tolerance: float,
+    min_delta_ms: float,
+) -> list[str]:
+    """List metrics that slowed beyond both the relative and absolute margins."""
+    regressions = []
+    for size, result in report["sizes"].items():
+        expected_size = baseline.get("sizes", {}).get(size)
+        if expected_size is None:
+            continue
+        for name, metrics in result["commands"].items():
+            expected = expected_size["commands"].get(name)
+            if expected is None:
+                continue
+            for metric in COMPARED_METRICS:
+                before, after = expected[metric], metrics[metric]
+                if after - before > max(before * tolerance, min_delta_ms):
+                    regressions.append(
+                        f"{size} threads {name} {metric}: {before} -> {after}"
+                    )
+            if metrics["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{size} threads {name} queries: "
+                    f"{expected['queries']} -> {metrics['queries']}"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="thread counts"
+    )
+    parser.add_argument("--rollouts-per-thread", type=int, default=6)
+    parser.add_argument("--cold-runs", type=int, default=10)
+    parser.add_argument("--warm-runs", type=int, default=50)
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(commands()), help="benchmark a subset"
+    )
+    parser.add_argument("--output", type=Path, help="also write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="JSON report to gate against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown of a timing metric against the baseline",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=2.0,
+        help="slowdowns smaller than this are noise regardless of tolerance",
+    )
+    args = parser.parse_args()
+
+    selected = {
+        name: factory
+        for name, factory in commands().items()
+        if args.only is None or name in args.only
+    }
+    report: dict[str, Any] = {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "rollouts_per_thread": args.rollouts_per_thread,
+        "cold_runs": args.cold_runs,
+        "warm_runs": args.warm_runs,
+        "sizes": {},
+    }
+    connect = sqlite3.connect
+    sqlite3.connect = lambda *a, **k: connect(*a, factory=CountingConnection, **k)
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory(prefix="agtask-bench-") as root:
+                env = os.environ | {
+                    "HOME": root,
+                    "AGTASK_DB": str(Path(root) / "store" / "ledger.db"),
+                }
+                env.pop("AGTASK_HOOKD_SOCKET", None)
+                # Installed skills run with bytecode caching; measure that.
+                env.pop("PYTHONDONTWRITEBYTECODE", None)
+                os.environ.update(HOME=env["HOME"], AGTASK_DB=env["AGTASK_DB"])
+                os.environ.pop("AGTASK_HOOKD_SOCKET", None)
+                started = time.perf_counter()
+                rollouts = generate_ledger(size, args.rollouts_per_thread)
+                report["sizes"][str(size)] = {
+                    "threads": size,
+                    "rollouts": rollouts,
+                    "generate_s": round(time.perf_counter() - started, 2),
+                    "commands": {
+                        name: measure(
+                            factory,
+                            env,
+                            cold_runs=args.cold_runs,
+                            warm_runs=args.warm_runs,
+                        )
+                        for name, factory in selected.items()
+                    },
+                }
+                print(f"measured {size} threads", file=sys.stderr)
+    finally:
+        sqlite3.connect = connect
+
+    document = json.dumps(report, indent=2, sort_keys=True)
+    print(document)
+    if args.output is not None:
+        args.output.write_text(document + "\n")
+    if args.baseline is None:
+        return 0
+    regressions = compare(
+        report,
+        json.loads(args.baseline.read_text()),
+        tolerance=args.tolerance,
+        min_delta_ms=args.min_delta_ms,
+    )
+    if regressions:
+        print("regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
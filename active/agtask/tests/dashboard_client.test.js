@@ -17,6 +17,7 @@ class FakeElement {
     this.value = "";
     this.title = "";
     this.type = "";
+    this.style = {};
   }
 
   set textContent(value) {
@@ -137,6 +138,7 @@ function snapshotFor(base, requestUrl) {
   const groupOrder = statuses.length ? ["todo","active","blocked","merging","done","drop"].filter(status => statuses.includes(status)) : ["todo","active","blocked","merging","done","drop"];
   snapshot.filters = {projects,parent_session_ids:parents,include_root:root,statuses};
   snapshot.search = query.get("search") || "";
+  snapshot.search_in = query.get("search_in") || "title";
   snapshot.sort = {field:query.get("sort") || "updated",direction:query.get("direction") || "desc"};
   snapshot.visible_count = visible.length;
   snapshot.groups = groupOrder.map(status => ({status,count:visible.filter(thread => thread.status === status).length,threads:visible.filter(thread => thread.status === status)}));
@@ -165,6 +167,137 @@ async function settle() {
   await new Promise(resolve => setImmediate(resolve));
 }
 
+const DASHBOARD_IDS = [
+  "search", "search-in", "sort", "direction", "refresh", "filter-trigger", "filter-menu",
+  "filter-menu-title", "filter-menu-back", "filter-menu-close", "filter-menu-search",
+  "filter-menu-list", "filter-bar", "active-filters", "add-filter", "notice",
+  "groups", "summary", "status-modal", "status-task-title", "status-close",
+  "status-search", "status-options", "status-error", "activity", "activity-range",
+  "activity-body"
+];
+
+function statsReport(requestUrl) {
+  const query = new URLSearchParams(requestUrl.slice(requestUrl.indexOf("?")+1));
+  const days = Array.from({length:Number(query.get("days"))},(_unused,index) => ({
+    day:`2026-01-${String(index+1).padStart(2,"0")}`,
+    threads_created:index%2, threads_done:0, threads_dropped:0,
+    user_turns:index, assistant_turns:index
+  }));
+  return {
+    since:days[0].day, until:days.at(-1).day, projects:query.getAll("project"),
+    totals:{threads_created:7,threads_done:2,threads_dropped:1,user_turns:91,assistant_turns:91},
+    days, by_project:[],
+    dwell:[
+      {status:"active",exits:3,total_seconds:5400,mean_seconds:1800},
+      {status:"done",exits:1,total_seconds:60,mean_seconds:60}
+    ]
+  };
+}
+
+class FakeEventSource {
+  constructor(url) {
+    this.url = url;
+    this.readyState = FakeEventSource.OPEN;
+    this.listeners = new Map();
+    FakeEventSource.instances.push(this);
+  }
+
+  addEventListener(type, callback) {
+    const listeners = this.listeners.get(type) || [];
+    listeners.push(callback);
+    this.listeners.set(type, listeners);
+  }
+
+  emit(type, payload) {
+    const event = {type,data:payload === undefined ? "" : JSON.stringify(payload)};
+    for (const callback of this.listeners.get(type) || []) callback(event);
+  }
+
+  close() {
+    this.readyState = FakeEventSource.CLOSED;
+  }
+}
+FakeEventSource.CONNECTING = 0;
+FakeEventSource.OPEN = 1;
+FakeEventSource.CLOSED = 2;
+FakeEventSource.instances = [];
+
+function taskRows(document) {
+  return allNodes(document.getElementById("groups")).filter(
+    node => node.tagName === "TR" && node.getAttribute("data-task-id")
+  );
+}
+
+async function streamScenario(input) {
+  const document = new FakeDocument(DASHBOARD_IDS);
+  document.getElementById("filter-menu").hidden = true;
+  document.getElementById("status-modal").hidden = true;
+  const requests = [];
+  global.document = document;
+  global.location.search = "";
+  global.EventSource = FakeEventSource;
+  global.fetch = async requestUrl => {
+    if(requestUrl.startsWith("api/stats?"))return {ok:false,status:503,json:async()=>({})};
+    requests.push(requestUrl);
+    return {ok:false,status:503,json:async()=>({error:"dashboard data unavailable"})};
+  };
+  vm.runInThisContext(input.source,{filename:"served-dashboard-app-stream.js"});
+  await settle();
+
+  assert.equal(FakeEventSource.instances.length,1,"the dashboard opens one event stream");
+  const source = FakeEventSource.instances[0];
+  assert.equal(source.url,"api/events","the stream carries the current view query");
+  const snapshot = clone(input.snapshot);
+  source.emit("snapshot",snapshot);
+  assert.equal(document.getElementById("summary").textContent,"4 visible · 4 total");
+
+  const active = snapshot.groups.find(group => group.status === "active").threads[0];
+  const statuses = snapshot.facets.statuses.map(item => ({
+    value:item.value,
+    count:item.count + (item.value === "blocked" ? 1 : item.value === "active" ? -1 : 0)
+  }));
+  source.emit("changes",{
+    threads:[{...active,status:"blocked",updated:"2027-01-01T00:00:00.000Z"}],
+    removed:[],
+    total_count:4,
+    facets:{projects:[],parents:[],statuses}
+  });
+  let blockedRows = taskRows(document).filter(row => row.getAttribute("data-status") === "blocked");
+  assert.equal(blockedRows[0].getAttribute("data-task-id"),active.id,"a streamed status move lands first by updated time");
+  assert.equal(
+    taskRows(document).filter(row => row.getAttribute("data-task-id") === active.id).length,
+    1,
+    "a moved task leaves its previous group"
+  );
+
+  const inserted = {...active,id:"streamed-id",session_id:"streamed-session",project:"gamma",title:"Streamed task",status:"todo"};
+  source.emit("changes",{
+    threads:[inserted],
+    removed:[active.id],
+    total_count:5,
+    facets:{projects:[{value:"gamma",count:1}],parents:[],statuses}
+  });
+  assert.equal(document.getElementById("summary").textContent,"4 visible · 5 total","streamed inserts and removals update counts");
+  assert.ok(taskRows(document).some(row => row.getAttribute("data-session-id") === "streamed-session"));
+  assert.ok(!taskRows(document).some(row => row.getAttribute("data-task-id") === active.id));
+  document.getElementById("filter-trigger").click();
+  menuButton(document,"Project").click();
+  assert.ok(menuButton(document,"gamma"),"streamed facet values join the filter menu");
+  menuButton(document,"gamma").click();
+  await settle();
+  assert.equal(source.readyState,FakeEventSource.CLOSED,"changing the view closes the previous stream");
+  const filtered = FakeEventSource.instances.at(-1);
+  assert.equal(filtered.url,"api/events?project=gamma","the new stream carries the new view");
+  assert.deepEqual(requests,[],"streamed views never refetch the snapshot");
+
+  filtered.readyState = FakeEventSource.CLOSED;
+  filtered.emit("error");
+  await settle();
+  assert.deepEqual(requests,["api/dashboard?project=gamma"],"a refused stream falls back to a snapshot request");
+  assert.match(document.getElementById("notice").textContent,/dashboard data unavailable/);
+  delete global.EventSource;
+}
+
 async function main() {
   const input = JSON.parse(await new Promise(resolve => {
     let value = "";
@@ -172,14 +305,7 @@ async function main() {
     process.stdin.on("data", chunk => { value += chunk; });
     process.stdin.on("end", () => resolve(value));
   }));
-  const ids = [
-    "search", "sort", "direction", "refresh", "filter-trigger", "filter-menu",
-    "filter-menu-title", "filter-menu-back", "filter-menu-close", "filter-menu-search",
-    "filter-menu-list", "filter-bar", "active-filters", "add-filter", "notice",
-    "groups", "summary", "status-modal", "status-task-title", "status-close",
-    "status-search", "status-options", "status-error"
-  ];
-  const document = new FakeDocument(ids);
+  const document = new FakeDocument(DASHBOARD_IDS);
   document.getElementById("filter-menu").hidden = true;
   document.getElementById("filter-menu-back").hidden = true;
   document.getElementById("status-modal").hidden = true;
@@ -197,6 +323,7 @@ async function main() {
     }
   };
   const requests = [];
+  const statsRequests = [];
   const statusUpdates = [];
   const dashboardSnapshot = clone(input.snapshot);
   let statusFailure = null;
@@ -206,6 +333,10 @@ async function main() {
   global.location = location;
   global.history = history;
   global.fetch = async (requestUrl, options={}) => {
+    if(requestUrl.startsWith("api/stats?")){
+      statsRequests.push(requestUrl);
+      return {ok:true,status:200,json:async()=>statsReport(requestUrl)};
+    }
     requests.push(requestUrl);
     if(options.method === "PATCH"){
       const match = requestUrl.match(/^api\/tasks\/~([^/]+)\/status$/);
@@ -241,6 +372,19 @@ async function main() {
   vm.runInThisContext(input.source,{filename:"served-dashboard-app.js"});
   await settle();
 
+  const activity = document.getElementById("activity");
+  assert.equal(statsRequests.at(-1),"api/stats?days=14","the activity panel requests a 14-day window");
+  assert.equal(activity.hidden,false,"the activity panel is shown once stats load");
+  const activityNodes = allNodes(document.getElementById("activity-body"));
+  const bars = activityNodes.filter(node => node.className === "activity-bar");
+  assert.equal(bars.length,14,"one bar is drawn per day");
+  assert.equal(bars.at(-1).style.height,"100%","the busiest day fills the chart");
+  assert.equal(bars[0].style.height,"4%","empty days keep a visible baseline");
+  assert.match(document.getElementById("activity-body").textContent,/Avg Active30m/);
+  assert.doesNotMatch(
+    document.getElementById("activity-body").textContent,/Avg Done/,"terminal statuses have no dwell"
+  );
+
   const menu = document.getElementById("filter-menu");
   const trigger = document.getElementById("filter-trigger");
   const plus = document.getElementById("add-filter");
@@ -489,7 +633,25 @@ async function main() {
   assert.equal(statusButton(document,"Active").disabled,true);
   statusModal.dispatchEvent({type:"keydown",key:"Escape"});
 
+  const searchIn = document.getElementById("search-in");
+  searchIn.value = "rollouts";
+  searchIn.dispatchEvent({type:"change"});
+  await settle();
+  assert.match(requests.at(-1),/[?&]search_in=rollouts(&|$)/,"message search is requested from the server");
+  assert.match(history.urls.at(-1),/search_in=rollouts/,"the search scope is kept in the page URL");
+  assert.equal(document.getElementById("search").placeholder,"Search messages");
+  searchIn.value = "title";
+  searchIn.dispatchEvent({type:"change"});
+  await settle();
+  assert.doesNotMatch(requests.at(-1),/search_in/,"title search stays the default query");
+  assert.equal(document.getElementById("search").placeholder,"Search titles");
+
   assert.ok(requests.length >= 5,"interactions issued fresh dashboard requests");
+  assert.ok(
+    statsRequests.some(request => /[?&]project=/.test(request)),
+    "the activity panel follows the project filter"
+  );
+  await streamScenario(input);
   process.stdout.write("dashboard client interactions passed\n");
 }
 
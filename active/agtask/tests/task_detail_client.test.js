@@ -11,6 +11,19 @@ class FakeElement {
     this._text = "";
     this.className = "";
     this.dateTime = "";
+    this.hidden = false;
+    this.disabled = false;
+    this.listeners = new Map();
+  }
+
+  addEventListener(type,listener) {
+    const listeners = this.listeners.get(type) || [];
+    listeners.push(listener);
+    this.listeners.set(type,listeners);
+  }
+
+  click() {
+    for (const listener of this.listeners.get("click") || [])listener({type:"click"});
   }
 
   set textContent(value) {
@@ -80,7 +93,8 @@ async function main() {
   }));
   const document = new FakeDocument([
     "detail-content", "task-title", "task-description", "task-created",
-    "task-updated", "task-session-id", "timeline", "detail-notice"
+    "task-updated", "task-session-id", "timeline", "timeline-count", "timeline-more",
+    "detail-notice"
   ]);
   const requests = [];
   const navigations = [];
@@ -91,7 +105,9 @@ async function main() {
   };
   global.fetch = async url => {
     requests.push(url);
-    return {ok:true,status:200,json:async()=>input.detail};
+    const payload = url.includes("?before=") ? input.pages[url] : input.detail;
+    if (!payload)return {ok:false,status:400,json:async()=>({error:"invalid rollout cursor"})};
+    return {ok:true,status:200,json:async()=>payload};
   };
 
   vm.runInThisContext(input.source,{filename:"served-task-detail.js"});
@@ -106,7 +122,19 @@ async function main() {
   assert.equal(document.getElementById("task-session-id").title,"Open task in Codex");
   assert.equal(document.getElementById("detail-content").getAttribute("aria-busy"),"false");
   const timeline = document.getElementById("timeline");
-  assert.equal(timeline.children.length,input.detail.rollouts.length);
+  const more = document.getElementById("timeline-more");
+  const total = input.detail.rollout_count;
+  assert.equal(document.getElementById("timeline-count").textContent,String(total));
+  assert.equal(timeline.children.length,1,"the first page holds one entry");
+  assert.equal(more.hidden,false,"older history offers another page");
+  while (!more.hidden) {
+    more.click();
+    more.click();
+    await settle();
+  }
+  assert.equal(requests.length,total,"each page is requested once even on repeated clicks");
+  assert.ok(requests.slice(1).every(url => url.startsWith("../api/tasks/~alpha-active?before=")));
+  assert.equal(timeline.children.length,total);
   assert.match(timeline.children[0].textContent,/assistant:Newest timeline entry/);
   assert.match(timeline.children[1].textContent,/user:First timeline entry/);
   assert.equal(document.getElementById("detail-notice").textContent,"");
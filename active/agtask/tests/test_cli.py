@@ -6,16 +6,19 @@ import json
 import os
 from pathlib import Path
 import runpy
+import socket
 import sqlite3
 import stat
 import subprocess
 import tempfile
+import time
 import unittest
 import uuid
 
 
 ROOT = Path(__file__).resolve().parents[1]
 CLI = ROOT / "skills" / "agtask" / "scripts" / "agtask"
+HOOK_SHIM = ROOT / "skills" / "agtask" / "scripts" / "agtask-hook"
 INSTALL_HOOKS = ROOT / "skills" / "agtask" / "scripts" / "install-hooks"
 UNINSTALL_HOOKS = ROOT / "skills" / "agtask" / "scripts" / "uninstall-hooks"
 
@@ -1845,9 +1848,61 @@ class CliIntegrationTest(unittest.TestCase):
                 self.assertEqual(result.returncode, 1)
                 self.assertIn(message, result.stderr)
 
+    def test_configuration_cache_reuses_merge_until_a_source_changes(self) -> None:
+        project = self.root / "cached-project"
+        self.run_cli("init")
+        cache_path = self.home / ".llm" / "agtask" / "config-cache.json"
+        cache_path.parent.mkdir(parents=True, mode=0o700)
+        home_config = self.home / ".agtask.json"
+        project_config = self.write_config(project, {"defaults": {"project": "first"}})
+        settled = time.time() - 60
+        os.utime(home_config, (settled, settled))
+        os.utime(project_config, (settled, settled))
+
+        first = json.loads(self.run_cli("config", "--json", cwd=project).stdout)
+        self.assertEqual(first["defaults"], {"project": "first"})
+        cache = json.loads(cache_path.read_text())
+        key = "\n".join([str(home_config.resolve()), str(project_config.resolve())])
+        self.assertEqual(
+            cache["entries"][key]["signature"],
+            [
+                [str(path.resolve()), path.stat().st_mtime_ns, path.stat().st_size]
+                for path in (home_config, project_config)
+            ],
+        )
+
+        # An unchanged signature is trusted without re-reading either source.
+        cache["entries"][key]["configuration"]["defaults"]["project"] = "from-cache"
+        cache_path.write_text(json.dumps(cache))
+        reused = json.loads(self.run_cli("config", "--json", cwd=project).stdout)
+        self.assertEqual(reused["defaults"], {"project": "from-cache"})
+
+        project_config.write_text(json.dumps({"defaults": {"project": "second"}}))
+        changed = json.loads(self.run_cli("config", "--json", cwd=project).stdout)
+        self.assertEqual(changed["defaults"], {"project": "second"})
+        # A just-written file could change again within one mtime tick.
+        self.assertNotEqual(
+            json.loads(cache_path.read_text())["entries"][key]["signature"][1][1],
+            project_config.stat().st_mtime_ns,
+        )
+
+        os.utime(project_config, (settled + 1, settled + 1))
+        self.run_cli("config", "--json", cwd=project)
+        self.assertEqual(
+            json.loads(cache_path.read_text())["entries"][key]["configuration"]["defaults"],
+            {"project": "second"},
+        )
+
+        project_config.write_text('{"defaults": {"pin": "yes"}}')
+        os.utime(project_config, (settled + 2, settled + 2))
+        failed = self.run_cli("config", "--json", cwd=project, check=False)
+        self.assertEqual(failed.returncode, 1)
+        self.assertIn("default pin must be a boolean", failed.stderr)
+        self.assertEqual(stat.S_IMODE(cache_path.stat().st_mode), 0o600)
+
     def test_schema_permissions_and_immediate_reopen(self) -> None:
         result = self.run_cli("init", "--json")
-        self.assertEqual(json.loads(result.stdout)["schema_version"], 6)
+        self.assertEqual(json.loads(result.stdout)["schema_version"], 9)
         self.assertEqual(stat.S_IMODE(self.store.stat().st_mode), 0o700)
         self.assertEqual(stat.S_IMODE(self.db_path.stat().st_mode), 0o600)
 
@@ -1858,7 +1913,7 @@ class CliIntegrationTest(unittest.TestCase):
         self.assertEqual(state["parent_session_id"], "parent-thread")
 
         with self.connect() as connection:
-            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 6)
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 9)
             objects = {
                 row[0]
                 for row in connection.execute(
@@ -1890,6 +1945,34 @@ class CliIntegrationTest(unittest.TestCase):
                     "thread_ai",
                     "thread_ad",
                     "thread_au",
+                    "thread_status_created_idx",
+                    "thread_status_closed_idx",
+                    "thread_project_status_idx",
+                    "thread_title_unicode_idx",
+                    "thread_title_fts",
+                    "thread_title_fts_data",
+                    "thread_title_fts_idx",
+                    "thread_title_fts_docsize",
+                    "thread_title_fts_config",
+                    "thread_title_ai",
+                    "thread_title_ad",
+                    "thread_title_au",
+                    "rollout_fts",
+                    "rollout_fts_data",
+                    "rollout_fts_idx",
+                    "rollout_fts_docsize",
+                    "rollout_fts_config",
+                    "rollout_ai",
+                    "rollout_ad",
+                    "rollout_au",
+                    "metric_project_day",
+                    "metric_project_day_day_idx",
+                    "metric_status_dwell",
+                    "metric_status_dwell_day_idx",
+                    "metric_status_entry",
+                    "metric_thread_ai",
+                    "metric_thread_status_au",
+                    "metric_rollout_ai",
                 },
             )
             self.assertEqual(
@@ -1984,7 +2067,7 @@ class CliIntegrationTest(unittest.TestCase):
         self.db_path.chmod(0o600)
         self.run_cli("init")
         with self.connect() as connection:
-            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 6)
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 9)
 
         home = self.root / "home"
         old_dir = home / ".llm" / "thread"
@@ -2009,7 +2092,7 @@ class CliIntegrationTest(unittest.TestCase):
             ("drifted-v4", None, 4),
             ("drifted-v5", None, 5),
             ("unversioned-objects", None, 0),
-            ("newer", None, 7),
+            ("newer", None, 9),
             ("malformed", b"not a sqlite database", None),
         ]
         for name, raw_bytes, version in cases:
@@ -2047,13 +2130,13 @@ class CliIntegrationTest(unittest.TestCase):
                     sorted(item.name for item in case_dir.iterdir()), before_entries
                 )
 
-    def test_exact_v5_ledger_migrates_to_v6_without_losing_data(self) -> None:
+    def test_exact_v5_ledger_migrates_to_current_without_losing_data(self) -> None:
         runtime = runpy.run_path(str(CLI))
         self.store.mkdir(mode=0o700)
         with sqlite3.connect(self.db_path) as connection:
             connection.execute("PRAGMA foreign_keys=ON")
             connection.execute(runtime["V5_THREAD_DDL"])
-            for statement in runtime["DDL"][1:]:
+            for statement in runtime["V6_DDL"][1:]:
                 connection.execute(statement)
             connection.execute(
                 "INSERT INTO thread("
@@ -2102,7 +2185,7 @@ class CliIntegrationTest(unittest.TestCase):
         search = json.loads(self.run_cli("search", "V5 task", "--json").stdout)
         self.assertEqual([row["id"] for row in search], [fixture_creation_id("v5-thread")])
         with self.connect() as connection:
-            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 6)
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 9)
             self.assertEqual(connection.execute("PRAGMA foreign_key_check").fetchall(), [])
             thread_sql = connection.execute(
                 "SELECT sql FROM sqlite_master WHERE name='thread'"
@@ -2121,6 +2204,646 @@ class CliIntegrationTest(unittest.TestCase):
         self.assertEqual(dropped["status"], "drop")
         self.assertIsNotNone(dropped["closed"])
 
+    def test_search_in_rollouts_ranks_threads_with_snippets(self) -> None:
+        self.run_cli("init")
+        self.register("thread-1")
+        self.register("thread-2")
+        for thread_id, turn_id, message in (
+            ("thread-1", "turn-1", "The websocket reconnect loop spins"),
+            ("thread-1", "turn-2", "Websocket websocket websocket retry storm"),
+            (
+                "thread-2",
+                "turn-1",
+                "A long review that mentions the websocket once among many other "
+                "unrelated notes about configuration, hooks, and release steps",
+            ),
+        ):
+            self.run_cli(
+                "append-rollout",
+                "--id",
+                fixture_creation_id(thread_id),
+                "--turn-id",
+                turn_id,
+                "--role",
+                "assistant",
+                "--message",
+                message,
+            )
+
+        results = json.loads(
+            self.run_cli("search", "WEBSOCKET", "--in", "rollouts", "--json").stdout
+        )
+        self.assertEqual(
+            [row["id"] for row in results],
+            [fixture_creation_id("thread-1"), fixture_creation_id("thread-2")],
+        )
+        self.assertEqual([row["matches"] for row in results], [2, 1])
+        self.assertEqual(results[0]["match_role"], "assistant")
+        self.assertIn("[Websocket]", results[0]["snippet"])
+        self.assertNotIn("rollout_id", results[0])
+        self.assertEqual(
+            json.loads(self.run_cli("search", "websocket", "--json").stdout), []
+        )
+        limited = json.loads(
+            self.run_cli(
+                "search", "websocket", "--in", "rollouts", "--limit", "1", "--json"
+            ).stdout
+        )
+        self.assertEqual(len(limited), 1)
+        human = self.run_cli("search", "reconnect", "--in", "rollouts").stdout
+        self.assertIn("Match: The websocket [reconnect] loop spins", human)
+
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE rollout SET message='Replaced with polling' WHERE turn_id='turn-1' "
+                "AND thread_id=?",
+                (fixture_creation_id("thread-2"),),
+            )
+        self.assertEqual(
+            [
+                row["id"]
+                for row in json.loads(
+                    self.run_cli("search", "websocket", "--in", "rollouts", "--json").stdout
+                )
+            ],
+            [fixture_creation_id("thread-1")],
+        )
+        self.assertEqual(
+            len(
+                json.loads(
+                    self.run_cli("search", "polling", "--in", "rollouts", "--json").stdout
+                )
+            ),
+            1,
+        )
+
+        snapshot = json.loads(
+            self.run_cli(
+                "dashboard", "--json", "--search", "storm", "--search-in", "rollouts"
+            ).stdout
+        )
+        self.assertEqual(snapshot["search_in"], "rollouts")
+        self.assertEqual(snapshot["visible_count"], 1)
+        self.assertEqual(
+            json.loads(self.run_cli("dashboard", "--json", "--search", "storm").stdout)[
+                "visible_count"
+            ],
+            0,
+        )
+
+    def test_import_rollouts_backfills_tracked_sessions_idempotently(self) -> None:
+        self.run_cli("init")
+        self.register("thread-1", session_id="session-1")
+        thread_id = fixture_creation_id("thread-1")
+        for turn_id, content in (
+            ("bootstrap", FORK_PROMPT),
+            ("turn-2", "Hook recorded prompt."),
+        ):
+            self.run_cli(
+                "record-turn",
+                "--id",
+                thread_id,
+                "--turn-id",
+                turn_id,
+                "--role",
+                "user",
+                "--content",
+                content,
+            )
+        sessions = self.root / "sessions" / "2026" / "10" / "18"
+        sessions.mkdir(parents=True)
+
+        def rollout(session_id: str, *events: dict[str, object]) -> str:
+            records = [
+                {
+                    "timestamp": "2026-10-18T09:00:00.000Z",
+                    "type": "session_meta",
+                    "payload": {"id": session_id, "cwd": str(self.root)},
+                }
+            ]
+            records.extend(
+                {
+                    "timestamp": f"2026-10-18T09:00:{second:02d}.250Z",
+                    "type": "event_msg",
+                    "payload": payload,
+                }
+                for second, payload in enumerate(events, start=1)
+            )
+            return "".join(json.dumps(record) + "\n" for record in records)
+
+        (sessions / "rollout-2026-10-18T09-00-00-session-1.jsonl").write_text(
+            rollout(
+                "session-1",
+                {"type": "task_started", "turn_id": "turn-1"},
+                {"type": "user_message", "message": FORK_PROMPT},
+                {"type": "agent_message", "message": "Working on it."},
+                {
+                    "type": "task_complete",
+                    "turn_id": "turn-1",
+                    "last_agent_message": "Proof drafted. Tests pass.",
+                },
+                {"type": "task_started", "turn_id": "turn-2"},
+                {"type": "user_message", "message": "A different replayed prompt."},
+                {
+                    "type": "task_complete",
+                    "turn_id": "turn-2",
+                    "last_agent_message": "Blocked: waiting on review.",
+                },
+                {"type": "task_started", "turn_id": "turn-3"},
+                {"type": "user_message", "message": "## Add   the benchmark."},
+            )
+            + '{"timestamp":"2026-10-18T09:01:00.000Z","type":"event_msg"',
+        )
+        (sessions / "rollout-2026-10-18T10-00-00-other.jsonl").write_text(
+            rollout(
+                "untracked-session",
+                {"type": "task_started", "turn_id": "turn-1"},
+                {"type": "user_message", "message": "Not tracked."},
+            )
+        )
+        (sessions / "notes.jsonl").write_text("not a rollout\n")
+
+        before = json.loads(self.run_cli("show", "--id", thread_id, "--json").stdout)
+        report = json.loads(
+            self.run_cli(
+                "import-rollouts", str(self.root / "sessions"), "--batch-rows", "2", "--json"
+            ).stdout
+        )
+        self.assertEqual(
+            report,
+            {
+                "root": str(self.root / "sessions"),
+                "files": 2,
+                "tracked_files": 1,
+                "turns": 5,
+                "inserted": 3,
+                "existing": 2,
+            },
+        )
+        imported = json.loads(self.run_cli("show", "--id", thread_id, "--json").stdout)
+        self.assertEqual(imported["status"], before["status"])
+        self.assertEqual(imported["updated"], before["updated"])
+        events = {
+            (row["turn_id"], row["role"]): (row["message"], row["created"])
+            for row in imported["rollouts"]
+        }
+        self.assertEqual(
+            {key: message for key, (message, _created) in events.items()},
+            {
+                ("thread.created", "meta"): "thread.created",
+                ("bootstrap", "user"): "Write a compact database proof.",
+                ("turn-1", "assistant"): "Proof drafted.",
+                ("turn-2", "user"): "Hook recorded prompt.",
+                ("turn-2", "assistant"): "Blocked: waiting on review.",
+                ("turn-3", "user"): "Add the benchmark.",
+            },
+        )
+        self.assertEqual(events[("turn-1", "assistant")][1], "2026-10-18T09:00:04.250Z")
+        self.assertEqual(events[("turn-3", "user")][1], "2026-10-18T09:00:09.250Z")
+
+        rerun = json.loads(
+            self.run_cli("import-rollouts", str(self.root / "sessions"), "--json").stdout
+        )
+        self.assertEqual((rerun["turns"], rerun["inserted"], rerun["existing"]), (5, 0, 5))
+        self.assertEqual(
+            len(json.loads(self.run_cli("show", "--id", thread_id, "--json").stdout)["rollouts"]),
+            len(imported["rollouts"]),
+        )
+
+        failed = self.run_cli(
+            "import-rollouts", str(self.root / "missing"), check=False
+        )
+        self.assertEqual(failed.returncode, 1)
+        self.assertIn("rollout path does not exist", failed.stderr)
+
+    def test_compacted_turns_are_not_reimported_or_rerecorded(self) -> None:
+        self.run_cli("init")
+        self.register("thread-1", session_id="session-1")
+        thread_id = fixture_creation_id("thread-1")
+        for role, content in (("user", FORK_PROMPT), ("assistant", "Proof drafted.")):
+            self.run_cli(
+                "record-turn",
+                "--id",
+                thread_id,
+                "--turn-id",
+                "turn-1",
+                "--role",
+                role,
+                "--content",
+                content,
+            )
+        self.close_thread("thread-1")
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE thread SET closed='2026-01-01T00:00:00.000Z' WHERE id=?",
+                (thread_id,),
+            )
+        self.run_cli("compact", "--json")
+        compacted = json.loads(self.run_cli("show", "--id", thread_id, "--json").stdout)
+        turns_before = json.loads(self.run_cli("stats", "--json").stdout)["totals"]
+
+        sessions = self.root / "sessions"
+        sessions.mkdir()
+        events = [
+            {"type": "task_started", "turn_id": "turn-1"},
+            {"type": "user_message", "message": FORK_PROMPT},
+            {"type": "task_complete", "turn_id": "turn-1", "last_agent_message": "Proof drafted."},
+            {"type": "task_started", "turn_id": "turn-2"},
+            {"type": "user_message", "message": "A late follow-up."},
+        ]
+        (sessions / "rollout-2026-10-18T09-00-00-session-1.jsonl").write_text(
+            "".join(
+                json.dumps(record) + "\n"
+                for record in [
+                    {
+                        "timestamp": "2026-10-18T09:00:00.000Z",
+                        "type": "session_meta",
+                        "payload": {"id": "session-1", "cwd": str(self.root)},
+                    },
+                    *(
+                        {
+                            "timestamp": f"2026-10-18T09:00:{second:02d}.000Z",
+                            "type": "event_msg",
+                            "payload": payload,
+                        }
+                        for second, payload in enumerate(events, start=1)
+                    ),
+                ]
+            )
+        )
+        report = json.loads(
+            self.run_cli("import-rollouts", str(sessions), "--json").stdout
+        )
+        self.assertEqual(
+            (report["turns"], report["inserted"], report["existing"]), (3, 1, 2)
+        )
+        imported = json.loads(self.run_cli("show", "--id", thread_id, "--json").stdout)
+        self.assertEqual(len(imported["rollouts"]), len(compacted["rollouts"]) + 1)
+        self.assertEqual(
+            json.loads(self.run_cli("stats", "--json").stdout)["totals"]["user_turns"],
+            turns_before["user_turns"] + 1,
+        )
+
+        # A replayed hook for an archived turn is a no-op; a changed one conflicts.
+        self.run_cli(
+            "record-turn",
+            "--id",
+            thread_id,
+            "--turn-id",
+            "turn-1",
+            "--role",
+            "assistant",
+            "--content",
+            "Proof drafted.",
+        )
+        self.assertEqual(
+            len(json.loads(self.run_cli("show", "--id", thread_id, "--json").stdout)["rollouts"]),
+            len(imported["rollouts"]),
+        )
+        conflict = self.run_cli(
+            "record-turn",
+            "--id",
+            thread_id,
+            "--turn-id",
+            "turn-1",
+            "--role",
+            "assistant",
+            "--content",
+            "A different answer.",
+            check=False,
+        )
+        self.assertEqual(conflict.returncode, 1)
+        self.assertIn("rollout event conflict", conflict.stderr)
+
+    def test_record_turn_stays_within_statement_budget(self) -> None:
+        runtime = runpy.run_path(str(CLI))
+        self.run_cli("init")
+        self.register("thread-1")
+        thread_id = fixture_creation_id("thread-1")
+        statements: list[str] = []
+
+        class CountingConnection(sqlite3.Connection):
+            def execute(self, sql: str, *args: object) -> sqlite3.Cursor:
+                statements.append(sql)
+                return super().execute(sql, *args)
+
+        def record(role: str, turn_id: str, content: str) -> bool:
+            connection = sqlite3.connect(self.db_path, factory=CountingConnection)
+            connection.row_factory = sqlite3.Row
+            try:
+                with connection:
+                    connection.execute("BEGIN IMMEDIATE")
+                    statements.clear()
+                    return runtime["record_turn"](
+                        connection,
+                        thread_id=thread_id,
+                        role=role,
+                        turn_id=turn_id,
+                        content=content,
+                    )
+            finally:
+                connection.close()
+
+        for role, turn_id, content, changed, budget in (
+            ("user", "bootstrap", FORK_PROMPT, True, 3),
+            ("user", "turn-1", FORK_PROMPT, True, 3),
+            ("assistant", "turn-1", "Blocked: needs review.", True, 4),
+            ("assistant", "turn-1", "Blocked: needs review.", False, 1),
+            ("user", "turn-2", "Continue the proof.", True, 4),
+        ):
+            with self.subTest(role=role, turn_id=turn_id, changed=changed):
+                self.assertIs(record(role, turn_id, content), changed)
+                self.assertLessEqual(len(statements), budget, statements)
+
+        with self.connect() as connection:
+            rollouts = connection.execute(
+                "SELECT turn_id,role,message FROM rollout "
+                "WHERE thread_id=? AND role<>'meta' ORDER BY id",
+                (thread_id,),
+            ).fetchall()
+            status = connection.execute(
+                "SELECT status FROM thread WHERE id=?", (thread_id,)
+            ).fetchone()["status"]
+        self.assertEqual(
+            [tuple(row) for row in rollouts],
+            [
+                ("turn-1", "user", "Write a compact database proof."),
+                ("turn-1", "assistant", "Blocked: needs review."),
+                ("turn-2", "user", "Continue the proof."),
+            ],
+        )
+        self.assertEqual(status, "active")
+
+    def test_stats_reads_trigger_maintained_aggregates_that_outlive_compaction(self) -> None:
+        self.run_cli("init")
+        self.register("thread-1")
+        self.register("thread-2", project="other")
+        closed_id = fixture_creation_id("thread-1")
+        for turn_id, role, content in (
+            ("turn-1", "user", FORK_PROMPT),
+            ("turn-2", "assistant", "Done."),
+        ):
+            self.run_cli(
+                "record-turn",
+                "--id",
+                closed_id,
+                "--turn-id",
+                turn_id,
+                "--role",
+                role,
+                "--content",
+                content,
+            )
+        self.run_cli("status", "--id", closed_id, "--status", "blocked")
+        self.run_cli("status", "--id", closed_id, "--status", "active")
+        self.close_thread("thread-1")
+
+        report = json.loads(self.run_cli("stats", "--days", "3", "--json").stdout)
+        self.assertEqual(len(report["days"]), 3)
+        self.assertEqual(report["until"], report["days"][-1]["day"])
+        self.assertEqual(report["totals"]["threads_created"], 2)
+        self.assertEqual(report["totals"]["threads_done"], 1)
+        self.assertEqual(report["totals"]["threads_dropped"], 0)
+        self.assertGreaterEqual(report["totals"]["user_turns"], 1)
+        self.assertGreaterEqual(report["totals"]["assistant_turns"], 1)
+        self.assertEqual(
+            [row["project"] for row in report["by_project"]], ["agtask", "other"]
+        )
+        dwell = {row["status"]: row for row in report["dwell"]}
+        self.assertEqual(dwell["active"]["exits"], 2)
+        self.assertEqual(dwell["blocked"]["exits"], 1)
+        filtered = json.loads(
+            self.run_cli("stats", "--project", "other", "--json").stdout
+        )
+        self.assertEqual(filtered["totals"]["threads_created"], 1)
+        self.assertEqual(filtered["dwell"], [])
+
+        # A version 8 ledger rebuilds the same aggregates from the rollout log.
+        with self.connect() as connection:
+            for name in ("metric_thread_ai", "metric_thread_status_au", "metric_rollout_ai"):
+                connection.execute(f"DROP TRIGGER {name}")
+            for name in ("metric_project_day", "metric_status_dwell", "metric_status_entry"):
+                connection.execute(f"DROP TABLE {name}")
+            connection.execute("PRAGMA user_version=8")
+        # Closing the last connection checkpoints the WAL for the immutable probe.
+        connection.close()
+        self.assertEqual(
+            json.loads(self.run_cli("stats", "--days", "3", "--json").stdout), report
+        )
+        with self.connect() as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 9)
+
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE thread SET closed='2026-01-01T00:00:00.000Z' WHERE id=?",
+                (closed_id,),
+            )
+        compacted = json.loads(self.run_cli("compact", "--json").stdout)
+        self.assertEqual(compacted["thread_ids"], [closed_id])
+        self.assertEqual(
+            json.loads(self.run_cli("stats", "--days", "3", "--json").stdout), report
+        )
+        result = self.run_cli("stats", "--days", "0", check=False)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("days must be between 1 and 3660", result.stderr)
+
+    def test_compact_archives_old_terminal_history_behind_transparent_reads(self) -> None:
+        self.run_cli("init")
+        self.register("thread-1")
+        self.register("thread-2")
+        closed_id = fixture_creation_id("thread-1")
+        self.run_cli(
+            "record-turn",
+            "--id",
+            closed_id,
+            "--turn-id",
+            "turn-1",
+            "--role",
+            "user",
+            "--content",
+            FORK_PROMPT,
+        )
+        self.close_thread("thread-1")
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE thread SET closed='2026-01-01T00:00:00.000Z' WHERE id=?",
+                (closed_id,),
+            )
+        before = json.loads(self.run_cli("show", "--id", closed_id, "--json").stdout)
+        live_before = json.loads(
+            self.run_cli("show", "--id", fixture_creation_id("thread-2"), "--json").stdout
+        )
+
+        planned = json.loads(self.run_cli("compact", "--dry-run", "--json").stdout)
+        self.assertEqual(planned["thread_ids"], [closed_id])
+        self.assertEqual(planned["rollouts"], len(before["rollouts"]))
+        self.assertIsNone(planned["vacuum"])
+        self.assertFalse((self.store / "archive.db").exists())
+
+        report = json.loads(self.run_cli("compact", "--json").stdout)
+        self.assertEqual(report["thread_ids"], [closed_id])
+        self.assertEqual(report["rollouts"], len(before["rollouts"]))
+        self.assertEqual(report["archive"], str(self.store / "archive.db"))
+        self.assertEqual(report["vacuum"], "full")
+        self.assertEqual(stat.S_IMODE((self.store / "archive.db").stat().st_mode), 0o600)
+        with self.connect() as connection:
+            self.assertEqual(connection.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+            self.assertEqual(
+                [
+                    tuple(row)
+                    for row in connection.execute(
+                        "SELECT role,turn_id,message FROM rollout WHERE thread_id=?",
+                        (closed_id,),
+                    )
+                ],
+                [("meta", "archive", f"archive:{len(before['rollouts'])}")],
+            )
+        self.assertEqual(
+            json.loads(self.run_cli("show", "--id", closed_id, "--json").stdout), before
+        )
+        self.assertEqual(
+            json.loads(
+                self.run_cli("show", "--id", fixture_creation_id("thread-2"), "--json").stdout
+            ),
+            live_before,
+        )
+        # VACUUM may renumber thread rowids; the title indexes were rebuilt.
+        self.assertEqual(
+            {
+                row["id"]
+                for row in json.loads(self.run_cli("search", "agtask", "--json").stdout)
+            },
+            {closed_id, fixture_creation_id("thread-2")},
+        )
+
+        self.run_cli(
+            "record-turn",
+            "--id",
+            closed_id,
+            "--turn-id",
+            "turn-9",
+            "--role",
+            "user",
+            "--content",
+            "A late follow-up.",
+        )
+        again = json.loads(self.run_cli("compact", "--json").stdout)
+        self.assertEqual((again["thread_ids"], again["rollouts"]), ([closed_id], 1))
+        self.assertEqual(again["vacuum"], "incremental")
+        history = json.loads(self.run_cli("show", "--id", closed_id, "--json").stdout)
+        self.assertEqual(history["rollouts"][0]["message"], "A late follow-up.")
+        self.assertEqual(history["rollouts"][1:], before["rollouts"])
+        idle = json.loads(self.run_cli("compact", "--json").stdout)
+        self.assertEqual((idle["thread_ids"], idle["rollouts"]), ([], 0))
+
+    def test_exact_v6_ledger_gains_dashboard_indexes_and_full_text_search(self) -> None:
+        runtime = runpy.run_path(str(CLI))
+        self.store.mkdir(mode=0o700)
+        with sqlite3.connect(self.db_path) as connection:
+            for statement in runtime["V6_DDL"]:
+                connection.execute(statement)
+            connection.execute(
+                "INSERT INTO thread("
+                "id,session_id,parent_session_id,kind,project,title,description,"
+                "created,updated,closed,status"
+                ") VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                (
+                    fixture_creation_id("v6-thread"),
+                    "v6-session",
+                    None,
+                    "main",
+                    "agtask",
+                    "Migrated dashboard task",
+                    "",
+                    "2026-01-01T00:00:00.000Z",
+                    "2026-01-02T00:00:00.000Z",
+                    None,
+                    "todo",
+                ),
+            )
+            connection.execute(
+                "INSERT INTO rollout(created,thread_id,turn_id,role,message) "
+                "VALUES (?,?,?,?,?)",
+                (
+                    "2026-01-02T00:00:00.000Z",
+                    fixture_creation_id("v6-thread"),
+                    "turn-1",
+                    "user",
+                    "Discussed the migration backfill",
+                ),
+            )
+            connection.execute("PRAGMA user_version=6")
+        self.db_path.chmod(0o600)
+
+        snapshot = json.loads(
+            self.run_cli("dashboard", "--json", "--search", "DASHBOARD").stdout
+        )
+        self.assertEqual(snapshot["visible_count"], 1)
+        self.assertEqual(
+            snapshot["groups"][0]["threads"][0]["id"], fixture_creation_id("v6-thread")
+        )
+        with self.connect() as connection:
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0], 9)
+            self.assertEqual(
+                connection.execute(
+                    "SELECT COUNT(*) FROM thread_title_fts WHERE thread_title_fts MATCH 'board'"
+                ).fetchone()[0],
+                1,
+            )
+            self.assertEqual(
+                connection.execute(
+                    "SELECT COUNT(*) FROM rollout_fts WHERE rollout_fts MATCH 'backfill'"
+                ).fetchone()[0],
+                1,
+            )
+        self.assertEqual(json.loads(self.run_cli("doctor", "--json").stdout)["integrity"], "ok")
+
+    def test_schema_fingerprint_skips_reverification_until_doctor(self) -> None:
+        self.run_cli("init")
+        connection = self.connect()
+        try:
+            fingerprint = connection.execute("PRAGMA application_id").fetchone()[0]
+        finally:
+            connection.close()
+        self.assertNotEqual(fingerprint, 0)
+        self.register()
+        doctor = json.loads(self.run_cli("doctor", "--json").stdout)
+        self.assertEqual(doctor["integrity"], "ok")
+        self.assertEqual(doctor["schema_version"], 9)
+
+        # A writable_schema edit leaves schema_version unchanged, so the cached
+        # fingerprint still admits the fast path while doctor re-verifies fully.
+        connection = self.connect()
+        try:
+            connection.execute("PRAGMA writable_schema=ON")
+            connection.execute(
+                "UPDATE sqlite_master SET sql=? WHERE name='thread_created_idx'",
+                ('CREATE INDEX thread_created_idx ON "thread"(created)',),
+            )
+            connection.commit()
+            connection.execute("PRAGMA writable_schema=OFF")
+            self.assertEqual(
+                connection.execute("PRAGMA application_id").fetchone()[0], fingerprint
+            )
+        finally:
+            connection.close()
+        listed = json.loads(self.run_cli("list", "--json").stdout)
+        self.assertEqual([row["id"] for row in listed], [fixture_creation_id("thread-1")])
+        result = self.run_cli("doctor", check=False)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("schema definition does not match version 9", result.stderr)
+
+        # Any DDL bumps schema_version and invalidates the stored fingerprint.
+        connection = self.connect()
+        try:
+            connection.execute("DROP INDEX thread_parent_session_idx")
+            connection.commit()
+        finally:
+            connection.close()
+        result = self.run_cli("list", check=False)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("incompatible ledger", result.stderr)
+
     def test_kind_project_and_parent_lineage_are_immutable(self) -> None:
         self.run_cli("init")
         main = self.register(
@@ -3882,6 +4605,227 @@ class CliIntegrationTest(unittest.TestCase):
         self.assertEqual(malformed.returncode, 0)
         self.assertEqual((malformed.stdout, malformed.stderr), ("", ""))
 
+    def test_hookd_serves_shim_payloads_and_shim_falls_back_in_process(self) -> None:
+        self.run_cli("init")
+        self.register()
+        self.run_cli(
+            "record-turn",
+            "--id",
+            "thread-1",
+            "--role",
+            "user",
+            "--turn-id",
+            "bootstrap",
+            "--content",
+            FORK_PROMPT,
+        )
+        socket_path = self.store / "hookd.sock"
+        project = self.root / "project"
+        project.mkdir()
+
+        def shim(payload: dict[str, object], cwd: Path = ROOT) -> str:
+            result = subprocess.run(
+                ["python3", str(HOOK_SHIM)],
+                cwd=cwd,
+                input=json.dumps(payload),
+                text=True,
+                capture_output=True,
+                env=self.env,
+                check=True,
+            )
+            self.assertEqual(result.stderr, "")
+            return result.stdout
+
+        def user_turns() -> list[str]:
+            shown = json.loads(self.run_cli("show", "--id", "thread-1", "--json").stdout)
+            return sorted(
+                row["turn_id"] for row in shown["rollouts"] if row["role"] == "user"
+            )
+
+        start = {
+            "hook_event_name": "SessionStart",
+            "session_id": "thread-1",
+            "source": "startup",
+        }
+        in_process = shim(start)
+        self.assertIn("Tracked agtask thread", in_process)
+
+        daemon = subprocess.Popen(
+            ["python3", str(CLI), "hookd", "--json"],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=self.env,
+        )
+        self.addCleanup(daemon.wait, 10)
+        self.addCleanup(daemon.terminate)
+        deadline = time.monotonic() + 10
+        while not socket_path.exists():
+            if daemon.poll() is not None:
+                self.fail(f"hookd exited early: {daemon.communicate()[1]!r}")
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        self.assertEqual(stat.S_IMODE(socket_path.stat().st_mode), 0o600)
+        second = self.run_cli("hookd", check=False)
+        self.assertEqual(second.returncode, 1)
+        self.assertIn("already listening", second.stderr)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(socket_path))
+            client.sendall(str(ROOT).encode() + b"\0" + json.dumps(start).encode())
+            client.shutdown(socket.SHUT_WR)
+            reply = b""
+            while chunk := client.recv(65536):
+                reply += chunk
+        self.assertEqual(reply, b"ok\n" + in_process.encode())
+        self.assertEqual(shim(start), in_process)
+
+        context = json.loads(
+            shim(
+                {
+                    "hook_event_name": "UserPromptSubmit",
+                    "session_id": "thread-1",
+                    "turn_id": "daemon-turn",
+                    "prompt": "Continue through the daemon.",
+                },
+                cwd=project,
+            )
+        )
+        self.assertIn(
+            "Continue through the daemon.",
+            context["hookSpecificOutput"]["additionalContext"],
+        )
+        self.assertEqual(
+            shim(
+                {
+                    "hook_event_name": "Stop",
+                    "session_id": "thread-1",
+                    "turn_id": "daemon-turn",
+                    "last_assistant_message": "Daemon recorded this.",
+                }
+            ),
+            "",
+        )
+
+        # The daemon resolves project configuration from the shim's directory.
+        (project / ".agtask.json").write_text('{"unknown": {}}')
+        self.assertEqual(
+            shim(
+                {
+                    "hook_event_name": "UserPromptSubmit",
+                    "session_id": "thread-1",
+                    "turn_id": "invalid-config-turn",
+                    "prompt": "Ignored because configuration is invalid.",
+                },
+                cwd=project,
+            ),
+            "",
+        )
+        self.assertEqual(user_turns(), ["bootstrap", "daemon-turn"])
+
+        daemon.terminate()
+        self.assertEqual(daemon.wait(10), 0)
+        self.assertFalse(socket_path.exists())
+
+        # A daemon that takes the payload but never answers must not have it
+        # replayed in-process: it may still be writing the event.
+        def drop_after_reading(listener: socket.socket) -> None:
+            client, _address = listener.accept()
+            with client:
+                while client.recv(65536):
+                    pass
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+            listener.bind(str(socket_path))
+            listener.listen(1)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                accepted = executor.submit(drop_after_reading, listener)
+                self.assertEqual(
+                    shim(
+                        {
+                            "hook_event_name": "UserPromptSubmit",
+                            "session_id": "thread-1",
+                            "turn_id": "unanswered-turn",
+                            "prompt": "Sent to a daemon that never replied.",
+                        }
+                    ),
+                    "",
+                )
+                accepted.result(10)
+        socket_path.unlink()
+        self.assertEqual(user_turns(), ["bootstrap", "daemon-turn"])
+
+        shim(
+            {
+                "hook_event_name": "UserPromptSubmit",
+                "session_id": "thread-1",
+                "turn_id": "fallback-turn",
+                "prompt": "Recorded without the daemon.",
+            }
+        )
+        self.assertEqual(user_turns(), ["bootstrap", "daemon-turn", "fallback-turn"])
+
+        hooks_path = self.root / "hooks.json"
+        env = self.env | {"AGTASK_HOOKS_FILE": str(hooks_path)}
+        installed = json.loads(
+            self.run_cli("install-hooks", "--daemon", "--json", env=env).stdout
+        )
+        self.assertTrue(installed["daemon"])
+        commands = [
+            handler["command"]
+            for group in json.loads(hooks_path.read_text())["hooks"]["Stop"]
+            for handler in group["hooks"]
+        ]
+        self.assertEqual(commands, [f"python3 {HOOK_SHIM}"])
+        self.run_cli("install-hooks", env=env)
+        commands = [
+            handler["command"]
+            for group in json.loads(hooks_path.read_text())["hooks"]["Stop"]
+            for handler in group["hooks"]
+        ]
+        self.assertEqual(commands, [f"python3 {CLI} hook"])
+
+    def test_hook_path_imports_only_the_hook_modules(self) -> None:
+        self.run_cli("init")
+        self.register()
+        result = subprocess.run(
+            ["python3", "-X", "importtime", str(CLI), "hook"],
+            cwd=ROOT,
+            input=json.dumps(
+                {
+                    "hook_event_name": "SessionStart",
+                    "session_id": "thread-1",
+                    "source": "startup",
+                }
+            ),
+            text=True,
+            capture_output=True,
+            env=self.env,
+            check=True,
+        )
+        self.assertIn("Tracked agtask thread", result.stdout)
+        imported = {
+            line.rsplit("|", 1)[1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:") and "|" in line
+        }
+        self.assertIn("agtask_lib.hook", imported)
+        self.assertIn("sqlite3", imported)
+        for module in (
+            "argparse",
+            "gzip",
+            "http.server",
+            "socket",
+            "tempfile",
+            "webbrowser",
+            "agtask_lib.audit",
+            "agtask_lib.cli",
+            "agtask_lib.dashboard",
+            "agtask_lib.hookd",
+        ):
+            self.assertNotIn(module, imported)
+
     def test_hook_installer_preserves_unrelated_handlers_and_mode(self) -> None:
         hooks_path = self.root / "hooks.json"
         hooks_path.write_text(
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+import datetime as dt
+import gzip
 import http.client
 import json
 import os
@@ -10,13 +13,16 @@ import sqlite3
 import subprocess
 import sys
 import tempfile
+import threading
 import unittest
+from unittest import mock
 import uuid
 from urllib.parse import quote, urljoin, urlsplit
 
 
 ROOT = Path(__file__).resolve().parents[1]
 CLI = ROOT / "skills" / "agtask" / "scripts" / "agtask"
+SCRIPTS = CLI.parent
 
 
 def fixture_creation_id(label: str) -> str:
@@ -385,6 +391,30 @@ class DashboardIntegrationTest(unittest.TestCase):
             self.run_cli("dashboard", "--json", "--search", "STRASSE").stdout
         )
         self.assertEqual(unicode_match["visible_count"], 1)
+        for search, expected in (("pi", 1), ("dashboard", 3), ('board"', 0)):
+            with self.subTest(search=search):
+                snapshot = json.loads(
+                    self.run_cli("dashboard", "--json", "--search", search).stdout
+                )
+                self.assertEqual(snapshot["visible_count"], expected)
+        connection = sqlite3.connect(self.db_path)
+        try:
+            connection.execute(
+                "UPDATE thread SET title='Ship CLI' WHERE session_id='root-todo'"
+            )
+            connection.commit()
+        finally:
+            connection.close()
+        renamed = json.loads(
+            self.run_cli("dashboard", "--json", "--search", "ship cli").stdout
+        )
+        self.assertEqual(renamed["visible_count"], 1)
+        self.assertEqual(
+            json.loads(self.run_cli("dashboard", "--json", "--search", "ship api").stdout)[
+                "visible_count"
+            ],
+            0,
+        )
         description_only = json.loads(
             self.run_cli("dashboard", "--json", "--search", "fixture").stdout
         )
@@ -520,6 +550,7 @@ class DashboardIntegrationTest(unittest.TestCase):
         self.assertIn(b'id="task-title"', body)
         self.assertIn(b'id="task-description"', body)
         self.assertIn(b'id="timeline"', body)
+        self.assertIn(b'id="timeline-more"', body)
         self.assertIn(b'id="task-session-id"', body)
         self.assertIn(b'id="task-session-id" class="session-link"', body)
         self.assertNotIn(b"Polish Dashboard", body)
@@ -557,7 +588,9 @@ class DashboardIntegrationTest(unittest.TestCase):
                 "description",
                 "created",
                 "updated",
+                "rollout_count",
                 "rollouts",
+                "next_cursor",
             },
         )
         self.assertEqual(detail["id"], fixture_creation_id("alpha-active"))
@@ -570,6 +603,37 @@ class DashboardIntegrationTest(unittest.TestCase):
         self.assertEqual(
             set(detail["rollouts"][0]), {"created", "role", "message"}
         )
+        self.assertEqual(detail["rollout_count"], len(detail["rollouts"]))
+        self.assertIsNone(detail["next_cursor"])
+
+        api_path = parsed.path + "api/tasks/~alpha-active"
+        pages: dict[str, object] = {}
+        status, _headers, body = self.request(url, path=api_path + "?limit=1")
+        self.assertEqual(status, 200)
+        first_page = json.loads(body)
+        paged = list(first_page["rollouts"])
+        page = first_page
+        while page["next_cursor"] is not None:
+            self.assertEqual(page["rollout_count"], detail["rollout_count"])
+            page_query = f"?before={quote(page['next_cursor'], safe='')}"
+            status, _headers, body = self.request(url, path=api_path + page_query + "&limit=1")
+            self.assertEqual(status, 200)
+            page = json.loads(body)
+            self.assertLessEqual(len(page["rollouts"]), 1)
+            paged.extend(page["rollouts"])
+            pages["../api/tasks/~alpha-active" + page_query] = page
+        self.assertEqual(paged, detail["rollouts"])
+        self.assertEqual(len(pages), detail["rollout_count"] - 1)
+        for query in (
+            "?before=2099-01-08T00:00:00.000Z",
+            "?before=,1",
+            "?limit=0",
+            "?limit=501",
+            "?limit=1&limit=2",
+            "?offset=1",
+        ):
+            status, _headers, _body = self.request(url, path=api_path + query)
+            self.assertEqual(status, 400, query)
 
         node = shutil.which("node")
         self.assertIsNotNone(node, "Node.js is required for the detail client harness")
@@ -578,7 +642,7 @@ class DashboardIntegrationTest(unittest.TestCase):
             [node, str(ROOT / "tests" / "task_detail_client.test.js")],
             cwd=ROOT,
             input=json.dumps(
-                {"source": task_script.decode("utf-8"), "detail": detail}
+                {"source": task_script.decode("utf-8"), "detail": first_page, "pages": pages}
             ),
             text=True,
             capture_output=True,
@@ -608,6 +672,51 @@ class DashboardIntegrationTest(unittest.TestCase):
         self.assertEqual(status, 404)
         self.assertEqual(json.loads(body), {"error": "task not found"})
 
+    def test_task_detail_pages_through_compacted_history(self) -> None:
+        self.seed_dashboard()
+        for turn_id, message in (("turn-1", "Archived prompt"), ("turn-2", "Archived reply")):
+            self.run_cli(
+                "append-rollout",
+                "--id",
+                "beta-done",
+                "--turn-id",
+                turn_id,
+                "--role",
+                "user" if turn_id == "turn-1" else "assistant",
+                "--message",
+                message,
+            )
+        _process, url = self.start_server()
+        api_path = urlsplit(url).path + "api/tasks/~beta-done"
+
+        def walk() -> tuple[dict[str, object], list[object]]:
+            status, _headers, body = self.request(url, path=api_path + "?limit=1")
+            self.assertEqual(status, 200)
+            page = json.loads(body)
+            first, rollouts = page, list(page["rollouts"])
+            while page["next_cursor"] is not None:
+                query = f"?before={quote(page['next_cursor'], safe='')}&limit=1"
+                status, _headers, body = self.request(url, path=api_path + query)
+                self.assertEqual(status, 200)
+                page = json.loads(body)
+                rollouts.extend(page["rollouts"])
+            return first, rollouts
+
+        before_first, before_rollouts = walk()
+        report = json.loads(self.run_cli("compact", "--json").stdout)
+        self.assertEqual(report["thread_ids"], [fixture_creation_id("beta-done")])
+        with sqlite3.connect(self.db_path) as connection:
+            live = connection.execute(
+                "SELECT role,turn_id FROM rollout WHERE thread_id=?",
+                (fixture_creation_id("beta-done"),),
+            ).fetchall()
+        self.assertEqual(live, [("meta", "archive")])
+
+        after_first, after_rollouts = walk()
+        self.assertEqual(after_rollouts, before_rollouts)
+        self.assertEqual(after_first["rollout_count"], before_first["rollout_count"])
+        self.assertEqual(len(after_rollouts), after_first["rollout_count"])
+
     def test_served_client_filter_interactions_and_query_synchronization(self) -> None:
         node = shutil.which("node")
         self.assertIsNotNone(
@@ -878,6 +987,208 @@ class DashboardIntegrationTest(unittest.TestCase):
             url, path=parsed.path + "api/dashboard?project=%ZZ"
         )
         self.assertEqual(status, 400)
+        status, _headers, body = self.request(
+            url, path=parsed.path + "api/dashboard?search=x&search_in=description"
+        )
+        self.assertEqual(status, 400)
+        self.assertIn(b"invalid dashboard search scope", body)
+
+    def test_stats_api_reports_activity_window_and_rejects_bad_days(self) -> None:
+        self.seed_dashboard()
+        _process, url = self.start_server()
+        root = urlsplit(url).path
+
+        status, headers, body = self.request(
+            url, path=root + "api/stats?days=7&project=beta"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json; charset=utf-8")
+        payload = json.loads(body)
+        self.assertEqual(len(payload["days"]), 7)
+        self.assertEqual(payload["projects"], ["beta"])
+        self.assertEqual(payload["totals"]["threads_created"], 2)
+        self.assertEqual(payload["totals"]["threads_done"], 1)
+        self.assertEqual([row["project"] for row in payload["by_project"]], ["beta"])
+        self.assertIn("active", {row["status"] for row in payload["dwell"]})
+
+        for query in ("days=0", "days=abc", "days=7&days=8", "project=", "limit=5"):
+            with self.subTest(query=query):
+                status, _headers, _body = self.request(url, path=root + "api/stats?" + query)
+                self.assertEqual(status, 400)
+
+        status, _headers, body = self.request(url, path=root + "app.js")
+        self.assertIn(b"api/stats?", body)
+        self.assertIn(b"renderActivity", body)
+
+    def test_api_responses_revalidate_with_ledger_etags_and_compress(self) -> None:
+        self.seed_dashboard()
+        connection = sqlite3.connect(self.db_path)
+        try:
+            connection.execute(
+                "UPDATE thread SET description=? WHERE session_id='alpha-active'",
+                ("A long dashboard fixture description. " * 200,),
+            )
+            connection.commit()
+        finally:
+            connection.close()
+        _process, url = self.start_server()
+        parsed = urlsplit(url)
+        dashboard_path = parsed.path + "api/dashboard?project=alpha"
+        detail_path = parsed.path + "api/tasks/~alpha-active"
+
+        status, headers, body = self.request(url, path=dashboard_path)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["cache-control"], "private, no-cache")
+        self.assertEqual(headers["vary"], "Accept-Encoding")
+        self.assertNotIn("content-encoding", headers)
+        etag = headers["etag"]
+        self.assertRegex(etag, r'^"[^"]+"$')
+        self.assertEqual(json.loads(body)["visible_count"], 2)
+
+        status, headers, body = self.request(
+            url, path=dashboard_path, headers={"If-None-Match": f'"stale", W/{etag}'}
+        )
+        self.assertEqual(status, 304)
+        self.assertEqual(headers["etag"], etag)
+        self.assertEqual(body, b"")
+
+        status, headers, body = self.request(
+            url, path=detail_path, headers={"Accept-Encoding": "br, gzip;q=0.5"}
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(int(headers["content-length"]), len(body))
+        detail = json.loads(gzip.decompress(body))
+        self.assertEqual(detail["session_id"], "alpha-active")
+        gzip_etag = headers["etag"]
+        self.assertNotEqual(gzip_etag, etag)
+        status, headers, body = self.request(
+            url, path=detail_path, headers={"Accept-Encoding": "gzip;q=0"}
+        )
+        self.assertEqual(status, 200)
+        self.assertNotIn("content-encoding", headers)
+        self.assertEqual(json.loads(body), detail)
+        self.assertNotEqual(headers["etag"], gzip_etag)
+        status, _headers, _body = self.request(
+            url,
+            path=detail_path,
+            headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag},
+        )
+        self.assertEqual(status, 304)
+
+        self.run_cli("status", "--id", "alpha-active", "--status", "blocked")
+        status, headers, body = self.request(
+            url, path=dashboard_path, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["etag"], etag)
+        statuses = {item["value"]: item["count"] for item in json.loads(body)["facets"]["statuses"]}
+        self.assertEqual(statuses["blocked"], 2)
+
+    def test_stats_etag_changes_when_the_utc_day_rolls_over(self) -> None:
+        self.seed_dashboard()
+        sys.path.insert(0, str(SCRIPTS))
+        self.addCleanup(sys.path.remove, str(SCRIPTS))
+        from agtask_lib import dashboard
+
+        today = [dt.date(2026, 1, 6)]
+        patches = (
+            mock.patch.dict(os.environ, {"AGTASK_DB": str(self.db_path)}),
+            mock.patch.object(dashboard, "utc_today", lambda: today[0]),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        server = dashboard.DashboardHTTPServer(
+            ("127.0.0.1", 0), dashboard.dashboard_handler("token", "pending")
+        )
+        expected_host = f"127.0.0.1:{server.server_address[1]}"
+        server.RequestHandlerClass = dashboard.dashboard_handler("token", expected_host)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://{expected_host}/token/"
+        stats_path = "/token/api/stats?days=2"
+
+        status, headers, body = self.request(url, path=stats_path)
+        self.assertEqual(status, 200)
+        etag = headers["etag"]
+        self.assertEqual([row["day"] for row in json.loads(body)["days"]][-1], "2026-01-06")
+        status, _headers, _body = self.request(
+            url, path=stats_path, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(status, 304)
+
+        today[0] = dt.date(2026, 1, 7)
+        status, headers, body = self.request(
+            url, path=stats_path, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["etag"], etag)
+        self.assertEqual(
+            [row["day"] for row in json.loads(body)["days"]], ["2026-01-06", "2026-01-07"]
+        )
+
+    @staticmethod
+    def read_event(response: http.client.HTTPResponse) -> tuple[str, dict[str, object]]:
+        name = "message"
+        data: list[str] = []
+        while True:
+            line = response.fp.readline().decode("utf-8").rstrip("\n")
+            if not line:
+                if data:
+                    return name, json.loads("\n".join(data))
+                continue
+            if line.startswith(":") or line.startswith("retry:"):
+                continue
+            field, _separator, value = line.partition(": ")
+            if field == "event":
+                name = value
+            elif field == "data":
+                data.append(value)
+
+    def test_event_stream_pushes_snapshot_then_incremental_changes(self) -> None:
+        self.seed_dashboard()
+        _process, url = self.start_server()
+        parsed = urlsplit(url)
+
+        status, _headers, body = self.request(
+            url, path=parsed.path + "api/events?sort=bogus"
+        )
+        self.assertEqual(status, 400)
+        self.assertIn(b"sort", body)
+
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=10)
+        self.addCleanup(connection.close)
+        connection.request("GET", parsed.path + "api/events?status=active")
+        response = connection.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("content-type"), "text/event-stream; charset=utf-8")
+        self.assertEqual(response.getheader("cache-control"), "no-store")
+
+        name, snapshot = self.read_event(response)
+        self.assertEqual(name, "snapshot")
+        self.assertEqual(snapshot["visible_count"], 1)
+        active = snapshot["groups"][0]["threads"][0]
+        self.assertEqual(active["session_id"], "alpha-active")
+
+        self.run_cli("status", "--id", "alpha-active", "--status", "blocked")
+        name, change = self.read_event(response)
+        self.assertEqual(name, "changes")
+        self.assertEqual(change["threads"], [])
+        self.assertEqual(change["removed"], [active["id"]])
+        self.assertEqual(change["total_count"], snapshot["total_count"])
+        statuses = {item["value"]: item["count"] for item in change["facets"]["statuses"]}
+        self.assertEqual(statuses["active"], 0)
+        self.assertEqual(statuses["blocked"], 2)
+
+        self.register("gamma-active", project="gamma", title="Stream me", parent_session_id=None)
+        name, change = self.read_event(response)
+        self.assertEqual(name, "changes")
+        self.assertEqual([thread["session_id"] for thread in change["threads"]], ["gamma-active"])
+        self.assertEqual(change["total_count"], snapshot["total_count"] + 1)
+        self.assertEqual(change["facets"]["projects"], [{"value": "gamma", "count": 1}])
 
     def test_dashboard_reads_do_not_mutate_and_return_503_after_ledger_disappears(self) -> None:
         self.seed_dashboard()
@@ -911,6 +1222,37 @@ class DashboardIntegrationTest(unittest.TestCase):
         self.assertEqual(headers["content-type"], "application/json; charset=utf-8")
         self.assertEqual(json.loads(body), {"error": "dashboard data unavailable"})
 
+    def test_concurrent_requests_share_a_bounded_read_only_pool(self) -> None:
+        self.seed_dashboard()
+        process, url = self.start_server()
+        parsed = urlsplit(url)
+        paths = [
+            parsed.path + "api/dashboard",
+            parsed.path + "api/tasks/~alpha-active",
+        ] * 16
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            responses = list(
+                executor.map(lambda path: self.request(url, path=path), paths)
+            )
+        self.assertEqual([status for status, _headers, _body in responses], [200] * 32)
+
+        descriptors = Path(f"/proc/{process.pid}/fd")
+        if descriptors.is_dir():
+            ledger = str(self.db_path.resolve())
+            open_ledgers = sum(
+                1 for descriptor in descriptors.iterdir()
+                if os.path.realpath(descriptor) == ledger
+            )
+            # Four pooled readers plus the ETag clock's connection.
+            self.assertLessEqual(open_ledgers, 5)
+
+        # Pooled connections must observe commits made after they were opened.
+        self.register(
+            "gamma-new", project="gamma", title="Fresh task", parent_session_id=None
+        )
+        _status, _headers, body = self.request(url, path=parsed.path + "api/dashboard")
+        self.assertEqual(json.loads(body)["total_count"], 5)
+
     def test_browser_launch_failure_warns_but_server_remains_available(self) -> None:
         self.seed_dashboard()
         environment = self.env | {"BROWSER": "/usr/bin/false", "PATH": "/nonexistent"}
@@ -4,16 +4,29 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import json
 import os
 import shutil
 import subprocess
 import sys
+import tempfile
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from importlib.machinery import SourceFileLoader
 from pathlib import Path
+from types import ModuleType
+from typing import Iterable, Mapping
 
 FALLBACK_AG_LEDGER = "/Users/kevinlin/code/skills/active/ag-ledger/scripts/ag-ledger"
+SIBLING_AG_LEDGER = Path(__file__).resolve().parents[2] / "ag-ledger" / "scripts" / "ag-ledger"
+AG_LEDGER_LIBRARY_API = (
+    "EntryFilter",
+    "iter_matching_entries",
+    "ledger_path_for_datetime",
+    "resolve_root",
+)
+SUMMARY_CACHE_VERSION = 1
 EVENT_PREFIXES = ("session start:", "notable change:", "session end:")
 LOOKUP_CHOICES = ("current_day", "day", "week", "month")
 SCOPE_CHOICES = ("convo", "workspace", "all")
@@ -59,11 +72,40 @@ def clean_message(msg: str) -> str:
 def resolve_ag_ledger_bin(candidate: str) -> str:
     if shutil.which(candidate):
         return candidate
+    if shutil.which(str(SIBLING_AG_LEDGER)):
+        return str(SIBLING_AG_LEDGER)
     if shutil.which(FALLBACK_AG_LEDGER):
         return FALLBACK_AG_LEDGER
     return candidate
 
 
+def load_ag_ledger_library(ag_ledger_bin: str) -> ModuleType | None:
+    """Import the ag-ledger script as a module, or None if it is not the Python CLI.
+
+    Wrappers and stand-in binaries without the reader API fall back to
+    `run_filter`, which shells out to `ag-ledger filter`.
+    """
+    resolved = shutil.which(ag_ledger_bin)
+    if not resolved:
+        return None
+    path = Path(resolved).resolve()
+    loader = SourceFileLoader("ag_ledger", str(path))
+    spec = importlib.util.spec_from_file_location("ag_ledger", path, loader=loader)
+    if spec is None:
+        return None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    try:
+        loader.exec_module(module)
+    except Exception:  # noqa: BLE001
+        sys.modules.pop(spec.name, None)
+        return None
+    if not all(hasattr(module, name) for name in AG_LEDGER_LIBRARY_API):
+        sys.modules.pop(spec.name, None)
+        return None
+    return module
+
+
 def format_ts(ts: datetime) -> str:
     return ts.strftime(TS_FMT)
 
@@ -122,27 +164,245 @@ def run_filter(
             record = json.loads(line)
         except json.JSONDecodeError:
             continue
+        event = to_event(record)
+        if event is not None:
+            events.append(event)
 
-        time_raw = str(record.get("time", "")).strip()
-        session_raw = str(record.get("session", "")).strip()
-        workspace_raw = str(record.get("workspace", "")).strip()
-        msg_raw = str(record.get("msg", "")).strip()
-        if not time_raw or not session_raw:
-            continue
+    events.sort(key=lambda event: event["time"])
+    return events
 
-        events.append(
-            {
-                "time": time_raw,
-                "session": session_raw,
-                "workspace": workspace_raw,
-                "msg": msg_raw,
-            }
-        )
 
-    events.sort(key=lambda event: event["time"])
+def to_event(record: Mapping[str, object]) -> dict[str, str] | None:
+    time_raw = str(record.get("time", "")).strip()
+    session_raw = str(record.get("session", "")).strip()
+    workspace_raw = str(record.get("workspace", "")).strip()
+    msg_raw = str(record.get("msg", "")).strip()
+    if not time_raw or not session_raw:
+        return None
+    return {
+        "time": time_raw,
+        "session": session_raw,
+        "workspace": workspace_raw,
+        "msg": msg_raw,
+    }
+
+
+def event_sort_key(event: Mapping[str, str]) -> tuple[str, str, str]:
+    return (event["time"], event["session"], normalize_workspace(event.get("workspace", "")))
+
+
+def read_day_events(ag_ledger: ModuleType, root: Path, day: date) -> list[dict[str, str]]:
+    """Read one day file through ag-ledger's indexed reader, in summary order."""
+    entry_filter = ag_ledger.EntryFilter(
+        from_time=datetime.combine(day, time(hour=0, minute=0)),
+        to_time=datetime.combine(day, time(hour=23, minute=59)),
+    )
+    events: list[dict[str, str]] = []
+    for record, _ in ag_ledger.iter_matching_entries(root, entry_filter) or []:
+        event = to_event(record)
+        if event is not None:
+            events.append(event)
+    events.sort(key=event_sort_key)
+    return events
+
+
+def read_session_events(
+    ag_ledger: ModuleType, start: datetime, end: datetime, session: str
+) -> list[dict[str, str]]:
+    """Read one session's window through ag-ledger's session postings, bypassing day partials."""
+    entry_filter = ag_ledger.EntryFilter(
+        session=session,
+        from_time=start.replace(second=0, microsecond=0),
+        to_time=end.replace(second=0, microsecond=0),
+    )
+    root = ag_ledger.resolve_root(None)
+    events: list[dict[str, str]] = []
+    for record, _ in ag_ledger.iter_matching_entries(root, entry_filter) or []:
+        event = to_event(record)
+        if event is not None:
+            events.append(event)
     return events
 
 
+def group_partial(events: list[dict[str, str]]) -> dict[str, object]:
+    """Counts, time bounds, members, and first highlight for events in summary order."""
+    highlight = next(
+        (
+            [*event_sort_key(event), message]
+            for event in events
+            if (message := clean_message(event["msg"]))
+        ),
+        None,
+    )
+    return {
+        "count": len(events),
+        "first_time": events[0]["time"],
+        "last_time": events[-1]["time"],
+        "sessions": sorted({event["session"] for event in events}),
+        "workspaces": sorted({normalize_workspace(event.get("workspace", "")) for event in events}),
+        "highlight": highlight,
+    }
+
+
+def merge_partials(partials: Iterable[Mapping[str, object]]) -> dict[str, object]:
+    merged: dict[str, object] = {}
+    sessions: set[str] = set()
+    workspaces: set[str] = set()
+    for partial in partials:
+        sessions.update(partial["sessions"])
+        workspaces.update(partial["workspaces"])
+        if not merged:
+            merged = dict(partial)
+            continue
+        merged["count"] += partial["count"]
+        merged["first_time"] = min(merged["first_time"], partial["first_time"])
+        merged["last_time"] = max(merged["last_time"], partial["last_time"])
+        highlight = partial["highlight"]
+        current = merged["highlight"]
+        if highlight and (not current or highlight[:3] < current[:3]):
+            merged["highlight"] = highlight
+    merged["sessions"] = sorted(sessions)
+    merged["workspaces"] = sorted(workspaces)
+    return merged
+
+
+def summarize_day(events: list[dict[str, str]]) -> dict[str, object]:
+    """Aggregate one day's events (in summary order) into partials that merge across days."""
+    by_session: dict[str, list[dict[str, str]]] = defaultdict(list)
+    by_workspace: dict[str, list[dict[str, str]]] = defaultdict(list)
+    session_starts: dict[str, dict[str, str]] = {}
+    for event in events:
+        by_session[event["session"]].append(event)
+        by_workspace[normalize_workspace(event.get("workspace", ""))].append(event)
+        if event["session"] not in session_starts and event["msg"].lower().startswith(
+            "session start:"
+        ):
+            session_starts[event["session"]] = {
+                "time": event["time"],
+                "workspace": event["workspace"],
+            }
+    return {
+        "events": events,
+        "by_session": {key: group_partial(items) for key, items in by_session.items()},
+        "by_workspace": {key: group_partial(items) for key, items in by_workspace.items()},
+        "session_starts": session_starts,
+    }
+
+
+def merge_days(days: list[dict[str, object]]) -> dict[str, object]:
+    """Merge chronological day summaries into one window summary."""
+    by_session: dict[str, list[Mapping[str, object]]] = defaultdict(list)
+    by_workspace: dict[str, list[Mapping[str, object]]] = defaultdict(list)
+    session_starts: dict[str, dict[str, str]] = {}
+    events: list[dict[str, str]] = []
+    for day in days:
+        events.extend(day["events"])
+        for key, partial in day["by_session"].items():
+            by_session[key].append(partial)
+        for key, partial in day["by_workspace"].items():
+            by_workspace[key].append(partial)
+        for key, start in day["session_starts"].items():
+            session_starts.setdefault(key, start)
+    return {
+        "events": events,
+        "by_session": {key: merge_partials(items) for key, items in by_session.items()},
+        "by_workspace": {key: merge_partials(items) for key, items in by_workspace.items()},
+        "session_starts": session_starts,
+    }
+
+
+def summary_cache_path(root: Path, day: date) -> Path:
+    return root / "cache" / "meta.summarize" / f"day-{day.isoformat()}.json"
+
+
+def load_day_summary(ag_ledger: ModuleType, root: Path, day: date) -> dict[str, object]:
+    """Full-day summary for one ledger file, cached under the ledger root.
+
+    The cache entry is keyed by the day file's size and mtime, so only days whose
+    ledger changed since the last run are read and aggregated again.
+    """
+    ledger_path = ag_ledger.ledger_path_for_datetime(root, datetime.combine(day, time()))
+    try:
+        stat_result = ledger_path.stat()
+    except FileNotFoundError:
+        return summarize_day([])
+    fingerprint = {"size": stat_result.st_size, "mtime_ns": stat_result.st_mtime_ns}
+
+    cache_path = summary_cache_path(root, day)
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if (
+            cached.get("version") == SUMMARY_CACHE_VERSION
+            and cached.get("fingerprint") == fingerprint
+        ):
+            return cached["summary"]
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+
+    summary = summarize_day(read_day_events(ag_ledger, root, day))
+    payload = {"version": SUMMARY_CACHE_VERSION, "fingerprint": fingerprint, "summary": summary}
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=cache_path.parent, delete=False
+        ) as handle:
+            json.dump(payload, handle, ensure_ascii=True)
+            temp_path = Path(handle.name)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # The cache only saves work; an unwritable ledger root still summarizes.
+        pass
+    return summary
+
+
+def load_window_days(
+    ag_ledger: ModuleType, start: datetime, end: datetime
+) -> list[dict[str, object]]:
+    """Day summaries for the lookup window; partial first/last days are re-sliced."""
+    root = ag_ledger.resolve_root(None)
+    start_ts = format_ts(start)
+    end_ts = format_ts(end)
+    days: list[dict[str, object]] = []
+    day = start.date()
+    while day <= end.date():
+        summary = load_day_summary(ag_ledger, root, day)
+        day_start = f"{day.isoformat()} 00:00"
+        day_end = f"{day.isoformat()} 23:59"
+        if summary["events"] and (start_ts > day_start or end_ts < day_end):
+            summary = summarize_day(
+                [event for event in summary["events"] if start_ts <= event["time"] <= end_ts]
+            )
+        days.append(summary)
+        day += timedelta(days=1)
+    return days
+
+
+def summarize_events_by_day(events: list[dict[str, str]]) -> list[dict[str, object]]:
+    by_day: dict[str, list[dict[str, str]]] = defaultdict(list)
+    for event in events:
+        by_day[event["time"][:10]].append(event)
+    return [summarize_day(sorted(by_day[key], key=event_sort_key)) for key in sorted(by_day)]
+
+
+def load_window(
+    ag_ledger_bin: str, start: datetime, end: datetime, session: str | None = None
+) -> dict[str, object]:
+    """Window summary from cached day partials, or from `ag-ledger filter` output.
+
+    A `session` window reads only that session's entries and skips the
+    all-workspace day partials.
+    """
+    ag_ledger = load_ag_ledger_library(ag_ledger_bin)
+    if ag_ledger is None:
+        extra_args = ["--session", session] if session else None
+        events = run_filter(ag_ledger_bin, start=start, end=end, extra_args=extra_args)
+        return merge_days(summarize_events_by_day(events))
+    if session:
+        events = read_session_events(ag_ledger, start, end, session)
+        return merge_days(summarize_events_by_day(events))
+    return merge_days(load_window_days(ag_ledger, start, end))
+
+
 def shorten_title(seed: str, max_words: int = 8) -> str:
     words = seed.split()
     if len(words) > max_words:
@@ -279,31 +539,14 @@ def is_under_workspace(path: str, workspace_root: str) -> bool:
     return common == workspace_root
 
 
-def render_workspace(workspace_root: str, events: list[dict[str, str]]) -> str:
-    by_session: dict[str, list[dict[str, str]]] = defaultdict(list)
-    for event in events:
-        by_session[event["session"]].append(event)
-
-    selected_sessions: dict[str, list[dict[str, str]]] = {}
+def render_workspace(workspace_root: str, window: Mapping[str, object]) -> str:
     session_start_workspace: dict[str, str] = {}
-    for session_id, session_events in by_session.items():
-        session_events.sort(key=lambda event: event["time"])
-        start_event = next(
-            (
-                event
-                for event in session_events
-                if event.get("msg", "").strip().lower().startswith("session start:")
-            ),
-            None,
-        )
-        if not start_event:
-            continue
+    for session_id, start_event in window["session_starts"].items():
         if is_under_workspace(start_event.get("workspace", ""), workspace_root):
-            selected_sessions[session_id] = session_events
             start_workspace = start_event.get("workspace", "").strip()
             session_start_workspace[session_id] = start_workspace or "(unknown workspace)"
 
-    if not selected_sessions:
+    if not session_start_workspace:
         title = f"{Path(workspace_root).name} workspace activity"
         return render_template(
             title=title,
@@ -316,49 +559,46 @@ def render_workspace(workspace_root: str, events: list[dict[str, str]]) -> str:
             timeline=[],
         )
 
-    workspace_events: dict[str, list[dict[str, str]]] = defaultdict(list)
-    workspace_sessions: dict[str, set[str]] = defaultdict(set)
-    for session_id, session_events in selected_sessions.items():
-        workspace = session_start_workspace.get(session_id, "(unknown workspace)")
-        workspace_events[workspace].extend(session_events)
-        workspace_sessions[workspace].add(session_id)
-
+    workspace_sessions: dict[str, list[str]] = defaultdict(list)
+    for session_id, workspace in session_start_workspace.items():
+        workspace_sessions[workspace].append(session_id)
+    workspace_partials = {
+        workspace: merge_partials(window["by_session"][session_id] for session_id in session_ids)
+        for workspace, session_ids in workspace_sessions.items()
+    }
     workspace_order = sorted(
-        workspace_events.keys(),
-        key=lambda workspace: min(event["time"] for event in workspace_events[workspace]),
+        workspace_partials.keys(),
+        key=lambda workspace: workspace_partials[workspace]["first_time"],
     )
 
-    all_events: list[dict[str, str]] = []
-    for workspace in workspace_order:
-        workspace_events[workspace].sort(key=lambda event: (event["time"], event["session"]))
-        all_events.extend(workspace_events[workspace])
-    all_events.sort(key=lambda event: (event["time"], event["session"]))
-
-    session_ids = sorted(selected_sessions.keys())
-    started = all_events[0]["time"]
-    ended = all_events[-1]["time"]
+    workspace_events: dict[str, list[dict[str, str]]] = defaultdict(list)
+    for event in window["events"]:
+        workspace = session_start_workspace.get(event["session"])
+        if workspace is not None:
+            workspace_events[workspace].append(event)
+
+    session_ids = sorted(session_start_workspace.keys())
+    started = min(partial["first_time"] for partial in workspace_partials.values())
+    ended = max(partial["last_time"] for partial in workspace_partials.values())
+    event_count = sum(partial["count"] for partial in workspace_partials.values())
     title = f"{Path(workspace_root).name} workspace activity"
 
     session_label = format_session_label(session_ids)
 
     summary_lines = [
         f"This workspace summary covers {len(session_ids)} sessions that started in {workspace_root}.",
-        f"It includes {len(all_events)} ag-ledger events from {started} to {ended}.",
+        f"It includes {event_count} ag-ledger events from {started} to {ended}.",
         "Grouped by workspace:",
     ]
 
     for workspace in workspace_order:
-        workspace_group_events = workspace_events[workspace]
-        workspace_group_sessions = sorted(workspace_sessions[workspace])
-        workspace_started = workspace_group_events[0]["time"]
-        workspace_ended = workspace_group_events[-1]["time"]
-        highlights = collect_highlights(workspace_group_events, limit=1)
+        partial = workspace_partials[workspace]
         line = (
-            f"- {workspace}: {len(workspace_group_sessions)} sessions, "
-            f"{len(workspace_group_events)} events, {workspace_started} to {workspace_ended}"
+            f"- {workspace}: {len(workspace_sessions[workspace])} sessions, "
+            f"{partial['count']} events, {partial['first_time']} to {partial['last_time']}"
         )
-        if highlights:
-            line += f"; highlight: {highlights[0]}"
+        if partial["highlight"]:
+            line += f"; highlight: {partial['highlight'][3]}"
         summary_lines.append(line)
 
     timeline: list[str] = []
@@ -380,9 +620,10 @@ def render_workspace(workspace_root: str, events: list[dict[str, str]]) -> str:
     )
 
 
-def render_all(events: list[dict[str, str]], groupby: str) -> str:
+def render_all(window: Mapping[str, object], groupby: str) -> str:
     title = "all workspace activity"
-    if not events:
+    all_events = window["events"]
+    if not all_events:
         return render_template(
             title=title,
             started="unknown",
@@ -391,16 +632,8 @@ def render_all(events: list[dict[str, str]], groupby: str) -> str:
             timeline=[],
         )
 
-    all_events = sorted(
-        events,
-        key=lambda event: (
-            event["time"],
-            event["session"],
-            normalize_workspace(event.get("workspace", "")),
-        ),
-    )
-    session_ids = sorted({event["session"] for event in all_events})
-    workspace_ids = sorted({normalize_workspace(event.get("workspace", "")) for event in all_events})
+    session_ids = sorted(window["by_session"].keys())
+    workspace_ids = sorted(window["by_workspace"].keys())
     started = all_events[0]["time"]
     ended = all_events[-1]["time"]
 
@@ -410,7 +643,6 @@ def render_all(events: list[dict[str, str]], groupby: str) -> str:
     ]
 
     timeline: list[str] = []
-    grouped = group_events(all_events, groupby)
     if groupby == "none":
         summary_lines.append("Grouped by: none (chronological timeline across all sessions/workspaces).")
         timeline.extend(
@@ -425,24 +657,23 @@ def render_all(events: list[dict[str, str]], groupby: str) -> str:
         )
     else:
         summary_lines.append(f"Grouped by {groupby}:")
-        for group_name, group_items in grouped:
-            group_started = group_items[0]["time"]
-            group_ended = group_items[-1]["time"]
-            group_sessions = len({event["session"] for event in group_items})
-            group_workspaces = len({normalize_workspace(event.get("workspace", "")) for event in group_items})
-            highlights = collect_highlights(group_items, limit=1)
+        partials = window["by_session"] if groupby == "session" else window["by_workspace"]
+        for group_name, group_items in group_events(all_events, groupby):
+            partial = partials[group_name]
             if groupby == "session":
                 line = (
-                    f"- {group_name}: {len(group_items)} events, "
-                    f"{group_workspaces} workspaces, {group_started} to {group_ended}"
+                    f"- {group_name}: {partial['count']} events, "
+                    f"{len(partial['workspaces'])} workspaces, "
+                    f"{partial['first_time']} to {partial['last_time']}"
                 )
             else:
                 line = (
-                    f"- {group_name}: {len(group_items)} events, "
-                    f"{group_sessions} sessions, {group_started} to {group_ended}"
+                    f"- {group_name}: {partial['count']} events, "
+                    f"{len(partial['sessions'])} sessions, "
+                    f"{partial['first_time']} to {partial['last_time']}"
                 )
-            if highlights:
-                line += f"; highlight: {highlights[0]}"
+            if partial["highlight"]:
+                line += f"; highlight: {partial['highlight'][3]}"
             summary_lines.append(line)
 
             timeline.append(f"- {groupby}: {group_name}")
@@ -475,23 +706,17 @@ def main() -> None:
                 file=sys.stderr,
             )
             sys.exit(2)
-        events = run_filter(
-            ag_ledger_bin,
-            start=start,
-            end=end,
-            extra_args=["--session", session_id],
-        )
+        window = load_window(ag_ledger_bin, start=start, end=end, session=session_id)
+        events = [event for event in window["events"] if event["session"] == session_id]
         print(render_convo(session_id, events))
         return
 
     if args.scope == "all":
-        events = run_filter(ag_ledger_bin, start=start, end=end)
-        print(render_all(events, args.groupby))
+        print(render_all(load_window(ag_ledger_bin, start=start, end=end), args.groupby))
         return
 
     workspace_root = os.path.realpath(args.workspace or os.getcwd())
-    events = run_filter(ag_ledger_bin, start=start, end=end)
-    print(render_workspace(workspace_root, events))
+    print(render_workspace(workspace_root, load_window(ag_ledger_bin, start=start, end=end)))
 
 
 if __name__ == "__main__":
@@ -9,10 +9,12 @@ import subprocess
 import sys
 import tempfile
 import unittest
+from datetime import datetime, timedelta
 from pathlib import Path
 
 
 SCRIPT_PATH = Path(__file__).resolve().parents[1] / "summarize_from_ledger.py"
+AG_LEDGER_PATH = Path(__file__).resolve().parents[3] / "ag-ledger" / "scripts" / "ag-ledger"
 
 
 class SummarizeFromLedgerIntegrationTests(unittest.TestCase):
@@ -158,6 +160,170 @@ if __name__ == "__main__":
             result.stdout,
         )
 
+    def test_reads_real_ledger_in_process_within_lookup_window(self) -> None:
+        ledger_root = self.tmp / "ledger"
+        data_dir = ledger_root / "data"
+        data_dir.mkdir(parents=True)
+        recent_day = (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d")
+        old_day = (datetime.now() - timedelta(days=40)).strftime("%Y-%m-%d")
+        recent = [
+            {
+                "time": f"{recent_day} 10:00",
+                "workspace": "/tmp/ws-a",
+                "session": "sess-a",
+                "msg": "session end: alpha done",
+            },
+            {
+                "time": f"{recent_day} 09:00",
+                "workspace": "/tmp/ws-a",
+                "session": "sess-a",
+                "msg": "session start: alpha",
+            },
+        ]
+        (data_dir / f"ledger-{recent_day}.md").write_text(
+            "".join(json.dumps(event, ensure_ascii=True) + "\n" for event in recent),
+            encoding="utf-8",
+        )
+        (data_dir / f"ledger-{old_day}.md").write_text(
+            json.dumps(
+                {
+                    "time": f"{old_day} 09:00",
+                    "workspace": "/tmp/ws-old",
+                    "session": "sess-old",
+                    "msg": "session start: outside the window",
+                },
+                ensure_ascii=True,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+
+        env = os.environ.copy()
+        env["META_LEDGER_ROOT"] = str(ledger_root)
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(SCRIPT_PATH),
+                "all",
+                "week",
+                "--ag-ledger-bin",
+                str(AG_LEDGER_PATH),
+            ],
+            text=True,
+            capture_output=True,
+            check=False,
+            env=env,
+        )
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertIn("- session: sess-a", result.stdout)
+        self.assertNotIn("sess-old", result.stdout)
+        start_line = f"- [{recent_day} 09:00] (sess-a @ /tmp/ws-a) session start: alpha"
+        end_line = f"- [{recent_day} 10:00] (sess-a @ /tmp/ws-a) session end: alpha done"
+        self.assertLess(result.stdout.index(start_line), result.stdout.index(end_line))
+        # The in-process reader builds day indexes only for days it opened.
+        self.assertTrue((data_dir / f"ledger-{recent_day}.idx.json").exists())
+        self.assertFalse((data_dir / f"ledger-{old_day}.idx.json").exists())
+
+    def test_convo_scope_reads_only_the_session_in_process(self) -> None:
+        ledger_root = self.tmp / "ledger"
+        data_dir = ledger_root / "data"
+        data_dir.mkdir(parents=True)
+        day = (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d")
+        events = [
+            ("09:00", "/tmp/ws-a", "sess-a", "session start: alpha"),
+            ("09:30", "/tmp/ws-b", "sess-b", "session start: beta"),
+            ("10:00", "/tmp/ws-a", "sess-a", "session end: alpha done"),
+        ]
+        (data_dir / f"ledger-{day}.md").write_text(
+            "".join(
+                json.dumps(
+                    {
+                        "time": f"{day} {clock}",
+                        "workspace": workspace,
+                        "session": session,
+                        "msg": msg,
+                    },
+                    ensure_ascii=True,
+                )
+                + "\n"
+                for clock, workspace, session, msg in events
+            ),
+            encoding="utf-8",
+        )
+
+        env = os.environ.copy()
+        env["META_LEDGER_ROOT"] = str(ledger_root)
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(SCRIPT_PATH),
+                "convo",
+                "week",
+                "--session",
+                "sess-a",
+                "--ag-ledger-bin",
+                str(AG_LEDGER_PATH),
+            ],
+            text=True,
+            capture_output=True,
+            check=False,
+            env=env,
+        )
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertIn("It includes 2 ag-ledger events", result.stdout)
+        self.assertIn(f"- [{day} 10:00] session end: alpha done", result.stdout)
+        self.assertNotIn("beta", result.stdout)
+        # Session reads never build the all-workspace day partials.
+        self.assertFalse((ledger_root / "cache" / "meta.summarize").exists())
+
+    def test_reuses_cached_day_partials_until_the_day_file_changes(self) -> None:
+        ledger_root = self.tmp / "ledger"
+        data_dir = ledger_root / "data"
+        data_dir.mkdir(parents=True)
+        day = (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d")
+        ledger_path = data_dir / f"ledger-{day}.md"
+        event = {
+            "time": f"{day} 09:00",
+            "workspace": "/tmp/ws-a",
+            "session": "sess-a",
+            "msg": "session start: alpha",
+        }
+        ledger_path.write_text(json.dumps(event, ensure_ascii=True) + "\n", encoding="utf-8")
+
+        env = os.environ.copy()
+        env["META_LEDGER_ROOT"] = str(ledger_root)
+        command = [
+            sys.executable,
+            str(SCRIPT_PATH),
+            "all",
+            "week",
+            "session",
+            "--ag-ledger-bin",
+            str(AG_LEDGER_PATH),
+        ]
+        first = subprocess.run(command, text=True, capture_output=True, check=False, env=env)
+        self.assertEqual(first.returncode, 0, msg=first.stderr)
+        self.assertIn("- sess-a: 1 events, 1 workspaces", first.stdout)
+
+        cache_path = ledger_root / "cache" / "meta.summarize" / f"day-{day}.json"
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        self.assertEqual(cached["fingerprint"]["size"], ledger_path.stat().st_size)
+        # Edit the cached partial without touching the ledger: a cache hit shows it.
+        cached["summary"]["by_session"]["sess-a"]["highlight"][3] = "from cache"
+        cache_path.write_text(json.dumps(cached), encoding="utf-8")
+        second = subprocess.run(command, text=True, capture_output=True, check=False, env=env)
+        self.assertIn("highlight: from cache", second.stdout)
+
+        with ledger_path.open("a", encoding="utf-8") as handle:
+            handle.write(
+                json.dumps({**event, "time": f"{day} 10:00", "msg": "session end: done"})
+                + "\n"
+            )
+        third = subprocess.run(command, text=True, capture_output=True, check=False, env=env)
+        self.assertEqual(third.returncode, 0, msg=third.stderr)
+        self.assertIn("- sess-a: 2 events, 1 workspaces", third.stdout)
+        self.assertIn("highlight: alpha", third.stdout)
+
 
 if __name__ == "__main__":
     unittest.main()